@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from network_ipd_ga.adaptive_sweep import AXIS_TYPES, DEFAULT_METRICS, AdaptiveSweep, Axis
+from network_ipd_ga.config_loader import load_config
+
+# パラメータ空間の適応的な探索（network_ipd_ga.adaptive_sweep）。
+#
+# ベース設定の一部のパラメータ（--axis NAME LOW HIGH, 複数可）を粗い格子から始め、
+# 最終世代の協調率・多様性が大きく変わるセルだけを 2 等分して点を追加していく。
+# 実行回数の予算（--budget, 点 × seed）の範囲で、密な格子より少ない実行で転移の位置を絞り込む：
+#   uv run scripts/adaptive_sweep.py --config configs/exp/small_world_meta00.yml \
+#       --axis meta_influence 0 1 --axis mutation_rate 0 0.05 --budget 300
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Adaptively refine a parameter sweep where the final-generation metrics change fastest."
+    )
+    parser.add_argument("--config", type=str, required=True, help="Base YAML config.")
+    parser.add_argument(
+        "--axis",
+        nargs=3,
+        action="append",
+        metavar=("NAME", "LOW", "HIGH"),
+        required=True,
+        help=f"Parameter to explore and its range (repeatable; one of {', '.join(sorted(AXIS_TYPES))}).",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        default=list(DEFAULT_METRICS),
+        help=f"Final-generation summary metrics whose changes guide the refinement "
+             f"(default: {' '.join(DEFAULT_METRICS)}).",
+    )
+    parser.add_argument("--budget", type=int, default=300, help="Total simulation runs (points x seeds) (default: 300).")
+    parser.add_argument("--seeds-per-point", type=int, default=3, help="Seeds run at each point (default: 3).")
+    parser.add_argument("--levels", type=int, default=3, help="Points per axis of the initial grid (default: 3).")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Only split cells whose metrics change by at least this fraction of their observed range (default: 0.1).",
+    )
+    parser.add_argument(
+        "--resolution",
+        type=float,
+        default=1 / 64,
+        help="Do not split cells narrower than this fraction of an axis range (default: 1/64).",
+    )
+    parser.add_argument("--batch", type=int, default=8, help="Cells split per round (default: 8).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the runs of a round (default: 1).")
+    parser.add_argument(
+        "--no-shared-graphs",
+        action="store_true",
+        help="Let each worker build its own graphs instead of attaching to graphs shared through memory-mapped files.",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="Output CSV (default: <output_dir>/adaptive/<output_base>_adaptive.csv).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    cfg = load_config(Path(args.config))
+    try:
+        axes = [Axis(name, float(low), float(high)) for name, low, high in args.axis]
+        sweep = AdaptiveSweep(
+            cfg,
+            axes,
+            metrics=args.metrics,
+            seeds_per_point=args.seeds_per_point,
+            budget=args.budget,
+            levels=args.levels,
+            tolerance=args.tolerance,
+            resolution=args.resolution,
+            workers=args.workers,
+            share_graphs=not args.no_shared_graphs,
+        )
+        t_start = time.perf_counter()
+        sweep.run(batch=args.batch)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 2
+
+    print(
+        f"[INFO] {len(sweep.samples)} points, {sweep.runs} runs in {time.perf_counter() - t_start:.1f}s "
+        f"(a dense grid at the finest spacing would need {sweep.dense_grid_runs()} runs)"
+    )
+    out = Path(args.out) if args.out else cfg.output_dir / "adaptive" / f"{cfg.output_base}_adaptive.csv"
+    sweep.write_csv(out)
+    print(f"[SAVE] {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# import 時間の予算チェック。
+#
+# 各モジュールを新しいプロセスで `python -X importtime -c "import <module>"` として読み込み、
+# - そのモジュールの累積 import 時間（中央値）が予算を超えていないか
+# - 重いライブラリ（pandas / networkx / matplotlib / yaml）が読み込まれていないか
+# を調べる。どちらかに違反すると終了コード 1 を返す（CI・性能回帰の確認用）。
+
+DEFAULT_MODULES = [
+    "network_ipd_ga.simulation",
+    "network_ipd_ga.sinks",
+    "network_ipd_ga.store",
+    "network_ipd_ga.telemetry",
+]
+HEAVY_MODULES = ["pandas", "networkx", "matplotlib", "yaml"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure the import time of the simulation core in fresh processes "
+                    "and fail if it exceeds the budget or pulls in heavy libraries."
+    )
+    parser.add_argument(
+        "--modules",
+        type=str,
+        nargs="+",
+        default=DEFAULT_MODULES,
+        help=f"Modules to import (default: {' '.join(DEFAULT_MODULES)}).",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=250.0,
+        help="Budget for the median cumulative import time of each module, in ms (default: 250).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of fresh processes per module (default: 5).",
+    )
+    parser.add_argument(
+        "--forbid",
+        type=str,
+        nargs="*",
+        default=HEAVY_MODULES,
+        help=f"Modules that must not be loaded (default: {' '.join(HEAVY_MODULES)}).",
+    )
+    return parser.parse_args()
+
+
+def measure(module: str, forbid: list[str]) -> tuple[dict[str, int], list[str]]:
+    """
+    新しいプロセスで module を import する。
+    戻り値: ({モジュール名: 累積 import 時間 [us]}, 読み込まれた禁止モジュール)
+    """
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {forbid!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    cumulative: dict[str, int] = {}
+    # 形式: "import time: self [us] | cumulative | imported package"
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative, loaded
+
+
+def main() -> None:
+    args = parse_args()
+    failed = False
+
+    for module in args.modules:
+        times = []
+        numpy_times = []
+        loaded: list[str] = []
+        for _ in range(args.repeat):
+            cumulative, loaded = measure(module, args.forbid)
+            times.append(cumulative.get(module, 0) / 1000)
+            numpy_times.append(cumulative.get("numpy", 0) / 1000)
+        median = statistics.median(times)
+        status = "OK"
+        if median > args.budget_ms:
+            status = "OVER BUDGET"
+            failed = True
+        if loaded:
+            status = f"HEAVY IMPORTS: {', '.join(loaded)}"
+            failed = True
+        print(
+            f"[INFO] {module}: {median:.1f} ms (min {min(times):.1f}, numpy {statistics.median(numpy_times):.1f}) "
+            f"budget {args.budget_ms:.0f} ms -> {status}"
+        )
+
+    if failed:
+        print("[WARN] Import-time budget check failed.")
+        sys.exit(1)
+    print("[INFO] Import-time budget check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from network_ipd_ga.build import DEFAULT_MANIFEST, BuildManifest, Target, build, plan
+from network_ipd_ga.config_loader import SimulationConfig, load_config
+from network_ipd_ga.history import HISTORY_SUFFIX
+
+# 図・動画の差分ビルド（network_ipd_ga.build）。
+#
+# configs/exp の各設定について make_figure.py（全 seed の平均の図）と make_video.py（seed ごとの動画）の
+# Target（--outputs viewers で make_viewer.py の HTML ビューアも）を作り、前回のビルドから入力（結果ファイル・ストアの実行・設定・描画スクリプト）が変わったもの
+# だけを --workers 並列で再生成する。スイープの一部だけを再実行した後の後処理は、変わった分だけで済む：
+#   uv run scripts/build_outputs.py --seeds 0-9 --workers 8
+#   uv run scripts/build_outputs.py --dry-run          # 再生成する Target と理由を表示するだけ
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Regenerate only the figures and videos whose inputs changed since the last build."
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Configs to build (default: all of configs/exp/*.yml).",
+    )
+    parser.add_argument("--seeds", type=str, default="0-9", help="Seed range, e.g. '0-9' or '0,2,5-7' (default: 0-9).")
+    parser.add_argument(
+        "--outputs",
+        type=str,
+        nargs="+",
+        choices=["figures", "videos", "viewers"],
+        default=["figures", "videos"],
+        help="Which outputs to build (default: figures videos).",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If set, inputs are runs in the store instead of CSV/pickle files.",
+    )
+    parser.add_argument("--fps", type=int, default=10, help="Video frames per second (default: 10).")
+    parser.add_argument("--dpi", type=int, default=150, help="Video DPI (default: 150).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Outputs built in parallel (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=str(DEFAULT_MANIFEST),
+        help=f"Build record of the inputs of each output (default: {DEFAULT_MANIFEST}).",
+    )
+    parser.add_argument("--force", action="store_true", help="Rebuild everything.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the outputs that would be rebuilt.")
+    return parser.parse_args()
+
+
+def parse_seed_range(s: str) -> list[int]:
+    """make_figure.py --seeds と同じ形式（"0-9", "0,3,7", "0-3,7-9"）。"""
+    result = []
+    for part in s.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            result.extend(range(int(start), int(end) + 1))
+        else:
+            result.append(int(part))
+    return sorted(set(result))
+
+
+def run_files(cfg: SimulationConfig, seed: int) -> dict:
+    """run_single_experiment.py が 1 実行分を保存するファイル。"""
+    out, name = cfg.output_dir, f"{cfg.output_base}_seed{seed:04d}"
+    return {
+        "summary": out / "csvs" / f"{name}.csv",
+        "nodes": out / "csvs" / f"{name}_nodes.csv",
+        "history": out / "histories" / f"{name}{HISTORY_SUFFIX}",
+        "graph": out / "pickles" / f"{name}_graph.pickle",
+        "rewiring": out / "csvs" / f"{name}_rewiring.csv",
+    }
+
+
+def figure_target(path: Path, cfg: SimulationConfig, seeds: list[int], args: argparse.Namespace) -> Target:
+    """make_figure.py の 1 設定分（全 seed の平均）の図。"""
+    script = SCRIPTS_DIR / "make_figure.py"
+    seed_arg = ",".join(map(str, seeds))
+    command = [sys.executable, str(script), "--config", str(path), "--seeds", seed_arg]
+    files = [script, path]
+    store_runs = []
+    if args.store is not None:
+        command += ["--store", args.store]
+        store_runs = [(cfg.config_hash(), seed) for seed in seeds]
+    else:
+        files += [run_files(cfg, seed)["summary"] for seed in seeds]
+    figs = cfg.output_dir / "figs"
+    outputs = [
+        figs / f"{cfg.output_base}_avg_{m}_with_std.png"
+        for m in ("realized_coop_rate", "strategy_coop_rate", "diversity", "avg_payoff")
+    ] + [figs / f"{cfg.output_base}_avg_strategy_distribution_with_std.png"]
+    return Target(
+        target_id=f"figure:{cfg.output_base}",
+        command=command,
+        outputs=outputs,
+        files=files,
+        store_runs=store_runs,
+        store=Path(args.store) if args.store else None,
+        params={"config": cfg.as_dict(), "config_hash": cfg.config_hash()},
+    )
+
+
+def video_target(
+    path: Path, cfg: SimulationConfig, seed: int, args: argparse.Namespace, kind: str = "video"
+) -> Target | None:
+    """make_video.py の 1 実行分の動画（kind="viewer" なら make_viewer.py の HTML, 結果がまだなければ None）。"""
+    name = f"{cfg.output_base}_seed{seed:04d}"
+    if kind == "viewer":
+        script = SCRIPTS_DIR / "make_viewer.py"
+        command = [sys.executable, str(script), "--config", str(path), "--seed", str(seed)]
+        # make_viewer.py は make_video.py の読み込み・レイアウトと network_ipd_ga.viewer の HTML を使う
+        from network_ipd_ga import viewer
+
+        files = [script, SCRIPTS_DIR / "make_video.py", Path(viewer.__file__), path]
+        output = cfg.output_dir / "viewers" / f"{name}.html"
+    else:
+        script = SCRIPTS_DIR / "make_video.py"
+        command = [
+            sys.executable, str(script), "--config", str(path), "--seed", str(seed),
+            "--fps", str(args.fps), "--dpi", str(args.dpi),
+        ]
+        files = [script, path]
+        output = cfg.output_dir / "videos" / f"{name}.mp4"
+    store_runs = []
+    if args.store is not None:
+        command += ["--store", args.store]
+        store_runs = [(cfg.config_hash(), seed)]
+    else:
+        f = run_files(cfg, seed)
+        history = f["history"] if f["history"].exists() else f["nodes"]
+        if not history.exists():
+            return None
+        files += [history, f["summary"], f["rewiring"]]
+        if cfg.topology != "lattice":
+            files.append(f["graph"])
+    return Target(
+        target_id=f"{kind}:{name}",
+        command=command,
+        outputs=[output],
+        files=files,
+        store_runs=store_runs,
+        store=Path(args.store) if args.store else None,
+        params={"config": cfg.as_dict(), "config_hash": cfg.config_hash()},
+    )
+
+
+def stored_seeds(store: str, cfg: SimulationConfig, seeds: list[int]) -> list[int]:
+    """結果ストアにある seed（config_hash が一致する実行）。"""
+    from network_ipd_ga.store import ResultsStore
+
+    with ResultsStore(store) as s:
+        found = set(s.runs(where={"config_hash": cfg.config_hash()})["seed"].tolist())
+    return [seed for seed in seeds if seed in found]
+
+
+def main() -> int:
+    args = parse_args()
+    config_files = [Path(p) for p in args.config] if args.config else sorted(Path("configs", "exp").glob("*.yml"))
+    if not config_files:
+        print("[WARN] No config files to build.")
+        return 0
+    seeds = parse_seed_range(args.seeds)
+
+    targets = []
+    for path in config_files:
+        cfg = load_config(path)
+        if args.store is not None:
+            available = stored_seeds(args.store, cfg, seeds)
+        else:
+            available = [s for s in seeds if run_files(cfg, s)["summary"].exists()]
+        if not available:
+            print(f"[WARN] No results for {path} (seeds {args.seeds}); skipped.")
+            continue
+        if "figures" in args.outputs:
+            targets.append(figure_target(path, cfg, available, args))
+        if "videos" in args.outputs and cfg.topology != "well_mixed":
+            targets += [t for s in available if (t := video_target(path, cfg, s, args)) is not None]
+        if "viewers" in args.outputs and cfg.topology != "well_mixed":
+            targets += [t for s in available if (t := video_target(path, cfg, s, args, "viewer")) is not None]
+
+    manifest = BuildManifest(args.manifest)
+    stale = plan(targets, manifest, force=args.force)
+    print(f"[INFO] {len(stale)} of {len(targets)} outputs are out of date.")
+    for target, reason, _ in stale:
+        print(f"[INFO]   {target.target_id}: {reason}")
+    if args.dry_run:
+        return 0
+    manifest.save()
+
+    failed = build(stale, manifest, workers=args.workers)
+    print(f"[SAVE] {manifest.path}")
+    if failed:
+        print(f"[ERROR] {len(failed)} outputs failed: {', '.join(t.target_id for t in failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from network_ipd_ga.autotune import CACHE_FILE, available_cores, cache_dir, engine_estimates, load_calibration
+from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.selection import Selection
+from network_ipd_ga.simulation import BACKENDS, build_graph
+
+# engine: auto の較正（network_ipd_ga.autotune）。
+#
+# このマシンで各計算方法（simulation.BACKENDS）の係数を測ってキャッシュし（記録があれば読むだけ）、
+# --config の設定ごとに各計算方法の見積もりと auto が選ぶものを表示する：
+#   uv run scripts/calibrate_engines.py --force                      # 測り直す
+#   uv run scripts/calibrate_engines.py --config configs/exp/*.yml   # 設定ごとの選択
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Calibrate the simulation engines on this machine and show which one engine=auto picks."
+    )
+    parser.add_argument("--config", type=str, nargs="*", default=[], help="Configs to show estimates for.")
+    parser.add_argument("--force", action="store_true", help="Re-run the calibration even if it is cached.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    calibration = load_calibration(force=args.force)
+    print(f"[INFO] Calibration for {calibration['machine']['host']} ({available_cores()} cores), "
+          f"cached in {cache_dir() / CACHE_FILE}")
+    print(f"{'engine':8s} {'startup [s]':>12s} {'play [us]':>10s} {'repro seq [us]':>15s} {'repro ctr [us]':>15s}  description")
+    for name, c in calibration["backends"].items():
+        unit = "/edge" if BACKENDS[name].array_play else "/edge/round"
+        print(
+            f"{name:8s} {c['startup']:12.3f} {c['play'] * 1e6:10.3f} {c['reproduce']['sequential'] * 1e6:15.3f} "
+            f"{c['reproduce']['counter'] * 1e6:15.3f}  {BACKENDS[name].description} (play {unit})"
+        )
+
+    for path in args.config:
+        cfg = load_config(Path(path))
+        if cfg.topology in ("well_mixed", "lattice") or cfg.update_mode != "sync":
+            print(f"[INFO] {path}: topology {cfg.topology} / update_mode {cfg.update_mode} has its own implementation.")
+            continue
+        graph = build_graph(
+            cfg.topology, cfg.num_agents, 0, cfg.small_world_k, cfg.small_world_p, cfg.scale_free_m
+        )
+        selection = Selection(cfg.selection, k=cfg.tournament_k, temperature=cfg.fermi_temperature)
+        estimates = engine_estimates(graph, cfg.generations, cfg.T, cfg.rng_mode, selection)
+        best = min(estimates, key=estimates.get)
+        detail = ", ".join(f"{name} {t:.2f}s" for name, t in sorted(estimates.items(), key=lambda x: x[1]))
+        print(f"[INFO] {path}: auto -> {best} ({detail})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.equivalence import (
+    ENGINES,
+    EquivalenceResult,
+    compare_fingerprints,
+    compare_trajectories,
+    generation_fingerprints,
+    read_golden,
+    run_engine,
+    write_golden,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check that a candidate engine reproduces the reference trajectories "
+                    "(pairwise or against golden fingerprints) and report speedups."
+    )
+    parser.add_argument(
+        "--configs",
+        type=str,
+        nargs="+",
+        default=None,
+        help="YAML config files (default: configs/exp/*.yml).",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        nargs="+",
+        default=[0],
+        help="Seeds to run (default: 0).",
+    )
+    parser.add_argument(
+        "--reference",
+        type=str,
+        default="reference",
+        choices=sorted(ENGINES),
+        help="Reference engine (default: reference).",
+    )
+    parser.add_argument(
+        "--candidate",
+        type=str,
+        default=None,
+        choices=sorted(ENGINES),
+        help="Candidate engine to check. Without --golden both engines are run and compared.",
+    )
+    parser.add_argument(
+        "--golden",
+        action="store_true",
+        help="Compare the candidate (default: the reference engine) against golden fingerprints.",
+    )
+    parser.add_argument(
+        "--write-golden",
+        action="store_true",
+        help="Run the reference engine and (over)write the golden fingerprints.",
+    )
+    parser.add_argument(
+        "--golden-dir",
+        type=str,
+        default="configs/golden",
+        help="Directory of golden fingerprint files (default: configs/golden).",
+    )
+    parser.add_argument(
+        "--generations",
+        type=int,
+        default=None,
+        help="Override generations (pairwise comparison only; golden files use the config as-is).",
+    )
+    parser.add_argument(
+        "--num-agents",
+        type=int,
+        default=None,
+        help="Override num_agents (pairwise comparison only).",
+    )
+    parser.add_argument("--rtol", type=float, default=0.0, help="Relative tolerance for floats (default: exact).")
+    parser.add_argument("--atol", type=float, default=0.0, help="Absolute tolerance for floats (default: exact).")
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="If set, save the report as CSV.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    config_paths = (
+        [Path(p) for p in args.configs] if args.configs else sorted(Path("configs", "exp").glob("*.yml"))
+    )
+    if not config_paths:
+        print("[WARN] No config files found.")
+        return 1
+    if (args.golden or args.write_golden) and (args.generations or args.num_agents):
+        print("[ERROR] --generations / --num-agents cannot be used with golden fingerprints.")
+        return 2
+    if not (args.golden or args.write_golden) and args.candidate is None:
+        print("[ERROR] Specify --candidate, --golden or --write-golden.")
+        return 2
+
+    golden_dir = Path(args.golden_dir)
+    results = []
+
+    for config_path in config_paths:
+        cfg = load_config(config_path)
+        kwargs = cfg.simulation_kwargs()
+        if args.generations is not None:
+            kwargs["generations"] = args.generations
+        if args.num_agents is not None:
+            kwargs["num_agents"] = args.num_agents
+        golden_path = golden_dir / f"{config_path.stem}.json"
+
+        if args.write_golden:
+            fingerprints = {}
+            for seed in args.seeds:
+                traj = run_engine(args.reference, kwargs, seed)
+                fingerprints[seed] = {**generation_fingerprints(traj), "seconds": traj.seconds}
+                print(f"[INFO] {config_path.stem} seed={seed}: {len(traj.summary)} generations, {traj.seconds:.2f}s")
+            write_golden(golden_path, cfg.config_hash(), fingerprints)
+            print(f"[SAVE] {golden_path}")
+            continue
+
+        if args.golden:
+            if not golden_path.exists():
+                print(f"[WARN] Golden file not found: {golden_path} (skipped)")
+                continue
+            config_hash, golden = read_golden(golden_path)
+            if config_hash != cfg.config_hash():
+                print(f"[WARN] {golden_path} was written for a different config (hash {config_hash}); skipped")
+                continue
+            engine = args.candidate or args.reference
+            for seed in args.seeds:
+                if seed not in golden:
+                    print(f"[WARN] seed {seed} not in {golden_path} (skipped)")
+                    continue
+                traj = run_engine(engine, kwargs, seed)
+                mismatch = compare_fingerprints(seed, golden[seed], generation_fingerprints(traj))
+                results.append(
+                    EquivalenceResult(
+                        config_path.stem, seed, golden[seed].get("seconds", float("nan")), traj.seconds, mismatch
+                    )
+                )
+                print(f"[{'OK' if mismatch is None else 'DIFF'}] {config_path.stem} seed={seed}"
+                      + ("" if mismatch is None else f": {mismatch}"))
+            continue
+
+        for seed in args.seeds:
+            ref = run_engine(args.reference, kwargs, seed)
+            cand = run_engine(args.candidate, kwargs, seed)
+            divergence = compare_trajectories(ref, cand, rtol=args.rtol, atol=args.atol)
+            result = EquivalenceResult(config_path.stem, seed, ref.seconds, cand.seconds, divergence)
+            results.append(result)
+            print(f"[{'OK' if result.ok else 'DIFF'}] {config_path.stem} seed={seed} "
+                  f"speedup={result.speedup:.2f}x"
+                  + ("" if result.ok else f": first divergence at {divergence}"))
+
+    if not results:
+        return 0
+
+    report = pd.DataFrame([r.as_dict() for r in results])
+    print()
+    print(report.drop(columns=["divergence"]).to_string(index=False))
+    total_ref = report["reference_seconds"].sum()
+    total_cand = report["candidate_seconds"].sum()
+    if total_cand > 0:
+        print(f"[INFO] Total: reference {total_ref:.2f}s, candidate {total_cand:.2f}s, "
+              f"speedup {total_ref / total_cand:.2f}x")
+
+    if args.out is not None:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        report.to_csv(out, index=False)
+        print(f"[SAVE] {out}")
+
+    num_bad = int((~report["ok"]).sum())
+    if num_bad:
+        print(f"[ERROR] {num_bad} run(s) diverged.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
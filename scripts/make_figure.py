@@ -1,9 +1,14 @@
 import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import yaml
 
+from network_ipd_ga import config_loader
+from network_ipd_ga.paired import paired_config
+from network_ipd_ga.store import ResultsStore
+
 COLOR_MAP = {
     "000": "black",
     "001": "tab:blue",
@@ -17,6 +22,14 @@ COLOR_MAP = {
 
 STRATEGY_COLS = ["000", "001", "010", "011", "100", "101", "110", "111"]
 
+SPATIAL_METRICS = [
+    "same_strategy_edge_frac",
+    "strategy_assortativity",
+    "num_clusters",
+    "max_cluster_size",
+    "mean_cluster_size",
+]
+
 def load_config(path: Path) -> dict:
     with path.open("r") as f:
         return yaml.safe_load(f)
@@ -56,6 +69,24 @@ def parse_args() -> argparse.Namespace:
         required=True,
         help="Seed range, e.g., '0-9' or '0,2,5-7'"
     )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If set, load from the store instead of CSVs.",
+    )
+    parser.add_argument(
+        "--paired",
+        action="store_true",
+        help="Load the results of paired runs (run_all_experiments.py --paired, common random numbers).",
+    )
+    parser.add_argument(
+        "--paired-with",
+        type=str,
+        default=None,
+        help="Baseline config (e.g. the meta_influence=0 one). Plot the per-seed paired differences "
+             "config - baseline of the paired runs with 95%% confidence bands. Implies --paired.",
+    )
     return parser.parse_args()
 
 # -------------------------------------------------------------
@@ -82,6 +113,126 @@ def load_all_seed_data(cfg, seeds):
 
     return pd.concat(dfs, ignore_index=True)
 
+def load_all_seed_data_from_store(store_path: Path, config_hash: str, seeds):
+    """結果ストアから、config_hash と seed で指定した実行のサマリを 1 クエリで読み込む."""
+    with ResultsStore(store_path) as store:
+        df = store.read_summary(where={"config_hash": config_hash, "seed": list(seeds)})
+
+    if df.empty:
+        raise RuntimeError(f"No runs found in store for config_hash={config_hash}.")
+
+    found = sorted(df["seed"].unique())
+    for seed in sorted(set(seeds) - set(found)):
+        print(f"[WARN] Not found in store: seed={seed}")
+    print(f"[LOAD] {store_path} (config_hash={config_hash}, seeds={found})")
+    return df.drop(columns=["config_hash"])
+
+def load_runs(sim_cfg: config_loader.SimulationConfig, seeds, store: str | None) -> pd.DataFrame:
+    """SimulationConfig で指定した実行の全 seed のサマリを（ストアまたは CSV から）読み込む."""
+    if store is not None:
+        return load_all_seed_data_from_store(Path(store), sim_cfg.config_hash(), seeds)
+    return load_all_seed_data(
+        {"output_dir": sim_cfg.output_dir, "output_base": sim_cfg.output_base}, seeds
+    )
+
+# -------------------------------------------------------------
+
+def paired_differences(df_all: pd.DataFrame, df_base: pd.DataFrame, metrics: list[str]):
+    """
+    同じ (seed, generation) どうしの差 config - baseline を取り、世代ごとに
+    平均・95% 信頼区間の半幅（1.96 × 標準誤差）を返す.
+    共通乱数の対応のある実行では seed 間のばらつきが差で打ち消されるので、区間が狭くなる.
+    戻り値: df_diff（seed × 世代ごとの差）, df_mean, df_ci
+    """
+    keys = ["seed", "generation"]
+    merged = df_all[keys + metrics].merge(
+        df_base[keys + metrics], on=keys, suffixes=("", "_base")
+    )
+    df_diff = merged[keys].copy()
+    for m in metrics:
+        df_diff[m] = merged[m] - merged[f"{m}_base"]
+
+    grouped = df_diff.drop(columns=["seed"]).groupby("generation")
+    df_mean = grouped.mean().reset_index()
+    n = grouped.count().reset_index()
+    df_ci = grouped.std(ddof=1).reset_index()
+    df_ci[metrics] = 1.96 * df_ci[metrics] / np.sqrt(n[metrics])
+    return df_diff, df_mean, df_ci
+
+
+def report_paired_precision(df_all: pd.DataFrame, df_base: pd.DataFrame, df_diff: pd.DataFrame, metric: str):
+    """
+    最終世代の差について、対応のある標準誤差と、独立な実行とみなした場合の標準誤差を表示する.
+    （比 = 同じ精度に必要な seed 数の比の平方根）
+    """
+    last = df_diff["generation"].max()
+    d = df_diff.loc[df_diff["generation"] == last, metric]
+    a = df_all.loc[df_all["generation"] == last, metric]
+    b = df_base.loc[df_base["generation"] == last, metric]
+    n = len(d)
+    if n < 2:
+        print(f"[WARN] Need at least 2 seeds to estimate the paired precision (got {n}).")
+        return
+    se_paired = d.std(ddof=1) / np.sqrt(n)
+    se_unpaired = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    ratio = se_unpaired / se_paired if se_paired > 0 else float("inf")
+    print(
+        f"[INFO] {metric} @ generation {last}: diff = {d.mean():.4f} "
+        f"(paired SE {se_paired:.4f}, unpaired SE {se_unpaired:.4f}, {ratio:.1f}x narrower, n={n})"
+    )
+
+
+def save_paired_diff_plot(df_mean, df_ci, y, label: str, save_path: Path):
+    """
+    各世代の差の平均と 95% 信頼区間の帯を描画する.
+    """
+    plt.figure(figsize=(8, 5))
+
+    x_vals = df_mean["generation"]
+    y_mean = df_mean[y]
+    y_ci = df_ci[y]
+
+    plt.plot(x_vals, y_mean, label=label)
+    plt.fill_between(x_vals, y_mean - y_ci, y_mean + y_ci, alpha=0.3, label="95% CI")
+    plt.axhline(0.0, color="gray", linewidth=1)
+
+    plt.xlabel("generation", fontsize=15)
+    plt.ylabel(f"Δ {y}", fontsize=15)
+
+    plt.xticks(fontsize=12)
+    plt.yticks(fontsize=12)
+
+    plt.grid(True)
+    plt.legend(fontsize=12)
+    plt.tight_layout()
+
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(save_path, bbox_inches="tight")
+    plt.close()
+
+    print(f"[SAVE] {save_path}")
+
+
+def make_paired_figures(args: argparse.Namespace, seeds) -> None:
+    """--paired-with: config とベースラインの対応のある差を図にする."""
+    sim_cfg = paired_config(config_loader.load_config(Path(args.config)))
+    base_cfg = paired_config(config_loader.load_config(Path(args.paired_with)))
+
+    df_all = load_runs(sim_cfg, seeds, args.store)
+    df_base = load_runs(base_cfg, seeds, args.store)
+
+    metrics = ["realized_coop_rate", "strategy_coop_rate", "diversity", "avg_payoff"]
+    metrics += [m for m in SPATIAL_METRICS if m in df_all.columns and m in df_base.columns]
+    df_diff, df_mean, df_ci = paired_differences(df_all, df_base, metrics)
+
+    label = f"meta {sim_cfg.meta_influence:g} - {base_cfg.meta_influence:g}"
+    figs_dir = Path(sim_cfg.output_dir) / "figs"
+    for m in metrics:
+        p = figs_dir / f"{sim_cfg.output_base}_vs_{base_cfg.output_base}_paired_diff_{m}.png"
+        save_paired_diff_plot(df_mean, df_ci, m, label, p)
+    for m in ("realized_coop_rate", "avg_payoff"):
+        report_paired_precision(df_all, df_base, df_diff, m)
+
 # -------------------------------------------------------------
 
 def aggregate_over_seeds(df_all: pd.DataFrame):
@@ -219,8 +370,21 @@ def main():
     seeds = parse_seed_range(args.seeds)
     print("[INFO] Seeds to load:", seeds)
 
+    if args.paired_with is not None:
+        make_paired_figures(args, seeds)
+        return
+
     # 全シードのデータ読み込み
-    df_all = load_all_seed_data(cfg, seeds)
+    if args.paired:
+        # 対応のある実行の結果（rng_mode を counter にした設定の出力名・config_hash）
+        sim_cfg = paired_config(config_loader.load_config(Path(args.config)))
+        cfg = {**cfg, "output_base": sim_cfg.output_base}
+        df_all = load_runs(sim_cfg, seeds, args.store)
+    elif args.store is not None:
+        config_hash = config_loader.load_config(Path(args.config)).config_hash()
+        df_all = load_all_seed_data_from_store(Path(args.store), config_hash, seeds)
+    else:
+        df_all = load_all_seed_data(cfg, seeds)
 
     # 1) メトリクスの平均 & 標準偏差
     df_mean, df_std = aggregate_over_seeds(df_all)
@@ -234,6 +398,8 @@ def main():
 
     # メトリクス各種を平均＋分散帯付きで保存
     metrics = ["realized_coop_rate", "strategy_coop_rate", "diversity", "avg_payoff"]
+    # 空間構造メトリクス（列がある結果のみ）
+    metrics += [m for m in SPATIAL_METRICS if m in df_mean.columns]
 
     for m in metrics:
         p = figs_dir / f"{cfg['output_base']}_avg_{m}_with_std.png"
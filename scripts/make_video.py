@@ -7,10 +7,16 @@ import pickle
 
 import pandas as pd
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, FFMpegWriter, PillowWriter
+from matplotlib.colors import ListedColormap
 from matplotlib.lines import Line2D
 from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.graph import as_networkx
+from network_ipd_ga.history import HISTORY_SUFFIX, NodeHistory
+from network_ipd_ga.lattice import lattice_shape
+from network_ipd_ga.store import ResultsStore
 
 COLOR_MAP = {
     "000": "black",
@@ -61,13 +67,20 @@ def parse_args() -> argparse.Namespace:
         default=(6, 6),
         help="Figure size (width height).",
     )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If set, load from the store instead of CSV/pickle.",
+    )
     return parser.parse_args()
 
 
 def load_graph(path: Path) -> nx.Graph:
     with path.open("rb") as f:
-        G: nx.Graph = pickle.load(f)
-    return G
+        G = pickle.load(f)
+    # run_single_experiment は networkx のグラフを保存する（network_ipd_ga.graph.Graph の pickle も読める）
+    return as_networkx(G)
 
 def compute_layout(G: nx.Graph, layout: str):
     if layout == "spring":
@@ -127,16 +140,197 @@ def compute_uniform_node_size(G: nx.Graph, figsize: tuple[float, float]) -> floa
     return size
 
 
+def load_from_files(
+    graph_path: Path | None,
+    nodes_path: Path,
+    history_path: Path,
+    summary_path: Path,
+    rewire_path: Path,
+):
+    """
+    run_single_experiment.py が保存した CSV / pickle からグラフ・ノード履歴・サマリを読み込む。
+    ノード履歴は差分符号化ファイル（.nhist）があればそれを memmap で開き、なければ CSV を読む。
+    graph_path=None（格子などグラフを保存しない topology）のときはグラフを読まず None を返す。
+    """
+    G = None
+    if graph_path is not None:
+        print(f"[INFO] Loading graph from {graph_path} ...")
+        if not graph_path.exists():
+            raise FileNotFoundError(f"Graph file not found: {graph_path}")
+        G = load_graph(graph_path)
+
+    if history_path.exists():
+        print(f"[INFO] Opening node history {history_path} ...")
+        history = NodeHistory(history_path)
+    else:
+        print(f"[INFO] Loading node history from {nodes_path} ...")
+        if not nodes_path.exists():
+            raise FileNotFoundError(f"Node history not found: {history_path} or {nodes_path}")
+        history = pd.read_csv(nodes_path)
+
+    summary_df = None
+    if summary_path.exists():
+        print(f"[INFO] Loading summary from {summary_path} ...")
+        summary_df = pd.read_csv(summary_path)
+        summary_df.set_index("generation", inplace=True)
+    else:
+        print(f"[WARN] Summary CSV not found: {summary_path} (titles will be simpler)")
+
+    rewire_df = None
+    if rewire_path.exists():
+        print(f"[INFO] Loading rewiring events from {rewire_path} ...")
+        rewire_df = pd.read_csv(rewire_path)
+    return G, history, summary_df, rewire_df
+
+
+def load_from_store(store_path: Path, config_hash: str, seed: int, with_graph: bool = True):
+    """結果ストアからグラフ・ノード履歴・サマリを読み込む（with_graph=False ならグラフは None）。"""
+    print(f"[INFO] Loading config_hash={config_hash}, seed={seed} from {store_path} ...")
+    with ResultsStore(store_path) as store:
+        G = store.read_graph(config_hash, seed) if with_graph else None
+        node_df = store.read_node_history(config_hash, seed)
+        summary_df = store.read_summary(
+            columns=["realized_coop_rate", "diversity", "avg_payoff"],
+            where={"config_hash": config_hash, "seed": seed},
+        )
+        rewire_df = store.read_topology_events(config_hash, seed)
+    summary_df.set_index("generation", inplace=True)
+    return G, node_df, summary_df, (rewire_df if len(rewire_df) else None)
+
+
+def strategy_lookup(history: NodeHistory | pd.DataFrame):
+    """
+    ノード履歴から (世代のリスト, 世代 -> {node_id: 戦略コード} の関数) を作る。
+    NodeHistory は要求された世代だけを直前のキーフレームから復元する。
+    """
+    if isinstance(history, NodeHistory):
+        ids = history.node_ids.tolist()
+        generations = [int(g) for g in history.generations]
+        return generations, lambda gen: dict(zip(ids, history.strategies(gen).tolist()))
+
+    by_gen = {
+        int(gen): dict(zip(df["node_id"].astype(int), df["strategy_int"].astype(int)))
+        for gen, df in history.groupby("generation")
+    }
+    return sorted(by_gen), by_gen.__getitem__
+
+
+def strategy_grid_lookup(history: NodeHistory | pd.DataFrame, shape: tuple[int, int]):
+    """
+    格子用: ノード履歴から (世代のリスト, 世代 -> 戦略コードの 2 次元配列 (H, W) の関数) を作る。
+    ノード ID は行優先の位置（id = y * W + x）。
+    """
+    def to_grid(node_ids: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        grid = np.zeros(shape[0] * shape[1], dtype=np.int8)
+        grid[node_ids] = codes
+        return grid.reshape(shape)
+
+    if isinstance(history, NodeHistory):
+        ids = np.asarray(history.node_ids, dtype=np.int64)
+        generations = [int(g) for g in history.generations]
+        return generations, lambda gen: to_grid(ids, history.strategies(gen))
+
+    by_gen = {
+        int(gen): to_grid(df["node_id"].to_numpy(np.int64), df["strategy_int"].to_numpy(np.int8))
+        for gen, df in history.groupby("generation")
+    }
+    return sorted(by_gen), by_gen.__getitem__
+
+
+def frame_title(gen: int, summary_df: pd.DataFrame | None) -> str:
+    """フレームのタイトル（summary があればそこから情報を出す）。"""
+    if summary_df is not None and gen in summary_df.index:
+        s = summary_df.loc[gen]
+        return (
+            f"Generation {gen}\n"
+            f"realized_coop_rate = {s['realized_coop_rate']:.3f}, "
+            f"diversity = {s['diversity']:.3f}, "
+            f"avg_payoff = {s['avg_payoff']:.3f}"
+        )
+    return f"Generation {gen}"
+
+
+def animate_lattice(history, summary_df, shape: tuple[int, int], figsize, fps: int) -> FuncAnimation:
+    """
+    格子の戦略をそのまま画像（1 ノード = 1 ピクセル, imshow）として描くアニメーション。
+    ネットワークのレイアウト・エッジの描画をしないので、1000×1000 の格子でも扱える。
+    """
+    generations, grid_at = strategy_grid_lookup(history, shape)
+    print(f"[INFO] Lattice {shape[0]}x{shape[1]}, generations: {generations[0]} .. {generations[-1]} "
+          f"(total {len(generations)} frames)")
+
+    cmap = ListedColormap([COLOR_MAP[format(c, "03b")] for c in range(8)])
+    fig, ax = plt.subplots(figsize=tuple(figsize))
+    ax.set_axis_off()
+    image = ax.imshow(grid_at(generations[0]), cmap=cmap, vmin=-0.5, vmax=7.5, interpolation="nearest")
+
+    legend_elements = [
+        Line2D([0], [0], marker='s', color='w',
+            label=bits, markerfacecolor=color, markersize=10)
+        for bits, color in COLOR_MAP.items()
+    ]
+    ax.legend(handles=legend_elements, title="Strategy bits",
+            loc="upper left", bbox_to_anchor=(1.0, 1.0), fontsize=8)
+
+    def update(frame_idx: int):
+        gen = generations[frame_idx]
+        image.set_data(grid_at(gen))
+        ax.set_title(frame_title(gen, summary_df))
+        return image,
+
+    return FuncAnimation(
+        fig,
+        update,
+        frames=len(generations),
+        interval=1000 / fps,
+        blit=False,
+        repeat=False,
+    )
+
+
+def save_animation(ani: FuncAnimation, out_path: Path, fps: int, dpi: int) -> None:
+    """拡張子に応じて GIF（Pillow）か MP4（ffmpeg）で保存する。"""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if out_path.suffix.lower() == ".gif":
+        print(f"[INFO] Saving GIF to {out_path} ...")
+        writer = PillowWriter(fps=fps)
+        ani.save(out_path, writer=writer, dpi=dpi)
+    else:
+        print(f"[INFO] Saving MP4 to {out_path} ...")
+        writer = FFMpegWriter(fps=fps)
+        ani.save(out_path, writer=writer, dpi=dpi)
+
+
+def apply_rewiring(G: nx.Graph, rewire_df: pd.DataFrame, gen: int) -> None:
+    """
+    generation <= gen の未適用の再結線イベントを G に適用する。
+    （G.graph["rewired_until"] に適用済みの世代を記録しておく）
+    """
+    done = G.graph.get("rewired_until", -1)
+    if gen <= done:
+        return
+    events = rewire_df[(rewire_df["generation"] > done) & (rewire_df["generation"] <= gen)]
+    for node, removed, added in events[["node_id", "removed", "added"]].itertuples(index=False):
+        G.remove_edge(node, removed)
+        G.add_edge(node, added)
+    G.graph["rewired_until"] = gen
+
+
 def main() -> None:
     args = parse_args()
 
     # --- config から各種パスを自動決定 ---
     cfg = load_config(Path(args.config))
     seed = args.seed
+    if cfg.topology == "well_mixed":
+        print("[WARN] topology 'well_mixed' has no network to draw; use make_figure.py instead.")
+        return
 
     # run_single_experiment.py で保存したファイル名と揃える想定：
     #   summary : <output_dir>/csvs/<output_base>_seed<seed>.csv
     #   nodes   : <output_dir>/csvs/<output_base>_seed<seed>_nodes.csv
+    #             （--node-history delta のときは <output_dir>/histories/<output_base>_seed<seed>.nhist）
     #   graph   : <output_dir>/pickles/<output_base>_seed<seed>_graph.pickle
     base = cfg.output_base
     out_dir: Path = cfg.output_dir  # config_loader が Path に変換している 
@@ -144,31 +338,33 @@ def main() -> None:
     graph_path = out_dir / "pickles" / f"{base}_seed{seed:04d}_graph.pickle"
     nodes_path = out_dir / "csvs" / f"{base}_seed{seed:04d}_nodes.csv"
     summary_path = out_dir / "csvs" / f"{base}_seed{seed:04d}.csv"
+    rewire_path = out_dir / "csvs" / f"{base}_seed{seed:04d}_rewiring.csv"
+    history_path = out_dir / "histories" / f"{base}_seed{seed:04d}{HISTORY_SUFFIX}"
 
     # 動画の出力先
     video_dir = out_dir / "videos"
     out_path = video_dir / f"{base}_seed{seed:04d}.mp4"
 
     # --- データ読み込み ---
-    print(f"[INFO] Loading graph from {graph_path} ...")
-    if not graph_path.exists():
-        raise FileNotFoundError(f"Graph file not found: {graph_path}")
-    G = load_graph(graph_path)
-
-    print(f"[INFO] Loading node history from {nodes_path} ...")
-    if not nodes_path.exists():
-        raise FileNotFoundError(f"Node history CSV not found: {nodes_path}")
-    node_df = pd.read_csv(nodes_path)
-
-    summary_df = None
-    if summary_path.exists():
-        print(f"[INFO] Loading summary from {summary_path} ...")
-        summary_df = pd.read_csv(summary_path)
-        summary_df.set_index("generation", inplace=True)
+    # 格子はグラフを保存しないので、グラフを読まずに戦略の 2 次元配列を画像として描く
+    is_lattice = cfg.topology == "lattice"
+    if args.store is not None:
+        G, history, summary_df, rewire_df = load_from_store(
+            Path(args.store), cfg.config_hash(), seed, with_graph=not is_lattice
+        )
     else:
-        print(f"[WARN] Summary CSV not found: {summary_path} (titles will be simpler)")
+        G, history, summary_df, rewire_df = load_from_files(
+            None if is_lattice else graph_path, nodes_path, history_path, summary_path, rewire_path
+        )
+
+    if is_lattice:
+        shape = lattice_shape(cfg.num_agents, cfg.lattice_width)
+        ani = animate_lattice(history, summary_df, shape, args.figsize, args.fps)
+        save_animation(ani, out_path, args.fps, args.dpi)
+        print("[INFO] Done.")
+        return
 
-    generations = sorted(node_df["generation"].unique())
+    generations, strategies_at = strategy_lookup(history)
     print(f"[INFO] Generations: {generations[0]} .. {generations[-1]} "
           f"(total {len(generations)} frames)")
 
@@ -200,20 +396,23 @@ def main() -> None:
 
         ax.set_axis_off()
 
+        # 共進化モード：この世代までの再結線を初期グラフに順に適用する
+        if rewire_df is not None:
+            apply_rewiring(G, rewire_df, gen)
+
         # この世代のノード情報
-        df_g = node_df[node_df["generation"] == gen]
-        row_by_id = {int(row["node_id"]): row for _, row in df_g.iterrows()}
+        strategy_by_id = strategies_at(gen)
 
         colors = []
         sizes = []
         for nid in node_order:
-            row = row_by_id.get(int(nid))
-            if row is None:
+            code = strategy_by_id.get(int(nid))
+            if code is None:
                 colors.append("gray")
                 sizes.append(uniform_size)
                 print(f"[WARNING] Node ID {nid} missing in generation {gen}, coloring gray.")
             else:
-                bits = format(int(row["strategy_int"]), "03b")
+                bits = format(code, "03b")
                 colors.append(strategy_to_color(bits))
                 sizes.append(uniform_size)
 
@@ -227,19 +426,7 @@ def main() -> None:
             ax=ax,
         )
 
-        # タイトル（summary があればそこから情報を出す）
-        if summary_df is not None and gen in summary_df.index:
-            s = summary_df.loc[gen]
-            title = (
-                f"Generation {gen}\n"
-                f"realized_coop_rate = {s['realized_coop_rate']:.3f}, "
-                f"diversity = {s['diversity']:.3f}, "
-                f"avg_payoff = {s['avg_payoff']:.3f}"
-            )
-        else:
-            title = f"Generation {gen}"
-
-        ax.set_title(title)
+        ax.set_title(frame_title(gen, summary_df))
         return scat,
 
     # --- 凡例の作成 ---
@@ -263,17 +450,7 @@ def main() -> None:
     )
 
     # --- 動画として保存 ---
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if out_path.suffix.lower() == ".gif":
-        print(f"[INFO] Saving GIF to {out_path} ...")
-        writer = PillowWriter(fps=args.fps)
-        ani.save(out_path, writer=writer, dpi=args.dpi)
-    else:
-        print(f"[INFO] Saving MP4 to {out_path} ...")
-        writer = FFMpegWriter(fps=args.fps)
-        ani.save(out_path, writer=writer, dpi=args.dpi)
-
+    save_animation(ani, out_path, args.fps, args.dpi)
     print("[INFO] Done.")
 
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+from matplotlib.colors import to_hex
+
+from make_video import (
+    COLOR_MAP,
+    compute_layout,
+    layout_from_topology,
+    load_from_files,
+    load_from_store,
+)
+from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.history import HISTORY_SUFFIX, NodeHistory
+from network_ipd_ga.lattice import lattice_shape, neighbor_offsets
+from network_ipd_ga.viewer import normalize_positions, strategy_matrix, viewer_html
+
+# 1 実行分の戦略の変化をブラウザで再生する HTML ビューア（network_ipd_ga.viewer）。
+#
+# make_video.py と同じ結果ファイル（または --store の実行）を読み、レイアウト・エッジ・戦略の履歴を
+# 圧縮して 1 つの HTML に埋め込む。動画のエンコードはせず、再生・世代の移動・拡大・ノードの強調は
+# ブラウザ側で行う。出力は既定で <output_dir>/viewers/<output_base>_seed<seed>.html：
+#   uv run scripts/make_viewer.py --config configs/sample.yml --seed 42
+#   uv run scripts/make_viewer.py --config configs/sample.yml --seed 42 --every 5   # 5 世代ごと
+
+SUMMARY_METRICS = ("realized_coop_rate", "diversity", "avg_payoff")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Write a self-contained HTML viewer that plays the strategy history of one run in the browser."
+    )
+    parser.add_argument("--config", type=str, required=True, help="Path to the YAML configuration file.")
+    parser.add_argument("--seed", type=int, required=True, help="Random seed of the experiment to view.")
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If set, load from the store instead of CSV/pickle.",
+    )
+    parser.add_argument(
+        "--layout",
+        type=str,
+        choices=["auto", "spring", "circular", "kamada"],
+        default="auto",
+        help="Graph layout (default: auto, chosen from the topology as in make_video.py).",
+    )
+    parser.add_argument("--every", type=int, default=1, help="Keep every N-th recorded generation (default: 1).")
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="Output HTML (default: <output_dir>/viewers/<output_base>_seed<seed>.html).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    cfg = load_config(Path(args.config))
+    seed = args.seed
+    if cfg.topology == "well_mixed":
+        print("[WARN] topology 'well_mixed' has no network to draw; use make_figure.py instead.")
+        return 0
+    if args.every < 1:
+        print("[ERROR] --every must be >= 1.")
+        return 2
+
+    base, out_dir = cfg.output_base, cfg.output_dir
+    name = f"{base}_seed{seed:04d}"
+    is_lattice = cfg.topology == "lattice"
+    try:
+        if args.store is not None:
+            G, history, summary_df, rewire_df = load_from_store(
+                Path(args.store), cfg.config_hash(), seed, with_graph=not is_lattice
+            )
+        else:
+            G, history, summary_df, rewire_df = load_from_files(
+                None if is_lattice else out_dir / "pickles" / f"{name}_graph.pickle",
+                out_dir / "csvs" / f"{name}_nodes.csv",
+                out_dir / "histories" / f"{name}{HISTORY_SUFFIX}",
+                out_dir / "csvs" / f"{name}.csv",
+                out_dir / "csvs" / f"{name}_rewiring.csv",
+            )
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    colors = [to_hex(COLOR_MAP[format(code, "03b")]) for code in range(8)]
+    title = f"{base} (seed {seed})"
+    if is_lattice:
+        node_ids = (
+            np.asarray(history.node_ids) if isinstance(history, NodeHistory)
+            else np.sort(history["node_id"].unique())
+        )
+        generations, strategies = strategy_matrix(history, node_ids, every=args.every)
+        extra = {
+            "lattice_shape": lattice_shape(cfg.num_agents, cfg.lattice_width),
+            "lattice_offsets": neighbor_offsets(cfg.lattice_neighborhood),
+        }
+    else:
+        node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+        generations, strategies = strategy_matrix(history, node_ids, every=args.every)
+        layout = layout_from_topology(cfg.topology) if args.layout == "auto" else args.layout
+        print(f"[INFO] Computing {layout} layout for {len(node_ids)} nodes ...")
+        pos = compute_layout(G, layout)
+        index = {int(n): i for i, n in enumerate(node_ids)}
+        edges = np.array([(index[u], index[v]) for u, v in G.edges], dtype=np.int64).reshape(-1, 2)
+        rewiring = None
+        if rewire_df is not None:
+            rewiring = np.array(
+                [
+                    (g, index[n], index[r], index[a])
+                    for g, n, r, a in rewire_df[["generation", "node_id", "removed", "added"]].itertuples(index=False)
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 4)
+        extra = {
+            "positions": normalize_positions(np.array([pos[n] for n in G.nodes])),
+            "edges": edges,
+            "rewiring": rewiring,
+        }
+    print(f"[INFO] Generations: {generations[0]} .. {generations[-1]} (total {len(generations)} frames)")
+
+    summary = None
+    if summary_df is not None:
+        summary = {
+            m: summary_df[m].reindex(generations).tolist() for m in SUMMARY_METRICS if m in summary_df.columns
+        }
+
+    html = viewer_html(title, node_ids, generations, strategies, colors, summary=summary, **extra)
+    out_path = Path(args.out) if args.out else out_dir / "viewers" / f"{name}.html"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(html, encoding="utf-8")
+    print(f"[SAVE] {out_path} ({len(html.encode()) / 1e6:.2f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
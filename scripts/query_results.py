@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from network_ipd_ga.store import ResultsStore
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Cross-config analysis of final-generation metrics from the results store."
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        default="results/results.sqlite",
+        help="Path to the results store (SQLite).",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        default=["realized_coop_rate"],
+        help="Summary columns to aggregate (default: realized_coop_rate).",
+    )
+    parser.add_argument(
+        "--by",
+        type=str,
+        nargs="+",
+        default=["topology", "meta_influence"],
+        help="Run parameters to group by (default: topology meta_influence).",
+    )
+    parser.add_argument(
+        "--topology",
+        type=str,
+        nargs="*",
+        default=None,
+        help="Restrict to these topologies.",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="If set, save the aggregated table as CSV.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    where = {"topology": args.topology} if args.topology else None
+
+    # 全 config・全 seed の最終世代を 1 クエリで取得
+    with ResultsStore(Path(args.store)) as store:
+        df = store.final_metrics(args.metrics, where=where)
+
+    if df.empty:
+        print(f"[WARN] No runs found in {args.store}")
+        return
+
+    table = df.groupby(args.by)[args.metrics].agg(["mean", "std", "count"])
+    print(table.to_string())
+
+    if args.out is not None:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(out)
+        print(f"[SAVE] {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+
+from network_ipd_ga.work_queue import DEFAULT_HEARTBEAT, DEFAULT_STALE_AFTER, Heartbeat, Job, WorkQueue
+
+# 共有ディレクトリの作業キュー（network_ipd_ga.work_queue）のワーカー。
+#
+# run_all_experiments.py --queue DIR で投入したジョブを 1 つずつ取得し、run_single_experiment.py で実行する。
+# 実行中は claim のハートビートを送り、クラッシュしたワーカーのジョブ（ハートビートが止まったもの）は奪って再実行する。
+# 同じ DIR を共有するホストであれば、どのホストでいくつ起動してもよい：
+#   uv run scripts/queue_worker.py --queue /shared/queue
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Claim and run (config, seed) jobs from a work queue on a shared directory."
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        required=True,
+        help="Queue directory shared by all workers (e.g. on NFS).",
+    )
+    parser.add_argument(
+        "--heartbeat",
+        type=float,
+        default=DEFAULT_HEARTBEAT,
+        help=f"Seconds between heartbeats of a running job (default: {DEFAULT_HEARTBEAT:g}).",
+    )
+    parser.add_argument(
+        "--stale-after",
+        type=float,
+        default=DEFAULT_STALE_AFTER,
+        help=f"Reclaim jobs whose heartbeat is older than this many seconds "
+             f"(default: {DEFAULT_STALE_AFTER:g}; keep it a few times --heartbeat).",
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=10.0,
+        help="Seconds to wait before polling again while other workers are still running jobs (default: 10).",
+    )
+    parser.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="Exit as soon as no job can be claimed (default: wait while other jobs are running, "
+             "in case they go stale).",
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="Print the number of pending / running / stale / done / failed jobs and exit.",
+    )
+    parser.add_argument(
+        "--requeue-failed",
+        action="store_true",
+        help="Make failed jobs claimable again and exit.",
+    )
+    return parser.parse_args()
+
+
+def format_status(status: dict) -> str:
+    return ", ".join(f"{k}={v}" for k, v in status.items())
+
+
+def run_job(queue: WorkQueue, job: Job, heartbeat: float) -> int | None:
+    """
+    ジョブを実行して終了コードを返す。実行中に claim を他のワーカーに奪われたら
+    （このワーカーが stale_after 以上止まっていた）プロセスを止めて None を返す。
+    """
+    cmd = job.command(sys.executable)
+    print(f"[INFO] Running {job.job_id}: {' '.join(cmd)}")
+    proc = subprocess.Popen(cmd, cwd=job.cwd)
+    with Heartbeat(queue, job, interval=heartbeat, on_lost=proc.terminate) as hb:
+        returncode = proc.wait()
+    if hb.lost:
+        print(f"[WARN] Lost the claim of {job.job_id} to another worker; stopped it (exit code {returncode}).")
+        return None
+    return returncode
+
+
+def work(queue: WorkQueue, args: argparse.Namespace) -> None:
+    """ジョブがなくなるまで取得・実行する（--status / --requeue-failed ならそれだけ）。"""
+    if args.status:
+        print(f"[INFO] {format_status(queue.status())}")
+        return
+    if args.requeue_failed:
+        print(f"[INFO] Requeued {queue.requeue_failed()} failed jobs.")
+        return
+
+    print(f"[INFO] Worker {queue.worker_id} on queue {args.queue}")
+    finished = 0
+    while True:
+        job = queue.claim()
+        if job is None:
+            status = queue.status()
+            if args.exit_when_idle or status["running"] + status["stale"] + status["pending"] == 0:
+                break
+            time.sleep(args.poll)
+            continue
+
+        t_start = time.perf_counter()
+        returncode = run_job(queue, job, args.heartbeat)
+        if returncode is None:
+            continue
+        info = {
+            "host": socket.gethostname(),
+            "seconds": time.perf_counter() - t_start,
+            "returncode": returncode,
+        }
+        if not queue.complete(job, ok=returncode == 0, info=info):
+            continue
+        if returncode != 0:
+            print(f"[WARN] {job.job_id} failed with exit code {returncode}.")
+        finished += 1
+
+    print(f"[INFO] No more jobs ({finished} run by this worker): {format_status(queue.status())}")
+
+
+def main() -> None:
+    args = parse_args()
+    with WorkQueue(args.queue, stale_after=args.stale_after) as queue:
+        work(queue, args)
+
+
+if __name__ == "__main__":
+    main()
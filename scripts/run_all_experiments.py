@@ -1,9 +1,117 @@
 #!/usr/bin/env python
 from pathlib import Path
+import argparse
+import os
 import subprocess
+import sys
+
+from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.paired import paired_config, paired_groups
+from network_ipd_ga.seed_allocation import (
+    allocate,
+    final_values_from_csv,
+    final_values_from_store,
+    write_allocation_report,
+)
+from network_ipd_ga.telemetry import SweepProgress, TelemetryServer
+from network_ipd_ga.work_queue import Job, WorkQueue, job_id_for
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run all experiments in configs/exp.")
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If omitted, CSV/pickle files are written.",
+    )
+    parser.add_argument(
+        "--telemetry-port",
+        type=int,
+        default=None,
+        help="If set, serve live sweep progress and per-generation metrics of each run "
+             "on this local port (GET /events as SSE, GET /status).",
+    )
+    parser.add_argument(
+        "--paired",
+        action="store_true",
+        help="Run configs that differ only in meta_influence together per seed, sharing the graph, "
+             "initial strategies and random streams (common random numbers, rng_mode=counter).",
+    )
+
+    # 共有ディレクトリの作業キュー（複数ホストのワーカーで実行）
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="Enqueue the (config, seed) jobs into this shared queue directory instead of running them; "
+             "run scripts/queue_worker.py --queue DIR on any number of hosts to process them.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="With --queue, also start this many local worker processes and wait for them (default: 0).",
+    )
+
+    # 適応的な seed の割り当て（信頼区間の幅で止める）
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Add seeds per config in batches until the confidence interval of the final-generation "
+             "metrics is narrower than --ci-width, or --max-seeds is reached.",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        default=["realized_coop_rate"],
+        help="Final-generation summary metrics whose confidence intervals decide when to stop "
+             "(default: realized_coop_rate).",
+    )
+    parser.add_argument(
+        "--ci-width",
+        type=float,
+        default=0.05,
+        help="Target full width of the confidence interval of the mean (default: 0.05).",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of the interval (default: 0.95).",
+    )
+    parser.add_argument(
+        "--min-seeds",
+        type=int,
+        default=5,
+        help="Seeds in the first batch of each config (default: 5).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5,
+        help="Seeds added per batch (default: 5).",
+    )
+    parser.add_argument(
+        "--max-seeds",
+        type=int,
+        default=50,
+        help="Maximum number of seeds per config (default: 50).",
+    )
+    parser.add_argument(
+        "--allocation-report",
+        type=str,
+        default="results/seed_allocation.csv",
+        help="CSV recording the seeds used and the achieved precision per config and metric "
+             "(default: results/seed_allocation.csv).",
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     # 設定ファイルが入っているディレクトリ
     configs_dir = Path("configs", "exp")  # 必要ならここを "settings" などに変更
 
@@ -17,22 +125,144 @@ def main():
         print(f"[WARN] No .yml files found in {configs_dir.resolve()}")
         return
 
-    for cfg in config_files:
+    # 対応のある実行：meta_influence だけが異なる設定を 1 ジョブ（1 プロセス）にまとめる
+    if args.paired:
+        configs = [load_config(p) for p in config_files]
+        path_of = {id(c): p for c, p in zip(configs, config_files)}
+        jobs = [[path_of[id(c)] for c in group] for group in paired_groups(configs)]
+        print(f"[INFO] Paired mode: {len(config_files)} configs in {len(jobs)} groups")
+    else:
+        jobs = [[p] for p in config_files]
+
+    # 作業キュー：ここでは投入するだけで、実行は各ホストのワーカー（queue_worker.py）が行う
+    if args.queue is not None:
+        if args.adaptive or args.telemetry_port is not None:
+            raise SystemExit("--queue cannot be combined with --adaptive or --telemetry-port.")
+        enqueue_jobs(jobs, seeds, args)
+        return
+
+    # テレメトリ：スイープの進捗はここから、各実行の世代ごとのメトリクスは子プロセスから UDP で送る
+    server = None
+    progress = None
+    if args.telemetry_port is not None:
+        server = TelemetryServer(port=args.telemetry_port).start()
+        # 適応モードでは seed 数が事前に決まらないので上限で数える
+        per_job = args.max_seeds if args.adaptive else len(seeds)
+        progress = SweepProgress(server, total=len(jobs) * per_job)
+        print(f"[INFO] Telemetry: http://127.0.0.1:{args.telemetry_port}/events")
+
+    try:
+        if args.adaptive:
+            run_adaptive(jobs, args, progress)
+        else:
+            run_jobs(jobs, seeds, args, progress)
+    finally:
+        if server is not None:
+            server.close()
+
+
+def run_jobs(jobs, seeds, args: argparse.Namespace, progress: SweepProgress | None) -> None:
+    for job_configs in jobs:
         for seed in seeds:
-            cmd = [
-                "uv",
-                "run",
-                "scripts/run_single_experiment.py",
-                "--config",
-                str(cfg),
-                "--seed",
-                str(seed),
-                "--log-level",
-                "ERROR"
-            ]
-            print(f"[INFO] Running: {' '.join(cmd)}")
-            # エラー時に止めたい場合は check=True
-            subprocess.run(cmd, check=True)
+            run_job(job_configs, seed, args, progress)
+
+
+def enqueue_jobs(jobs, seeds, args: argparse.Namespace) -> None:
+    """ジョブを共有ディレクトリの作業キューに投入し、--workers 個のローカルワーカーを起動する。"""
+    options = ["--store", args.store] if args.store is not None else []
+    added = WorkQueue(args.queue).enqueue([
+        Job(job_id=job_id_for(job_configs, seed), configs=[str(c) for c in job_configs],
+            seed=seed, options=options, cwd=os.getcwd())
+        for job_configs in jobs
+        for seed in seeds
+    ])
+    print(f"[INFO] Enqueued {added} jobs into {args.queue} ({len(jobs) * len(seeds) - added} already queued)")
+
+    if args.workers <= 0:
+        print(f"[INFO] Start workers with: uv run scripts/queue_worker.py --queue {args.queue}")
+        return
+    cmd = [sys.executable, "scripts/queue_worker.py", "--queue", args.queue]
+    workers = [subprocess.Popen(cmd) for _ in range(args.workers)]
+    failed = sum(w.wait() != 0 for w in workers)
+    with WorkQueue(args.queue) as queue:
+        status = queue.status()
+    print(f"[INFO] Workers finished: done={status['done']}, failed={status['failed']}")
+    if failed or status["failed"]:
+        raise SystemExit(1)
+
+
+def run_adaptive(jobs, args: argparse.Namespace, progress: SweepProgress | None) -> None:
+    """
+    ジョブ（設定, --paired なら設定のグループ）ごとに seed をバッチで追加し、
+    全設定・全メトリクスの信頼区間の幅が --ci-width 以下になるか --max-seeds に達したら次へ進む。
+    使った seed と達成した精度は --allocation-report に書き出す。
+    """
+    allocations = []
+    for job_configs in jobs:
+        configs = [load_config(p) for p in job_configs]
+        if args.paired:
+            configs = [paired_config(c) for c in configs]
+        seeds: list[int] = []
+        while True:
+            batch = args.min_seeds if not seeds else args.batch_size
+            batch_seeds = range(len(seeds), min(len(seeds) + batch, args.max_seeds))
+            for seed in batch_seeds:
+                run_job(job_configs, seed, args, progress)
+            seeds += batch_seeds
+
+            rows = []
+            for path, cfg in zip(job_configs, configs):
+                if args.store is not None:
+                    values = final_values_from_store(Path(args.store), cfg, seeds, args.metrics)
+                else:
+                    values = final_values_from_csv(cfg, seeds, args.metrics)
+                rows += allocate(cfg, path.stem, seeds, values, args.ci_width, args.confidence)
+            widest = max(rows, key=lambda r: r.ci_width)
+            print(f"[INFO] {'+'.join(p.stem for p in job_configs)}: {len(seeds)} seeds, "
+                  f"widest CI {widest.ci_width:.4f} ({widest.config}, {widest.metric}), "
+                  f"target {args.ci_width}")
+            if all(r.converged for r in rows) or len(seeds) >= args.max_seeds:
+                break
+        if not all(r.converged for r in rows):
+            print(f"[WARN] Seed budget ({args.max_seeds}) reached before the target CI width.")
+        allocations += rows
+
+    report = Path(args.allocation_report)
+    write_allocation_report(report, allocations)
+    print(f"[SAVE] {report}")
+
+
+def run_job(job_configs, seed: int, args: argparse.Namespace, progress: SweepProgress | None) -> None:
+    """1 ジョブ（設定 or 対応のある設定のグループ）× 1 seed を子プロセスで実行する。"""
+    cmd = [
+        "uv",
+        "run",
+        "scripts/run_single_experiment.py",
+        "--config",
+        *map(str, job_configs),
+        "--seed",
+        str(seed),
+        "--log-level",
+        "ERROR"
+    ]
+    if args.store is not None:
+        cmd += ["--store", args.store]
+    if progress is not None:
+        cmd += ["--telemetry-target", f"127.0.0.1:{args.telemetry_port}"]
+    print(f"[INFO] Running: {' '.join(cmd)}")
+
+    job = f"{'+'.join(c.stem for c in job_configs)}_seed{seed:04d}"
+    if progress is not None:
+        progress.job_started(job)
+    try:
+        # エラー時に止めたい場合は check=True
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError:
+        if progress is not None:
+            progress.job_finished(job, ok=False)
+        raise
+    if progress is not None:
+        progress.job_finished(job)
 
 
 if __name__ == "__main__":
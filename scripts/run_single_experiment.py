@@ -4,10 +4,26 @@ import argparse
 import logging
 from pathlib import Path
 import pickle
-from typing import List
-
-from network_ipd_ga.config_loader import load_config
-from network_ipd_ga.simulation import run_simulation
+from typing import List, Tuple
+
+from network_ipd_ga.config_loader import SimulationConfig, load_config
+from network_ipd_ga.graph import as_networkx
+from network_ipd_ga.history import DEFAULT_KEYFRAME_INTERVAL, HISTORY_SUFFIX
+from network_ipd_ga.paired import PairedSinks, iter_paired_simulation, paired_config, paired_key
+from network_ipd_ga.simulation import build_graph, iter_simulation
+from network_ipd_ga.sinks import (
+    DataFrameSink,
+    NodeCSVSink,
+    NodeHistorySink,
+    RewireCSVSink,
+    Sink,
+    StoreSink,
+    SummaryCSVSink,
+    ThreadedSink,
+    run_sinks,
+)
+from network_ipd_ga.store import ResultsStore
+from network_ipd_ga.telemetry import TelemetryServer, TelemetrySink, UDPPublisher, parse_address
 
 # ---------------------------------------
 # ログレベル文字列を logging レベルに変換
@@ -57,12 +73,14 @@ def parse_args() -> argparse.Namespace:
         description="Run a single IPD evolution experiment using a YAML config and a seed."
     )
 
-    # 設定ファイルのパス
+    # 設定ファイルのパス（複数なら meta_influence の対応のある実行）
     parser.add_argument(
         "--config",
         type=str,
+        nargs="+",
         required=True,
-        help="Path to the YAML configuration file.",
+        help="Path to the YAML configuration file. With several configs that differ only in "
+             "meta_influence, run them as one paired run with common random numbers.",
     )
 
     # 乱数シード（必須）
@@ -88,68 +106,249 @@ def parse_args() -> argparse.Namespace:
         help="Logging level: DEBUG, INFO, WARNING, ERROR, CRITICAL (default: INFO)",
     )
 
+    # 結果ストア（SQLite）に保存する場合のパス
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Path to the results store (SQLite). If set, results are written there "
+             "instead of CSV/pickle files.",
+    )
+
+    # ノード履歴の保存形式
+    parser.add_argument(
+        "--node-history",
+        type=str,
+        choices=["csv", "delta"],
+        default="csv",
+        help="Node history format: csv (<base>_nodes.csv, default) or delta "
+             "(keyframes + sparse changes in histories/<base>.nhist).",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=DEFAULT_KEYFRAME_INTERVAL,
+        help=f"Generations between full keyframes in delta node history / store "
+             f"(default: {DEFAULT_KEYFRAME_INTERVAL}).",
+    )
+
+    # ライブテレメトリ（世代ごとのメトリクス・処理時間）
+    parser.add_argument(
+        "--telemetry-port",
+        type=int,
+        default=None,
+        help="If set, serve live telemetry on this local port (GET /events as SSE, GET /status).",
+    )
+    parser.add_argument(
+        "--telemetry-target",
+        type=str,
+        default=None,
+        help="Send telemetry events via UDP to a running telemetry server (host:port), "
+             "e.g. the one started by run_all_experiments.py --telemetry-port.",
+    )
+
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
+def start_telemetry_server(args: argparse.Namespace) -> TelemetryServer | None:
+    """--telemetry-port が指定されていればテレメトリサーバを起動する（閉じるのは呼び出し側）。"""
+    if args.telemetry_port is None:
+        return None
+    return TelemetryServer(port=args.telemetry_port).start()
 
-    # 設定ファイル読み込み
-    cfg = load_config(Path(args.config))
 
-    # シミュレーション実行
-    df, graph, agents, node_df = run_simulation(
-        topology=cfg.topology,
-        num_agents=cfg.num_agents,
-        generations=cfg.generations,
-        T=cfg.T,
-        mutation_rate=cfg.mutation_rate,
-        small_world_k=cfg.small_world_k,
-        small_world_p=cfg.small_world_p,
-        scale_free_m=cfg.scale_free_m,
-        meta_influence=cfg.meta_influence,
-        seed=args.seed,
-    )
+def make_telemetry_sinks(
+    args: argparse.Namespace, run: str, server: TelemetryServer | None
+) -> List[TelemetrySink]:
+    """
+    --telemetry-port / --telemetry-target に応じたテレメトリ sink を作る。
+    server は start_telemetry_server で起動したもの（対の実行では全設定で 1 つを共有する）。
+    """
+    sinks = []
+    if server is not None:
+        sinks.append(TelemetrySink(server, run))
+    if args.telemetry_target is not None:
+        sinks.append(TelemetrySink(UDPPublisher(*parse_address(args.telemetry_target)), run, close_publisher=True))
+    return sinks
+
+
+def format_summary_head(records: List[dict], n: int = 5) -> str:
+    """世代サマリの先頭 n 行を表形式の文字列にする（表示のためだけに pandas を読み込まない）。"""
+    if not records:
+        return "(no generations)"
+    columns = list(records[0])
+    rows = [[str(i)] + [f"{r[c]:.6g}" if isinstance(r[c], float) else str(r[c]) for c in columns]
+            for i, r in enumerate(records[:n])]
+    header = [""] + columns
+    widths = [max(len(h), *(len(row[k]) for row in rows)) for k, h in enumerate(header)]
+    lines = [" ".join(h.rjust(w) for h, w in zip(header, widths))]
+    lines += [" ".join(v.rjust(w) for v, w in zip(row, widths)) for row in rows]
+    return "\n".join(lines)
+
+
+def make_output_sinks(
+    cfg: SimulationConfig, seed: int, graph, args: argparse.Namespace
+) -> Tuple[List[Sink], List[str]]:
+    """
+    1 実行分の出力 sink（結果ストア or CSV / pickle）を作る。
+    戻り値: (sink のリスト, 実行後にログに出す保存先のメッセージ)
+    """
+    if args.store is not None:
+        # 結果ストアへ保存（(config_hash, seed) をキーに上書き）
+        # sqlite3 の接続は書き込みスレッド内で作る
+
+        def make_store_sink() -> StoreSink:
+            return StoreSink(
+                ResultsStore(Path(args.store)),
+                cfg,
+                seed,
+                graph,
+                close_store=True,
+                keyframe_interval=args.keyframe_interval,
+            )
+
+        return [ThreadedSink(factory=make_store_sink)], [
+            f"Saved results to store: {Path(args.store).resolve()} "
+            f"(config_hash={cfg.config_hash()}, seed={seed})"
+        ]
 
     # メイン出力ファイル名決定（世代サマリ）
-    summary_fname = f"{cfg.output_base}_seed{args.seed:04d}.csv"
+    summary_fname = f"{cfg.output_base}_seed{seed:04d}.csv"
     summary_path = cfg.output_dir / "csvs" / summary_fname
 
     # ノード履歴とグラフのファイル名
-    node_fname = f"{cfg.output_base}_seed{args.seed:04d}_nodes.csv"
-    node_path = cfg.output_dir / "csvs" / node_fname
+    if args.node_history == "delta":
+        node_fname = f"{cfg.output_base}_seed{seed:04d}{HISTORY_SUFFIX}"
+        node_path = cfg.output_dir / "histories" / node_fname
+    else:
+        node_fname = f"{cfg.output_base}_seed{seed:04d}_nodes.csv"
+        node_path = cfg.output_dir / "csvs" / node_fname
 
-    graph_fname = f"{cfg.output_base}_seed{args.seed:04d}_graph.pickle"
+    graph_fname = f"{cfg.output_base}_seed{seed:04d}_graph.pickle"
     graph_path = cfg.output_dir / "pickles" / graph_fname
 
-    # 親ディレクトリ作成
-    summary_path.parent.mkdir(parents=True, exist_ok=True)
-    node_path.parent.mkdir(parents=True, exist_ok=True)
-    graph_path.parent.mkdir(parents=True, exist_ok=True)
+    # グラフ保存（ネットワーク構造）。保存形式は従来どおり networkx のグラフにする
+    # （pickle を読む側が本パッケージなしで使えるように。シミュレーション本体は networkx を使わない）
+    # （well_mixed・lattice はグラフを持たないので保存しない）
+    if graph is not None:
+        graph_path.parent.mkdir(parents=True, exist_ok=True)
+        with graph_path.open("wb") as f:
+            pickle.dump(as_networkx(graph), f)
+
+    # CSV 保存（世代サマリ・ノード履歴）。書き込みは別スレッドで計算と並行して行う
+    if args.node_history == "delta":
+        node_sink = NodeHistorySink(node_path, keyframe_interval=args.keyframe_interval)
+    else:
+        node_sink = NodeCSVSink(node_path)
+    sinks: List[Sink] = [ThreadedSink(SummaryCSVSink(summary_path)), ThreadedSink(node_sink)]
 
-    # CSV 保存（世代サマリ）
-    df.to_csv(summary_path, index=False)
+    # 共進化モードでは再結線イベントも保存（初期グラフ + イベントで各世代のネットワークを復元）
+    if cfg.rewire_rate > 0:
+        rewire_path = cfg.output_dir / "csvs" / f"{cfg.output_base}_seed{seed:04d}_rewiring.csv"
+        sinks.append(RewireCSVSink(rewire_path))
+        logging.info(f"Rewiring events will be saved to: {rewire_path.resolve()}")
 
-    # CSV 保存（ノード履歴）
-    node_df.to_csv(node_path, index=False)
+    saved = [f"Saved summary to: {summary_path.resolve()}", f"Saved node history to: {node_path.resolve()}"]
+    if graph is not None:
+        saved.append(f"Saved graph to: {graph_path.resolve()}")
+    return sinks, saved
 
-    # グラフ保存（ネットワーク構造）
-    with graph_path.open("wb") as f:
-        pickle.dump(graph, f)
 
-    logging.info(f"Saved summary to: {summary_path.resolve()}")
-    logging.info(f"Saved node history to: {node_path.resolve()}")
-    logging.info(f"Saved graph to: {graph_path.resolve()}")
+def run_paired(configs: List[SimulationConfig], args: argparse.Namespace) -> None:
+    """
+    meta_influence だけが異なる設定を、同じグラフ・初期戦略・乱数で 1 プロセスでまとめて実行する
+    （paired.py）。各設定の結果は単独の実行と同じ形式で、設定ごとの出力先に保存する。
+    """
+    configs = [paired_config(c) for c in configs]
+    if len({paired_key(c) for c in configs}) != 1:
+        raise ValueError("Paired configs must differ only in meta_influence.")
+    cfg = configs[0]
+    logging.info(f"Paired run (common random numbers): meta_influence={[c.meta_influence for c in configs]}")
 
-    for k, v in cfg.as_dict().items():
-        print(f"{k}: {v}")
-    print(df.head())
+    graph = build_graph(
+        topology=cfg.topology,
+        num_agents=cfg.num_agents,
+        seed=args.seed,
+        small_world_k=cfg.small_world_k,
+        small_world_p=cfg.small_world_p,
+        scale_free_m=cfg.scale_free_m,
+    )
+    kwargs = cfg.simulation_kwargs()
+    kwargs.pop("meta_influence")
+    snapshots = iter_paired_simulation(
+        [c.meta_influence for c in configs], **kwargs, seed=args.seed, graph=graph
+    )
+
+    summaries = []
+    sinks_per_run = []
+    saved = []
+    server = start_telemetry_server(args)
+    try:
+        for c in configs:
+            summary = DataFrameSink(record_nodes=False)
+            sinks, messages = make_output_sinks(c, args.seed, graph, args)
+            telemetry = make_telemetry_sinks(args, f"{c.output_base}_seed{args.seed:04d}", server)
+            summaries.append(summary)
+            sinks_per_run.append([summary, *sinks, *telemetry])
+            saved += messages
+        run_sinks(snapshots, [PairedSinks(sinks_per_run)])
+    finally:
+        if server is not None:
+            server.close()
+
+    for message in saved:
+        logging.info(message)
+    for c, summary in zip(configs, summaries):
+        print(f"--- {c.output_base} (meta_influence={c.meta_influence}) ---")
+        print(format_summary_head(summary.records))
+
+
+def main() -> None:
+    args = parse_args()
+
+    # 設定ファイル読み込み
+    configs = [load_config(Path(p)) for p in args.config]
+    if len(configs) > 1:
+        run_paired(configs, args)
+        return
+    cfg = configs[0]
+
+    # ネットワーク生成（グラフは先に保存し、世代ごとの結果は逐次書き出す）
+    graph = build_graph(
+        topology=cfg.topology,
+        num_agents=cfg.num_agents,
+        seed=args.seed,
+        small_world_k=cfg.small_world_k,
+        small_world_p=cfg.small_world_p,
+        scale_free_m=cfg.scale_free_m,
+    )
+
+    # シミュレーション（1 世代ずつ生成されるスナップショット）
+    snapshots = iter_simulation(**cfg.simulation_kwargs(), seed=args.seed, graph=graph)
+
+    # 表示用に世代サマリだけはメモリに保持する（ノード履歴は保持しない）
+    summary = DataFrameSink(record_nodes=False)
+    server = start_telemetry_server(args)
+    try:
+        telemetry = make_telemetry_sinks(args, f"{cfg.output_base}_seed{args.seed:04d}", server)
+        sinks, saved = make_output_sinks(cfg, args.seed, graph, args)
+        run_sinks(snapshots, [summary, *sinks, *telemetry])
+    finally:
+        if server is not None:
+            server.close()
+
+    for message in saved:
+        logging.info(message)
+    if args.store is None:
+        for k, v in cfg.as_dict().items():
+            print(f"{k}: {v}")
+    print(format_summary_head(summary.records))
 
 
 if __name__ == "__main__":
     # ロギング初期化
     args = parse_args()
-    cfg = load_config(Path(args.config))
+    cfg = load_config(Path(args.config[0]))
 
     # ログレベルを整数値に変換
     log_level = to_loglevel(args.log_level)
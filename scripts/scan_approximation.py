@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from network_ipd_ga.config_loader import load_config
+from network_ipd_ga.mean_field import (
+    APPROXIMATION_METHODS,
+    DEFAULT_MAX_DEGREE_CLASSES,
+    degree_classes,
+    scan_approximation,
+    topology_degrees,
+)
+from network_ipd_ga.selection import Selection
+
+# 平均場・ペア近似（network_ipd_ga.mean_field）による meta_influence × mutation_rate の走査。
+#
+# 設定ファイルのトポロジー（seed から生成したグラフの次数構造）・T・世代数・選択演算子を使い、
+# 格子状のパラメータ点の近似の軌跡をまとめて計算して、run_simulation のサマリと同じ列の CSV に保存する。
+#   uv run scripts/scan_approximation.py --config configs/exp/small_world_meta00.yml \
+#       --meta-influence 0 1 101 --mutation-rate 0 0.05 51
+# 近似は定性的な傾向を見るためのもので、気になる点はエージェントの実行で確認する。
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Scan meta_influence x mutation_rate with the mean-field / pair approximation."
+    )
+    parser.add_argument("--config", type=str, required=True, help="Base YAML config (topology, T, generations, ...).")
+    parser.add_argument(
+        "--method",
+        type=str,
+        default="mean_field",
+        choices=APPROXIMATION_METHODS,
+        help="mean_field (degree classes, default) or pair (pair approximation, mean degree; "
+             "overestimates cooperation at intermediate meta_influence).",
+    )
+    parser.add_argument(
+        "--meta-influence",
+        type=float,
+        nargs="+",
+        default=None,
+        help="One value, or START STOP NUM for a linear grid (default: the config's value).",
+    )
+    parser.add_argument(
+        "--mutation-rate",
+        type=float,
+        nargs="+",
+        default=None,
+        help="One value, or START STOP NUM for a linear grid (default: the config's value).",
+    )
+    parser.add_argument("--generations", type=int, default=None, help="Override generations.")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the graph whose degree structure is used (default: 0).",
+    )
+    parser.add_argument(
+        "--max-degree-classes",
+        type=int,
+        default=DEFAULT_MAX_DEGREE_CLASSES,
+        help=f"Bin degrees into at most this many classes (mean_field) (default: {DEFAULT_MAX_DEGREE_CLASSES}).",
+    )
+    parser.add_argument(
+        "--all-generations",
+        action="store_true",
+        help="Save every generation (default: only the final generation of each point).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=32,
+        help="Number of parameter points computed together, each as 8 initial-meta branches (default: 32).",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="Output CSV (default: <output_dir>/approximation/<output_base>_<method>.csv).",
+    )
+    return parser.parse_args()
+
+
+def parse_grid(values: list[float] | None, default: float, name: str) -> np.ndarray:
+    """1 つの値, または START STOP NUM の等間隔の格子。"""
+    if values is None:
+        return np.array([default])
+    if len(values) == 1:
+        return np.array(values)
+    if len(values) == 3 and values[2] >= 1 and float(values[2]).is_integer():
+        return np.linspace(values[0], values[1], int(values[2]))
+    raise ValueError(f"--{name} takes one value or START STOP NUM (got {values}).")
+
+
+def main() -> int:
+    args = parse_args()
+    cfg = load_config(Path(args.config))
+    try:
+        meta = parse_grid(args.meta_influence, cfg.meta_influence, "meta-influence")
+        mutation = parse_grid(args.mutation_rate, cfg.mutation_rate, "mutation-rate")
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 2
+    if cfg.update_mode != "sync" or cfg.rewire_rate > 0:
+        print("[WARN] The approximation models synchronous updates on a fixed network; "
+              "update_mode / rewiring in the config are ignored.")
+
+    degrees = topology_degrees(
+        cfg.topology,
+        cfg.num_agents,
+        args.seed,
+        cfg.small_world_k,
+        cfg.small_world_p,
+        cfg.scale_free_m,
+        cfg.lattice_neighborhood,
+    )
+    classes = degree_classes(degrees, args.max_degree_classes)
+    print(
+        f"[INFO] {cfg.topology}: mean degree {classes.mean_degree:.2f}, "
+        f"{len(classes.degrees)} degree classes {classes.degrees.tolist()}"
+    )
+
+    meta_grid, mutation_grid = np.meshgrid(meta, mutation, indexing="ij")
+    generations = args.generations if args.generations is not None else cfg.generations
+    t_start = time.perf_counter()
+    df = scan_approximation(
+        meta_grid.ravel(),
+        mutation_grid.ravel(),
+        classes,
+        T=cfg.T,
+        generations=generations,
+        num_agents=cfg.num_agents,
+        method=args.method,
+        selection=Selection(cfg.selection, k=cfg.tournament_k, temperature=cfg.fermi_temperature),
+        final_only=not args.all_generations,
+        chunk_size=args.chunk_size,
+    )
+    print(
+        f"[INFO] {meta_grid.size} points x {generations} generations ({args.method}) "
+        f"in {time.perf_counter() - t_start:.2f}s"
+    )
+
+    out = Path(args.out) if args.out else cfg.output_dir / "approximation" / f"{cfg.output_base}_{args.method}.csv"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False)
+    print(f"[SAVE] {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
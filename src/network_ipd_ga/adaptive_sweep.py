@@ -0,0 +1,366 @@
+# adaptive_sweep.py
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from itertools import product
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Sequence, Tuple
+import csv
+import math
+
+from network_ipd_ga.config_loader import SimulationConfig
+
+if TYPE_CHECKING:
+    from network_ipd_ga.shared_graph import SharedGraph
+
+# パラメータ空間の適応的な探索（scripts/adaptive_sweep.py）。
+#
+# 固定の格子（generate_configs.py の META_VALUES など）は大半の点が平坦な領域に落ち、
+# 協調の転移は格子点の間に埋もれる。ここでは探索範囲を直方体のセルに分け、
+#   1. 粗い格子（各軸 levels 点）の全点を seeds_per_point 個の seed で実行する
+#   2. 各セルについて、軸に平行な辺の両端で最終世代のメトリクスの平均がどれだけ変わるか
+#      （メトリクスごとにこれまでの観測範囲で正規化）を調べる
+#   3. 変化が tolerance 以上のセルを「変化 × その軸のセル幅（範囲に対する割合）」の大きい順に選び、
+#      変化の最も大きい軸で 2 等分する（新しい点は分割面上の頂点だけ）
+# を、実行回数（点 × seed）の予算を使い切るか、分割すべきセルがなくなるまで繰り返す。
+# セル幅の重みにより、予算は 1 つの転移の掘り下げだけでなく境界全体に配られる。
+# 幅が resolution（範囲に対する割合）未満の軸と、整数の軸で隣り合う値の間は分割しない。
+#
+# 並列実行（workers > 1）では、同じグラフ（topology・グラフのパラメータ・seed が同じ実行）を
+# 親プロセスで 1 回だけ作って共有し（shared_graph.SharedGraph）、ワーカーは読み取り専用で接続する。
+# seed は全ての点で共通なので、グラフを探索しない限りグラフは seeds_per_point 個で済む。
+
+DEFAULT_METRICS = ("realized_coop_rate", "diversity")
+
+_SPATIAL_METRICS = (
+    "same_strategy_edge_frac",
+    "strategy_assortativity",
+    "num_clusters",
+    "max_cluster_size",
+    "mean_cluster_size",
+)
+
+# 探索できるパラメータ（SimulationConfig の数値フィールド）と整数かどうか
+AXIS_TYPES = {f.name: f.type == "int" for f in fields(SimulationConfig) if f.type in ("int", "float")}
+
+Point = Tuple[float, ...]
+
+
+@dataclass(frozen=True)
+class Axis:
+    """探索する 1 つのパラメータと範囲。"""
+
+    name: str
+    low: float
+    high: float
+
+    def __post_init__(self) -> None:
+        if self.name not in AXIS_TYPES:
+            raise ValueError(f"Cannot sweep {self.name!r} (choose from {sorted(AXIS_TYPES)}).")
+        if not self.low < self.high:
+            raise ValueError(f"Empty range for {self.name}: {self.low} .. {self.high}")
+
+    @property
+    def integer(self) -> bool:
+        return AXIS_TYPES[self.name]
+
+    def grid(self, levels: int) -> List[float]:
+        """初期格子の値（整数の軸は丸めて重複を除く）。"""
+        values = [self.low + (self.high - self.low) * i / (levels - 1) for i in range(levels)]
+        if self.integer:
+            values = sorted({float(round(v)) for v in values})
+        return values
+
+    def midpoint(self, a: float, b: float, resolution: float) -> float | None:
+        """a, b の間の分割点。幅が resolution 未満・整数の軸で間に値がなければ None。"""
+        if (b - a) / (self.high - self.low) < resolution:
+            return None
+        mid = (a + b) / 2
+        if self.integer:
+            mid = float(round(mid))
+            if not a < mid < b:
+                return None
+        return mid
+
+
+@dataclass
+class Cell:
+    """探索範囲の直方体（各軸の下端・上端）。"""
+
+    lows: Point
+    highs: Point
+
+    def corners(self) -> List[Point]:
+        return list(product(*zip(self.lows, self.highs)))
+
+    def split(self, axis: int, mid: float) -> Tuple[Cell, Cell]:
+        lower = Cell(self.lows, self.highs[:axis] + (mid,) + self.highs[axis + 1 :])
+        upper = Cell(self.lows[:axis] + (mid,) + self.lows[axis + 1 :], self.highs)
+        return lower, upper
+
+    def split_points(self, axis: int, mid: float) -> List[Point]:
+        """axis で mid に分割したときに新しく必要になる頂点。"""
+        return [c[:axis] + (mid,) + c[axis + 1 :] for c in self.corners() if c[axis] == self.lows[axis]]
+
+
+@dataclass
+class Sample:
+    """1 点の実行結果（seed ごとの最終世代のメトリクス）。"""
+
+    point: Point
+    round: int
+    values: Dict[str, List[float]] = field(default_factory=dict)
+
+    def mean(self, metric: str) -> float:
+        vals = [v for v in self.values.get(metric, []) if not math.isnan(v)]
+        return sum(vals) / len(vals) if vals else float("nan")
+
+    def std(self, metric: str) -> float:
+        vals = [v for v in self.values.get(metric, []) if not math.isnan(v)]
+        if len(vals) < 2:
+            return float("nan")
+        m = sum(vals) / len(vals)
+        return math.sqrt(sum((v - m) ** 2 for v in vals) / (len(vals) - 1))
+
+
+def final_metrics(
+    kwargs: dict, seed: int, metrics: Sequence[str], graph_path: str | None = None
+) -> Dict[str, float]:
+    """
+    1 回のシミュレーションを最後まで進め、最終世代のメトリクスを返す（プロセスプールからも呼ぶ）。
+    graph_path は共有グラフ（shared_graph.SharedGraph.path）で、あれば作り直さずに接続して使う。
+    """
+    from network_ipd_ga.simulation import iter_simulation
+
+    if graph_path is not None:
+        from network_ipd_ga.shared_graph import attached_graph
+
+        kwargs = {**kwargs, "graph": attached_graph(graph_path)}
+    spatial = any(m in _SPATIAL_METRICS for m in metrics)
+    last = None
+    for last in iter_simulation(**kwargs, seed=seed, spatial_metrics=spatial):
+        pass
+    return {m: float(last.metrics[m]) for m in metrics}
+
+
+def _run_job(job: Tuple[dict, int, Sequence[str], str | None]) -> Dict[str, float]:
+    return final_metrics(*job)
+
+
+class AdaptiveSweep:
+    """
+    ベース設定の一部のパラメータ（axes）を適応的に探索する。
+    budget はシミュレーションの実行回数（点の数 × seeds_per_point）の上限。
+    share_graphs=True なら並列実行のグラフをワーカー間で共有する（終わったら close() で解放）。
+    """
+
+    def __init__(
+        self,
+        cfg: SimulationConfig,
+        axes: Sequence[Axis],
+        metrics: Sequence[str] = DEFAULT_METRICS,
+        seeds_per_point: int = 3,
+        budget: int = 300,
+        levels: int = 3,
+        tolerance: float = 0.1,
+        resolution: float = 1 / 64,
+        workers: int = 1,
+        share_graphs: bool = True,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        if levels < 2:
+            raise ValueError(f"levels must be >= 2 (got {levels}).")
+        self.cfg = cfg
+        self.axes = list(axes)
+        self.metrics = list(metrics)
+        self.seeds = list(range(seeds_per_point))
+        self.budget = budget
+        self.levels = levels
+        self.tolerance = tolerance
+        self.resolution = resolution
+        self.workers = workers
+        self.share_graphs = share_graphs
+        self.log = log
+        self._shared: Dict[str, SharedGraph] = {}
+        self.samples: Dict[Point, Sample] = {}
+        self.cells: List[Cell] = []
+        self.runs = 0
+
+    # --- 実行 -----------------------------------------------------------------
+    def _kwargs(self, point: Point) -> dict:
+        kwargs = self.cfg.simulation_kwargs()
+        for axis, value in zip(self.axes, point):
+            kwargs[axis.name] = int(value) if axis.integer else value
+        return kwargs
+
+    def _graph_path(self, kwargs: dict, seed: int) -> str | None:
+        """kwargs, seed の実行のグラフを共有し、その場所を返す（共有しない実行は None）。"""
+        if kwargs["topology"] in ("well_mixed", "lattice") or kwargs.get("rewire_rate", 0.0) > 0:
+            return None
+        from network_ipd_ga.shared_graph import SharedGraph, graph_key
+        from network_ipd_ga.simulation import build_graph
+
+        params = {
+            name: kwargs[name]
+            for name in ("topology", "num_agents", "small_world_k", "small_world_p", "scale_free_m")
+        }
+        key = graph_key(seed=seed, **params)
+        if key not in self._shared:
+            self._shared[key] = SharedGraph.publish(build_graph(seed=seed, **params), key)
+        return str(self._shared[key].path)
+
+    def close(self) -> None:
+        """共有したグラフの参照を外す（最後の参照ならファイルを削除する）。"""
+        for shared in self._shared.values():
+            shared.release()
+        self._shared.clear()
+
+    def evaluate(self, points: Iterable[Point], round_: int) -> None:
+        """未実行の点を全 seed で実行する（workers > 1 ならプロセスプールで並列）。"""
+        points = [p for p in dict.fromkeys(points) if p not in self.samples]
+        parallel = self.workers > 1 and len(points) * len(self.seeds) > 1
+        jobs = []
+        for p in points:
+            kwargs = self._kwargs(p)
+            for seed in self.seeds:
+                path = self._graph_path(kwargs, seed) if parallel and self.share_graphs else None
+                jobs.append((kwargs, seed, self.metrics, path))
+        if parallel:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_run_job, jobs))
+        else:
+            results = [_run_job(job) for job in jobs]
+        for i, p in enumerate(points):
+            per_seed = results[i * len(self.seeds) : (i + 1) * len(self.seeds)]
+            self.samples[p] = Sample(p, round_, {m: [r[m] for r in per_seed] for m in self.metrics})
+        self.runs += len(jobs)
+
+    # --- セルの評価 -------------------------------------------------------------
+    def _scales(self) -> Dict[str, float]:
+        """各メトリクスのこれまでの観測範囲（正規化用）。"""
+        scales = {}
+        for m in self.metrics:
+            means = [s.mean(m) for s in self.samples.values()]
+            means = [v for v in means if not math.isnan(v)]
+            scales[m] = max(means) - min(means) if means else 0.0
+        return scales
+
+    def jump(self, cell: Cell, axis: int, scales: Dict[str, float]) -> float:
+        """axis に平行なセルの辺の両端での、正規化したメトリクスの変化の最大値。"""
+        best = 0.0
+        for lo in cell.corners():
+            if lo[axis] != cell.lows[axis]:
+                continue
+            hi = lo[:axis] + (cell.highs[axis],) + lo[axis + 1 :]
+            for m, scale in scales.items():
+                if scale > 0:
+                    d = abs(self.samples[hi].mean(m) - self.samples[lo].mean(m)) / scale
+                    if not math.isnan(d):
+                        best = max(best, d)
+        return best
+
+    def candidates(self) -> List[Tuple[float, float, int, Cell, float]]:
+        """
+        分割候補 (優先度, 変化, 軸, セル, 分割点) を優先度の降順に返す。
+        セルごとに、分割できる軸のうち変化の最も大きい軸を選ぶ。
+        """
+        scales = self._scales()
+        out = []
+        for cell in self.cells:
+            best = None
+            for i, axis in enumerate(self.axes):
+                mid = axis.midpoint(cell.lows[i], cell.highs[i], self.resolution)
+                if mid is None:
+                    continue
+                j = self.jump(cell, i, scales)
+                if j >= self.tolerance and (best is None or j > best[1]):
+                    width = (cell.highs[i] - cell.lows[i]) / (axis.high - axis.low)
+                    best = (j * width, j, i, cell, mid)
+            if best is not None:
+                out.append(best)
+        out.sort(key=lambda c: -c[0])
+        return out
+
+    # --- 探索 -----------------------------------------------------------------
+    def run(self, batch: int = 8) -> None:
+        """粗い格子から始めて、予算の範囲でセルの分割を繰り返す。batch: 1 ラウンドで分割するセルの数の上限。"""
+        try:
+            self._run(batch)
+        finally:
+            self.close()
+
+    def _run(self, batch: int) -> None:
+        grids = [axis.grid(self.levels) for axis in self.axes]
+        initial = list(product(*grids))
+        if len(initial) * len(self.seeds) > self.budget:
+            raise ValueError(
+                f"The initial grid needs {len(initial) * len(self.seeds)} runs, over the budget of {self.budget}."
+            )
+        self.cells = [
+            Cell(tuple(g[i] for g, i in zip(grids, idx)), tuple(g[i + 1] for g, i in zip(grids, idx)))
+            for idx in product(*[range(len(g) - 1) for g in grids])
+        ]
+        self.evaluate(initial, 0)
+        self.log(f"[INFO] Round 0: {len(initial)} grid points, {self.runs}/{self.budget} runs")
+
+        round_ = 0
+        while True:
+            candidates = self.candidates()
+            if not candidates:
+                self.log("[INFO] No cell changes by more than the tolerance; stopping.")
+                break
+            # 予算に収まるだけ、優先度の高いセルから分割する（共有する新しい頂点は 1 回だけ数える）
+            chosen, new_points = [], {}
+            for _, _, axis, cell, mid in candidates[:batch]:
+                pts = [p for p in cell.split_points(axis, mid) if p not in self.samples and p not in new_points]
+                if self.runs + (len(new_points) + len(pts)) * len(self.seeds) > self.budget:
+                    break
+                chosen.append((cell, axis, mid))
+                new_points.update(dict.fromkeys(pts))
+            if not chosen:
+                self.log("[INFO] Run budget exhausted.")
+                break
+            round_ += 1
+            self.evaluate(new_points, round_)
+            for cell, axis, mid in chosen:
+                self.cells.remove(cell)
+                self.cells.extend(cell.split(axis, mid))
+            self.log(
+                f"[INFO] Round {round_}: split {len(chosen)} cells (largest change {candidates[0][1]:.3f}), "
+                f"{len(self.samples)} points, {self.runs}/{self.budget} runs"
+            )
+
+    def dense_grid_runs(self) -> int:
+        """最も細かく分割した間隔で全範囲を格子にした場合の実行回数（比較用）。"""
+        total = 1
+        for i, axis in enumerate(self.axes):
+            width = min(c.highs[i] - c.lows[i] for c in self.cells)
+            total *= int(round((axis.high - axis.low) / width)) + 1
+        return total * len(self.seeds)
+
+    # --- 出力 -----------------------------------------------------------------
+    def columns(self) -> List[str]:
+        cols = [a.name for a in self.axes] + ["round", "num_seeds"]
+        for m in self.metrics:
+            cols += [f"{m}_mean", f"{m}_std"]
+        return cols
+
+    def rows(self) -> List[dict]:
+        rows = []
+        for p in sorted(self.samples):
+            s = self.samples[p]
+            row = {a.name: (int(v) if a.integer else v) for a, v in zip(self.axes, p)}
+            row.update({"round": s.round, "num_seeds": len(self.seeds)})
+            for m in self.metrics:
+                row[f"{m}_mean"] = s.mean(m)
+                row[f"{m}_std"] = s.std(m)
+            rows.append(row)
+        return rows
+
+    def write_csv(self, path: Path) -> None:
+        """点ごとの結果（パラメータ, 追加したラウンド, メトリクスの平均・標準偏差）を CSV に書き出す。"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns())
+            writer.writeheader()
+            writer.writerows(self.rows())
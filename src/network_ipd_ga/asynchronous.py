@@ -0,0 +1,234 @@
+# asynchronous.py
+from __future__ import annotations
+from typing import TYPE_CHECKING, Generator, List, Literal, Tuple
+import random
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.agent import Agent
+from network_ipd_ga.dynamic_network import DynamicAdjacency
+from network_ipd_ga.game import pair_action_table, pair_outcome_table
+from network_ipd_ga.ga import make_child
+from network_ipd_ga.metrics import strategy_histogram, update_histogram
+from network_ipd_ga.selection import DEFAULT_SELECTION, Selection
+from network_ipd_ga.network import edge_index_arrays
+from network_ipd_ga.snapshot import GenerationSnapshot, summary_metrics
+from network_ipd_ga.strategy import strategy_to_int, int_to_strategy
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from network_ipd_ga.graph import Graph
+
+
+# random_sequential: 1 スイープ（N 回の更新）ごとに全ノードをランダムな順列で 1 回ずつ更新
+# poisson          : 各ノードが独立なレート 1 のポアソン時計を持つ（毎回一様にノードを選び、時間は指数分布で進む）
+Schedule = Literal["random_sequential", "poisson"]
+
+# 再結線先: random（全ノードから一様）| neighbor_of_neighbor（隣接ノードの隣接ノード）
+RewireTarget = Literal["random", "neighbor_of_neighbor"]
+
+
+def iter_async_simulation(
+    graph: Graph | nx.Graph,
+    agents: List[Agent],
+    rng: random.Random,
+    generations: int,
+    T: int,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    schedule: Schedule = "random_sequential",
+    report_interval: int | None = None,
+    spatial_metrics: bool = True,
+    rewire_rate: float = 0.0,
+    rewire_target: RewireTarget = "random",
+    selection: Selection = DEFAULT_SELECTION,
+) -> Generator[GenerationSnapshot, None, List[Agent]]:
+    """
+    非同期更新（1 回に 1 ノードだけが戦略を改訂する）でシミュレーションを進める。
+
+    改訂ルールは同期版と同じ（自分＋隣接ノードからの親選択（selection）・一様交叉・
+    突然変異・メタ戦略との交叉）。メタ戦略はその時点の最頻戦略
+    （同数の場合は戦略コードの小さい方）。
+    改訂後は、そのノードと隣接ノードの利得だけをペア対戦表で差分更新するため、
+    1 回の更新は O(degree)。
+
+    report_interval 回の更新ごとに GenerationSnapshot を yield する
+    （None ならノード数 = 1 モンテカルロステップごと）。generation は報告の通し番号で、
+    metrics には累積更新回数 updates と経過時間 time（モンテカルロステップ単位）が加わる。
+    agents は graph.nodes と同じ順に並んでいること。戻り値は最終状態のエージェントリスト。
+
+    rewire_rate > 0 のときはネットワークも共進化する。選ばれたノード x は確率 rewire_rate で
+    戦略改訂の代わりに再結線を試みる：ランダムな隣接ノード j が x に対して主に裏切る
+    （T ラウンド中の協調が半分未満）なら、x は j とのエッジを切り、rewire_target に従って
+    選んだ新しいノード k とつなぐ（j の次数が 1 のとき、k が x 自身・既存の隣接ノードのときは何もしない）。
+    エッジ数は一定に保たれ、利得は x, j, k の分だけ差分更新する。
+    隣接構造は DynamicAdjacency（swap-remove による O(1) の追加・削除）で持ち、
+    前回の報告以降の再結線は snapshot.topology_events に (node, removed, added) の
+    ノード ID の配列として記録する。終了時に graph のエッジを最終状態に書き換える。
+    """
+    if schedule not in ("random_sequential", "poisson"):
+        raise ValueError(f"Unknown async schedule: {schedule}")
+    n = len(agents)
+    if report_interval is None:
+        report_interval = n
+    if report_interval < 1:
+        raise ValueError("report_interval must be >= 1.")
+    if rewire_target not in ("random", "neighbor_of_neighbor"):
+        raise ValueError(f"Unknown rewire target: {rewire_target}")
+
+    index = {a.id: i for i, a in enumerate(agents)}
+    node_ids = np.fromiter((a.id for a in agents), dtype=np.int64, count=n)
+
+    # 共進化モードでは動的な隣接構造を使う（neighbors[x] は隣接リストそのもの）
+    adjacency: DynamicAdjacency | None = None
+    if rewire_rate > 0:
+        adjacency = DynamicAdjacency.from_graph(graph, index)
+        neighbors = adjacency.nbrs
+    else:
+        neighbors = [[index[m] for m in graph.neighbors(a.id)] for a in agents]
+    edges = edge_index_arrays(graph) if spatial_metrics else None
+
+    payoff_table, coop_table = pair_outcome_table(T)
+    P = payoff_table.tolist()
+    Cp = coop_table.tolist()
+    coop_by = pair_action_table(T).tolist()
+
+    codes = [strategy_to_int(a.strategy) for a in agents]
+    hist = strategy_histogram(np.array(codes, dtype=np.int8)).tolist()
+
+    # 初期利得（全エッジ分をペア対戦表から計算）
+    coop_actions_total = 0
+    for i, nbrs in enumerate(neighbors):
+        s = codes[i]
+        agents[i].payoff = float(sum(P[s][codes[j]] for j in nbrs))
+        coop_actions_total += sum(Cp[s][codes[j]] for j in nbrs)
+    coop_actions_total //= 2  # 各エッジを両端から 2 回数えている
+    total_actions = 2 * T * graph.number_of_edges()
+
+    def revise(x: int) -> int:
+        """ノード x の戦略を改訂し、利得を差分更新する。戻り値: 協調数の変化量"""
+        agent = agents[x]
+        nbrs = neighbors[x]
+        candidate_agents = [agent] + [agents[j] for j in nbrs]
+        meta_code = max(range(8), key=hist.__getitem__)
+
+        child = make_child(
+            candidate_agents, rng, mutation_rate, int_to_strategy(meta_code), meta_influence, selection
+        )
+        agent.strategy = child
+
+        old = codes[x]
+        new = strategy_to_int(child)
+        if new == old:
+            return 0
+        codes[x] = new
+        update_histogram(hist, old, new)
+
+        # x 自身の利得は再計算、隣接ノードは差分だけ更新
+        P_new = P[new]
+        C_new, C_old = Cp[new], Cp[old]
+        payoff_x = 0.0
+        delta_coop = 0
+        for j in nbrs:
+            sj = codes[j]
+            payoff_x += P_new[sj]
+            agents[j].payoff += P[sj][new] - P[sj][old]
+            delta_coop += C_new[sj] - C_old[sj]
+        agent.payoff = payoff_x
+        return delta_coop
+
+    events: List[Tuple[int, int, int]] = []
+
+    def rewire(x: int) -> int:
+        """ノード x の再結線を試みる。戻り値: 協調数の変化量"""
+        if adjacency.degree(x) == 0:
+            return 0
+        j = adjacency.random_neighbor(x, rng)
+        sx, sj = codes[x], codes[j]
+        if 2 * coop_by[sj][sx] >= T or adjacency.degree(j) <= 1:
+            return 0
+
+        if rewire_target == "random":
+            k = rng.randrange(n)
+        else:
+            y = adjacency.random_neighbor(x, rng)
+            k = adjacency.random_neighbor(y, rng)
+        if k == x or adjacency.has_edge(x, k):
+            return 0
+
+        adjacency.remove_edge(x, j)
+        adjacency.add_edge(x, k)
+        events.append((x, j, k))
+
+        sk = codes[k]
+        agents[x].payoff += P[sx][sk] - P[sx][sj]
+        agents[j].payoff -= P[sj][sx]
+        agents[k].payoff += P[sk][sx]
+        return Cp[sx][sk] - Cp[sx][sj]
+
+    updates = 0
+    mc_time = 0.0
+    order: List[int] = []
+    update_seconds = 0.0
+
+    for gen in range(generations):
+        t_metrics = time.perf_counter()
+        realized_coop_rate = (
+            coop_actions_total / total_actions if total_actions > 0 else 0.0
+        )
+        strategies = np.array(codes, dtype=np.int8)
+        payoffs = np.fromiter((a.payoff for a in agents), dtype=np.float64, count=n)
+        topology_events = None
+        if adjacency is not None:
+            if spatial_metrics:
+                edges = adjacency.edge_index_arrays()
+            topology_events = node_ids[np.array(events, dtype=np.int64).reshape(-1, 3)]
+            events.clear()
+        metrics = summary_metrics(gen, realized_coop_rate, strategies, payoffs, edges=edges)
+        metrics["updates"] = updates
+        metrics["time"] = mc_time
+        if adjacency is not None:
+            metrics["rewirings"] = len(topology_events)
+
+        yield GenerationSnapshot(
+            generation=gen,
+            node_ids=node_ids,
+            strategies=strategies,
+            payoffs=payoffs,
+            metrics=metrics,
+            topology_events=topology_events,
+            timings={"updates": update_seconds, "metrics": time.perf_counter() - t_metrics},
+        )
+
+        t_updates = time.perf_counter()
+        for _ in range(report_interval):
+            if schedule == "random_sequential":
+                if not order:
+                    order = list(range(n))
+                    rng.shuffle(order)
+                x = order.pop()
+            else:
+                x = rng.randrange(n)
+                mc_time += rng.expovariate(n)
+            if adjacency is not None and rng.random() < rewire_rate:
+                coop_actions_total += rewire(x)
+            else:
+                coop_actions_total += revise(x)
+            updates += 1
+        if schedule == "random_sequential":
+            mc_time = updates / n
+        update_seconds = time.perf_counter() - t_updates
+
+        logger.info(
+            f"Report {gen} (updates={updates}, time={mc_time:.2f}): "
+            f"coop(real={realized_coop_rate:.3f}, strategy={metrics['strategy_coop_rate']:.3f}), "
+            f"div={metrics['diversity']:.3f}, avg_payoff={metrics['avg_payoff']:.3f}"
+        )
+
+    if adjacency is not None:
+        adjacency.write_to_graph(graph, node_ids)
+    return agents
@@ -0,0 +1,317 @@
+# autotune.py
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List
+import hashlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.selection import Selection
+
+try:
+    import fcntl
+except ImportError:  # Windows: ロックなし（同時に較正すると測り直しが重なるだけ）
+    fcntl = None
+
+if TYPE_CHECKING:
+    import networkx as nx
+    from network_ipd_ga.graph import Graph
+
+# engine="auto" の計算方法の選択（simulation.BACKENDS から）。
+#
+# 1 実行の時間を計算方法ごとに
+#   起動（カーネルの読み込みなど, 1 回）+ 世代数 × (対戦 × エッジ数 [× T] + 世代交代 × 候補の数)
+# と見積もり、最も短いものを選ぶ。対戦のコストは python（1 ラウンドずつ play_ipd）ではエッジ数 × T、
+# 対戦表を使う numpy / jit ではエッジ数に比例する。世代交代の候補の数は Σ(次数 + 1) で、
+# ランク選択は候補区間のソートのぶん次数の大きいノードほど重くなる（Σ(次数 + 1)·log2(次数 + 1)）。
+# 次数の偏りが効くのはこの項だけで、トーナメントなど他の選択では見積もりはエッジ数と Σ(次数 + 1) だけで決まる。
+#
+# 係数は小さな問題（small_world, 1000 ノード, 数世代）で各計算方法を実際に動かして測り（較正）、
+# マシンの指紋（ホスト名・CPU・使えるコア数・Python / NumPy / Numba のバージョン）ごとに
+# <cache_dir>/engine_calibration.json にキャッシュする（共有のホームディレクトリでもマシンごとに別の記録）。
+# 起動のコストは新しいプロセスで計算方法を読み込む時間（Numba のディスクキャッシュからの読み込みを含む）。
+# どの計算方法も 1 プロセス 1 スレッドで動くので、コア数は見積もりに入れず（較正の記録を分けるのにだけ使う）、
+# ログの理由にも出さない。
+# 較正（測定と保存）はキャッシュの隣のロックファイルで排他し、ロックを取ったあとにキャッシュを読み直す。
+# スイープのワーカーが同時に engine="auto" で始めても、測るのは最初の 1 プロセスだけで
+# （負荷の重なった状態で測った係数を書き合わない）、他はそれを待って読む。
+
+CALIBRATION_VERSION = 1
+CACHE_FILE = "engine_calibration.json"
+
+# 較正に使う問題（python でも合計 1 秒程度）
+CALIBRATION_PROBLEM = {
+    "topology": "small_world",
+    "num_agents": 1000,
+    "small_world_k": 4,
+    "small_world_p": 0.1,
+    "T": 10,
+    "generations": 5,
+}
+RNG_MODES = ("sequential", "counter")
+
+# プロセス内で読み込んだ較正（マシンの指紋 -> 記録）
+_calibrations: Dict[str, dict] = {}
+
+
+def cache_dir() -> Path:
+    """較正のキャッシュの置き場所（NETWORK_IPD_GA_CACHE_DIR, $XDG_CACHE_HOME, ~/.cache の順）。"""
+    env = os.environ.get("NETWORK_IPD_GA_CACHE_DIR")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "network_ipd_ga"
+
+
+def available_cores() -> int:
+    """このプロセスが使えるコア数。"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def machine_info() -> dict:
+    """較正の記録を分けるマシンの指紋。"""
+    try:
+        import numba
+
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+        "cores": available_cores(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba_version,
+        "version": CALIBRATION_VERSION,
+    }
+
+
+def machine_key(info: dict | None = None) -> str:
+    info = machine_info() if info is None else info
+    return hashlib.sha1(json.dumps(info, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def candidate_units(degrees: np.ndarray, selection: Selection) -> float:
+    """世代交代の仕事量（候補の数, ランク選択はソートのぶん log2(候補数) を掛ける）。"""
+    sizes = degrees.astype(np.float64) + 1
+    if selection.operator == "rank":
+        return float(np.sum(sizes * (1 + np.log2(sizes))))
+    return float(np.sum(sizes))
+
+
+def _startup_seconds(name: str) -> float:
+    """新しいプロセスで計算方法を読み込み、小さな入力で 1 回動かすまでの時間。"""
+    code = (
+        "import time; t = time.perf_counter()\n"
+        "from network_ipd_ga.simulation import BACKENDS\n"
+        f"ops = BACKENDS[{name!r}].load()\n"
+        "getattr(ops, 'warm_up', lambda: None)()\n"
+        "print(time.perf_counter() - t)\n"
+    )
+    base = [sys.executable, "-c", "from network_ipd_ga import simulation"]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    try:
+        # simulation 自体の import 時間は全計算方法で共通なので差し引く
+        t0 = time.perf_counter()
+        subprocess.run(base, check=True, capture_output=True, env=env)
+        common = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, env=env)
+        return max(0.0, time.perf_counter() - t0 - common)
+    except (subprocess.CalledProcessError, OSError):
+        # 実行時に登録した計算方法など、新しいプロセスで読み込めないもの
+        from network_ipd_ga.simulation import BACKENDS
+
+        t0 = time.perf_counter()
+        ops = BACKENDS[name].load()
+        getattr(ops, "warm_up", lambda: None)()
+        return time.perf_counter() - t0
+
+
+def calibrate_backend(name: str) -> dict:
+    """1 つの計算方法の係数（起動の秒数, 対戦・世代交代の単位あたりの秒数）を測る。"""
+    from network_ipd_ga.simulation import BACKENDS, build_graph, iter_simulation
+
+    backend = BACKENDS[name]
+    ops = backend.load()
+    getattr(ops, "warm_up", lambda: None)()  # JIT のコンパイル（ディスクキャッシュへの書き込み）を先に済ませる
+    p = CALIBRATION_PROBLEM
+    graph = build_graph(p["topology"], p["num_agents"], 0, p["small_world_k"], p["small_world_p"], 2)
+    degrees = np.fromiter((d for _, d in graph.degree), dtype=np.int64, count=graph.number_of_nodes())
+    play_units = graph.number_of_edges() * (1 if backend.array_play else p["T"])
+    units = candidate_units(degrees, Selection("tournament"))
+
+    plays, reproduce = [], {}
+    for rng_mode in RNG_MODES:
+        snaps = list(iter_simulation(**p, graph=graph, engine=name, rng_mode=rng_mode, spatial_metrics=False))
+        # 1 世代目（初回の呼び出し）を除いた中央値。timings["reproduce"] は前の世代の世代交代の時間
+        plays += [s.timings["play"] for s in snaps[1:]]
+        reproduce[rng_mode] = float(np.median([s.timings["reproduce"] for s in snaps[2:]])) / units
+    return {
+        "startup": _startup_seconds(name),
+        "play": float(np.median(plays)) / play_units,
+        "reproduce": reproduce,
+    }
+
+
+class _Lock:
+    """
+    較正のキャッシュの排他ロック（測定と保存を 1 プロセスずつ行う）。
+    キャッシュの置き場所に書き込めなければロックなしで進む（保存も失敗して警告が出る）。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path.with_name(f"{path.name}.lock")
+        self._file = None
+
+    def __enter__(self) -> _Lock:
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self._path.open("a")
+        except OSError:
+            return self
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _read_records(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text()) if path.exists() else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def load_calibration(force: bool = False, names: List[str] | None = None) -> dict:
+    """
+    このマシンの較正の記録（なければ、または記録のない計算方法があれば測ってキャッシュに保存する）。
+    names: 較正する計算方法（既定は available() な全て）, force=True なら測り直す。
+    """
+    from network_ipd_ga.simulation import BACKENDS
+
+    info = machine_info()
+    key = machine_key(info)
+    names = [n for n, b in BACKENDS.items() if b.available()] if names is None else list(names)
+    path = cache_dir() / CACHE_FILE
+
+    def missing_in(entry: dict | None) -> List[str]:
+        return [n for n in names if force or entry is None or n not in entry["backends"]]
+
+    entry = None if force else _calibrations.get(key) or _read_records(path).get(key)
+    if missing_in(entry):
+        with _Lock(path):
+            # ロックを待っている間に他のプロセスが較正していれば、その記録を使う
+            if not force:
+                entry = _read_records(path).get(key) or entry
+            missing = missing_in(entry)
+            if missing:
+                entry = entry or {"machine": info, "backends": {}}
+                logger.info(f"Calibrating engines {', '.join(missing)} (cached in {path}) ...")
+                for name in missing:
+                    entry["backends"][name] = calibrate_backend(name)
+                entry["created"] = time.time()
+                records = _read_records(path)
+                records[key] = entry
+                try:
+                    _write_atomic(path, records)
+                except OSError as e:
+                    logger.warning(f"Could not save the engine calibration to {path}: {e}")
+    _calibrations[key] = entry
+    return entry
+
+
+def estimate_seconds(
+    name: str,
+    calibration: dict,
+    num_edges: int,
+    units: float,
+    generations: int,
+    T: int,
+    rng_mode: str,
+    selection: Selection,
+) -> float:
+    """計算方法 name で 1 実行にかかる時間の見積もり（秒, 全計算方法で共通のメトリクス計算などは除く）。"""
+    from network_ipd_ga.simulation import BACKENDS
+
+    backends = calibration["backends"]
+    b = backends[name]
+    play = b["play"] * num_edges * (1 if BACKENDS[name].array_play else T)
+    reproduce = b["reproduce"][rng_mode]
+    if name == "jit" and rng_mode == "sequential" and "numpy" in backends:
+        from network_ipd_ga import kernels
+
+        if not kernels.supports(selection):
+            # カーネルのない親選択（Fermi 則）は numpy と同じく従来の実装で世代交代する
+            reproduce = backends["numpy"]["reproduce"][rng_mode]
+    return b["startup"] + generations * (play + reproduce * units)
+
+
+def engine_estimates(
+    graph: Graph | nx.Graph, generations: int, T: int, rng_mode: str, selection: Selection
+) -> Dict[str, float]:
+    """auto の候補の計算方法ごとの見積もり（秒）。較正の記録がなければ先に較正する。"""
+    from network_ipd_ga.simulation import BACKENDS
+
+    calibration = load_calibration()
+    degrees = np.fromiter((d for _, d in graph.degree), dtype=np.int64, count=graph.number_of_nodes())
+    units = candidate_units(degrees, selection)
+    return {
+        name: estimate_seconds(name, calibration, graph.number_of_edges(), units, generations, T, rng_mode, selection)
+        for name in BACKENDS
+        if name in calibration["backends"] and BACKENDS[name].available()
+    }
+
+
+def choose_engine(
+    graph: Graph | nx.Graph, generations: int, T: int, rng_mode: str, selection: Selection
+) -> str:
+    """
+    graph と世代数などから、見積もりの最も短い計算方法を選んでログに理由を出す。
+    ログには見積もりに使った量（エッジ数・世代交代の候補の数・世代数・T・乱数モード・親選択）だけを出す。
+    """
+    from network_ipd_ga.simulation import BACKENDS
+
+    estimates = engine_estimates(graph, generations, T, rng_mode, selection)
+    best = min(estimates, key=estimates.get)
+    degrees = np.fromiter((d for _, d in graph.degree), dtype=np.int64, count=graph.number_of_nodes())
+    others = ", ".join(f"{name} {t:.2f}s" for name, t in sorted(estimates.items(), key=lambda x: x[1]) if name != best)
+    note = ""
+    if rng_mode == "sequential" and BACKENDS[best].array_play:
+        ops = BACKENDS[best].load()
+        if ops is None or ops.reproduce_codes_sequential is None or not ops.supports(selection):
+            # 逐次の乱数列では世代交代の乱数の消費が各ノードの結果に依存するので、カーネルがなければ従来のループ
+            note = "; only play is accelerated, reproduction runs in the Python loop under sequential rng"
+    logger.info(
+        f"engine=auto -> {best}: estimated {estimates[best]:.2f}s ({others}) for {graph.number_of_edges()} edges, "
+        f"{candidate_units(degrees, selection):.0f} reproduction units, {generations} generations x T={T}, "
+        f"{rng_mode} rng, {selection.operator} selection{note}"
+    )
+    return best
@@ -0,0 +1,179 @@
+# build.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+
+# 図・動画の差分ビルド（scripts/build_outputs.py）。
+#
+# 各出力（make_figure.py の 1 設定分の図, make_video.py の 1 実行分の動画）を Target として、
+# それが依存する入力を記録する：
+#   - ファイル（サマリ CSV・ノード履歴・グラフ pickle・描画スクリプト自身）: サイズ・mtime・SHA-1
+#   - 結果ストアの実行 (config_hash, seed): ResultsStore.run_fingerprint
+#   - パラメータ（設定の内容, fps などのオプション）
+# 前回のビルドの記録（マニフェスト, JSON）と比べて、入力が変わったか出力が欠けている Target だけを
+# 再生成する。サイズ・mtime が同じファイルはハッシュを計算せず、変わっていてもハッシュが同じなら
+# （同じ seed の再実行で同じ内容が書き直された場合）再生成しない。
+# 古くなった Target は別々の子プロセスとして並列に実行し、成功したものから記録を更新する。
+
+DEFAULT_MANIFEST = Path("results", "build_manifest.json")
+
+
+def _sha1_file(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, data: dict) -> None:
+    """一時ファイルに書いてから rename する（中断しても壊れたマニフェストを残さない）。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+@dataclass
+class Target:
+    """
+    1 つの出力のビルド規則。
+
+    target_id: マニフェストのキー（例 "figure:cycle_meta00", "video:cycle_meta00_seed0000"）
+    command  : 出力を作るコマンド
+    outputs  : 作られるファイル（1 つでも欠けていれば再生成）
+    files    : 依存する入力ファイル
+    store_runs: 依存する結果ストアの実行 (config_hash, seed)（store が None なら使わない）
+    params   : 依存するパラメータ（JSON にできる値）
+    """
+
+    target_id: str
+    command: List[str]
+    outputs: List[Path]
+    files: List[Path] = field(default_factory=list)
+    store_runs: List[Tuple[str, int]] = field(default_factory=list)
+    store: Path | None = None
+    params: dict = field(default_factory=dict)
+
+
+class BuildManifest:
+    """前回ビルドした各 Target の入力の指紋（JSON ファイル）。"""
+
+    def __init__(self, path: Path | str = DEFAULT_MANIFEST) -> None:
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text())
+        self._lock = threading.Lock()
+
+    def save(self) -> None:
+        with self._lock:
+            _write_atomic(self.path, self.entries)
+
+    def record(self, target: Target, fingerprints: dict) -> None:
+        with self._lock:
+            self.entries[target.target_id] = {
+                "command": target.command,
+                "outputs": [str(p) for p in target.outputs],
+                "built_at": time.time(),
+                **fingerprints,
+            }
+
+    # --- 指紋 -----------------------------------------------------------------
+    def _file_fingerprint(self, path: Path, previous: dict | None) -> dict | None:
+        """ファイルの指紋。サイズ・mtime が前回と同じならハッシュを再計算しない。"""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+            return previous
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": _sha1_file(path)}
+
+    def fingerprints(self, target: Target) -> dict:
+        """Target の現在の入力の指紋（files / store / params）。"""
+        previous = self.entries.get(target.target_id, {}).get("files", {})
+        files = {str(p): self._file_fingerprint(p, previous.get(str(p))) for p in target.files}
+        store = {}
+        if target.store_runs:
+            from network_ipd_ga.store import ResultsStore
+
+            with ResultsStore(target.store) as s:
+                store = {f"{h}:{seed}": s.run_fingerprint(h, seed) for h, seed in target.store_runs}
+        return {"files": files, "store": store, "params": json.loads(json.dumps(target.params))}
+
+    def stale_reason(self, target: Target, current: dict) -> str | None:
+        """再生成が必要な理由（不要なら None）。"""
+        entry = self.entries.get(target.target_id)
+        if entry is None:
+            return "new"
+        missing = [p for p in target.outputs if not p.exists()]
+        if missing:
+            return f"missing output {missing[0]}"
+        if entry.get("command") != target.command or entry.get("params") != current["params"]:
+            return "options changed"
+        changed = [
+            path for path, fp in current["files"].items()
+            if (fp or {}).get("sha1") != (entry.get("files", {}).get(path) or {}).get("sha1")
+        ]
+        changed += [run for run, fp in current["store"].items() if fp != entry.get("store", {}).get(run)]
+        if changed:
+            more = f" (+{len(changed) - 1} more)" if len(changed) > 1 else ""
+            return f"changed input {changed[0]}{more}"
+        return None
+
+
+def plan(targets: Sequence[Target], manifest: BuildManifest, force: bool = False) -> List[Tuple[Target, str, dict]]:
+    """古くなった Target と理由・現在の指紋。ハッシュだけ更新された（内容は同じ）記録も保存する。"""
+    stale = []
+    for target in targets:
+        current = manifest.fingerprints(target)
+        reason = "forced" if force else manifest.stale_reason(target, current)
+        if reason is not None:
+            stale.append((target, reason, current))
+        elif manifest.entries[target.target_id].get("files") != current["files"]:
+            manifest.record(target, current)
+    return stale
+
+
+def build(
+    stale: Sequence[Tuple[Target, str, dict]],
+    manifest: BuildManifest,
+    workers: int = 1,
+    log: Callable[[str], None] = print,
+) -> List[Target]:
+    """
+    古くなった Target のコマンドを最大 workers 個の子プロセスで並列に実行する。
+    成功したものから記録を更新してマニフェストを保存する。戻り値: 失敗した Target。
+    """
+    failed = []
+
+    def run(target: Target) -> subprocess.CompletedProcess:
+        return subprocess.run(target.command, capture_output=True, text=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run, target): (target, current) for target, _, current in stale}
+        for i, future in enumerate(as_completed(futures), 1):
+            target, current = futures[future]
+            result = future.result()
+            if result.returncode == 0:
+                manifest.record(target, current)
+                manifest.save()
+                log(f"[INFO] ({i}/{len(stale)}) Built {target.target_id}")
+            else:
+                failed.append(target)
+                tail = (result.stderr or result.stdout).strip().splitlines()[-5:]
+                log(f"[WARN] ({i}/{len(stale)}) {target.target_id} failed with exit code {result.returncode}:")
+                for line in tail:
+                    log(f"    {line}")
+    manifest.save()
+    return failed
@@ -1,7 +1,33 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-import yaml
+import hashlib
+import json
+
+
+# config_hash の計算から除外する（結果に影響しない）出力系のフィールド
+OUTPUT_FIELDS = ("output_dir", "output_base")
+
+# 計算方法だけを変え、結果を変えないフィールド（config_hash に含めないが、シミュレーションには渡す）
+ENGINE_FIELDS = ("node_order", "engine")
+
+# 省略可能なフィールドとそのデフォルト値。
+# デフォルト値のままのときは config_hash に含めない（既存の結果のハッシュを変えないため）
+OPTIONAL_DEFAULTS = {
+    "update_mode": "sync",
+    "async_schedule": "random_sequential",
+    "report_interval": None,
+    "rewire_rate": 0.0,
+    "rewire_target": "random",
+    "rng_mode": "sequential",
+    "selection": "tournament",
+    "tournament_k": 3,
+    "fermi_temperature": 1.0,
+    "node_order": "original",
+    "lattice_width": None,
+    "lattice_neighborhood": "von_neumann",
+    "engine": "python",
+}
 
 
 @dataclass
@@ -23,6 +49,33 @@ class SimulationConfig:
     output_dir: Path
     output_base: str
 
+    # 更新方式: "sync"（世代交代）| "async"（1 ノードずつ）
+    update_mode: str = OPTIONAL_DEFAULTS["update_mode"]
+    async_schedule: str = OPTIONAL_DEFAULTS["async_schedule"]
+    report_interval: int | None = OPTIONAL_DEFAULTS["report_interval"]
+
+    # ネットワークの共進化（再結線）。update_mode="async" のときのみ有効
+    rewire_rate: float = OPTIONAL_DEFAULTS["rewire_rate"]
+    rewire_target: str = OPTIONAL_DEFAULTS["rewire_target"]
+
+    # 乱数: "sequential"（単一の random.Random）| "counter"（カウンタベース, 同期更新のみ）
+    rng_mode: str = OPTIONAL_DEFAULTS["rng_mode"]
+
+    # 親選択: "tournament" | "roulette" | "rank" | "fermi"
+    selection: str = OPTIONAL_DEFAULTS["selection"]
+    tournament_k: int = OPTIONAL_DEFAULTS["tournament_k"]
+    fermi_temperature: float = OPTIONAL_DEFAULTS["fermi_temperature"]
+
+    # 配列ベースのエンジン内部のノードの並べ替え: "original" | "rcm" | "bfs" | "degree"（結果は変わらない）
+    node_order: str = OPTIONAL_DEFAULTS["node_order"]
+
+    # 2 次元格子（topology="lattice"）: 幅（None なら正方格子）と近傍 "von_neumann" | "moore"
+    lattice_width: int | None = OPTIONAL_DEFAULTS["lattice_width"]
+    lattice_neighborhood: str = OPTIONAL_DEFAULTS["lattice_neighborhood"]
+
+    # 計算方法: "python" | "numpy"（対戦表の表引き）| "jit"（Numba のカーネル）| "auto"（較正で選ぶ）, 結果は変わらない
+    engine: str = OPTIONAL_DEFAULTS["engine"]
+
     def as_dict(self) -> dict:
         """ログ出力や保存用に辞書に変換"""
         return {
@@ -37,11 +90,48 @@ class SimulationConfig:
             "meta_influence": self.meta_influence,
             "output_dir": str(self.output_dir),
             "output_base": self.output_base,
+            "update_mode": self.update_mode,
+            "async_schedule": self.async_schedule,
+            "report_interval": self.report_interval,
+            "rewire_rate": self.rewire_rate,
+            "rewire_target": self.rewire_target,
+            "rng_mode": self.rng_mode,
+            "selection": self.selection,
+            "tournament_k": self.tournament_k,
+            "fermi_temperature": self.fermi_temperature,
+            "node_order": self.node_order,
+            "lattice_width": self.lattice_width,
+            "lattice_neighborhood": self.lattice_neighborhood,
+            "engine": self.engine,
+        }
+
+    def model_params(self) -> dict:
+        """シミュレーション結果を決めるパラメータのみを辞書で返す（出力先などは除く）。"""
+        return {
+            k: v
+            for k, v in self.as_dict().items()
+            if k not in OUTPUT_FIELDS
+            and k not in ENGINE_FIELDS
+            and not (k in OPTIONAL_DEFAULTS and v == OPTIONAL_DEFAULTS[k])
         }
 
+    def simulation_kwargs(self) -> dict:
+        """run_simulation / iter_simulation に渡すキーワード引数（seed 以外）。"""
+        return {k: v for k, v in self.as_dict().items() if k not in OUTPUT_FIELDS}
+
+    def config_hash(self) -> str:
+        """
+        model_params() から計算する短いハッシュ値。
+        結果ストアで (config_hash, seed) をキーとして用いる。
+        """
+        payload = json.dumps(self.model_params(), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
 
 def load_config(path: Path | None = None) -> SimulationConfig:
     """YAML 設定ファイルを読み込み、SimulationConfig にして返す。"""
+    import yaml  # シミュレーション本体の import を軽くするため、設定を読むときだけ読み込む
+
     with path.open("r") as f:
         data = yaml.safe_load(f)
 
@@ -57,4 +147,5 @@ def load_config(path: Path | None = None) -> SimulationConfig:
         meta_influence=data["meta_influence"],
         output_dir=Path(data["output_dir"]),
         output_base=data["output_base"],
+        **{k: data.get(k, default) for k, default in OPTIONAL_DEFAULTS.items()},
     )
@@ -0,0 +1,94 @@
+# dynamic_network.py
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Mapping, Tuple
+import random
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from network_ipd_ga.graph import Graph
+
+
+class DynamicAdjacency:
+    """
+    エッジの追加・削除と一様な隣接ノードのサンプリングを O(1) で行う隣接構造。
+
+    ノードは 0〜n-1 の添字で扱う。各ノードの隣接リスト nbrs[x] は配列（list）で、
+    削除は「末尾要素と入れ替えて pop」（swap-remove）で行うため、隣接リスト内の順序は
+    変化する。pos[x][y] は nbrs[x] 内での y の位置。
+    """
+
+    def __init__(self, n: int) -> None:
+        self.nbrs: List[List[int]] = [[] for _ in range(n)]
+        self.pos: List[Dict[int, int]] = [{} for _ in range(n)]
+        self.num_edges = 0
+
+    @classmethod
+    def from_graph(cls, graph: Graph | nx.Graph, index: Mapping[int, int]) -> DynamicAdjacency:
+        """
+        networkx のグラフから作る。index: ノード ID -> 添字。
+        隣接リストの初期順序は graph.neighbors の順序と同じ。
+        """
+        adj = cls(graph.number_of_nodes())
+        for node in graph.nodes:
+            x = index[node]
+            adj.nbrs[x] = [index[m] for m in graph.neighbors(node)]
+            adj.pos[x] = {y: i for i, y in enumerate(adj.nbrs[x])}
+        adj.num_edges = graph.number_of_edges()
+        return adj
+
+    def degree(self, x: int) -> int:
+        return len(self.nbrs[x])
+
+    def has_edge(self, x: int, y: int) -> bool:
+        return y in self.pos[x]
+
+    def add_edge(self, x: int, y: int) -> None:
+        if x == y or y in self.pos[x]:
+            raise ValueError(f"Cannot add edge ({x}, {y}).")
+        self.pos[x][y] = len(self.nbrs[x])
+        self.nbrs[x].append(y)
+        self.pos[y][x] = len(self.nbrs[y])
+        self.nbrs[y].append(x)
+        self.num_edges += 1
+
+    def _remove_half(self, x: int, y: int) -> None:
+        i = self.pos[x].pop(y)
+        last = self.nbrs[x].pop()
+        if last != y:
+            self.nbrs[x][i] = last
+            self.pos[x][last] = i
+
+    def remove_edge(self, x: int, y: int) -> None:
+        if y not in self.pos[x]:
+            raise ValueError(f"Edge ({x}, {y}) does not exist.")
+        self._remove_half(x, y)
+        self._remove_half(y, x)
+        self.num_edges -= 1
+
+    def random_neighbor(self, x: int, rng: random.Random) -> int:
+        """x の隣接ノードを一様に 1 つ選ぶ（隣接ノードがあること）。"""
+        nbrs = self.nbrs[x]
+        return nbrs[rng.randrange(len(nbrs))]
+
+    def edge_index_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """現在のエッジを添字の配列 (u, v)（u < v）にする。"""
+        u = np.fromiter(
+            (x for x, nbrs in enumerate(self.nbrs) for y in nbrs if x < y),
+            dtype=np.int64,
+            count=self.num_edges,
+        )
+        v = np.fromiter(
+            (y for x, nbrs in enumerate(self.nbrs) for y in nbrs if x < y),
+            dtype=np.int64,
+            count=self.num_edges,
+        )
+        return u, v
+
+    def write_to_graph(self, graph: Graph | nx.Graph, node_ids: np.ndarray) -> None:
+        """graph のエッジを現在の隣接構造で置き換える（ノード ID は node_ids[添字]）。"""
+        u, v = self.edge_index_arrays()
+        graph.remove_edges_from(list(graph.edges))
+        graph.add_edges_from(zip(node_ids[u].tolist(), node_ids[v].tolist()))
@@ -0,0 +1,276 @@
+# equivalence.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generator, List, Mapping
+import hashlib
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from network_ipd_ga.simulation import iter_simulation
+from network_ipd_ga.snapshot import GenerationSnapshot
+
+# 高速化したエンジン（対戦・世代交代・メトリクスの別実装）が参照実装と同じ結果を出すことの検証。
+#
+# - 2 つのエンジンを同じ config・seed で実行し、サマリとノード履歴（戦略・利得）を
+#   完全一致または許容誤差つきで比較して、最初に食い違った世代・列・ノードを報告する
+# - 参照実装の軌跡を世代ごとのハッシュ（フィンガープリント）として golden ファイルに保存し、
+#   以降の変更で軌跡が変わっていないことを確認する
+# - 各エンジンの実行時間から速度向上率を報告する
+
+# エンジン: simulation_kwargs（seed 以外）と seed を受け取り、スナップショットを yield する
+Engine = Callable[..., Generator[GenerationSnapshot, None, object]]
+
+ENGINES: Dict[str, Engine] = {
+    # 現在の純 Python 実装（play_ipd・reproduce_population・逐次乱数）
+    "reference": lambda seed, **kw: iter_simulation(**kw, seed=seed),
+    # カウンタベース乱数のベクトル化世代交代と、その 1 ノードずつの参照実装
+    "counter": lambda seed, **kw: iter_simulation(
+        **{**kw, "rng_mode": "counter", "counter_backend": "vectorized"}, seed=seed
+    ),
+    "counter_serial": lambda seed, **kw: iter_simulation(
+        **{**kw, "rng_mode": "counter", "counter_backend": "serial"}, seed=seed
+    ),
+    # ノードを RCM 順に並べ替えた CSR 上のベクトル化世代交代（counter と同じ結果になるはず）
+    "counter_rcm": lambda seed, **kw: iter_simulation(
+        **{**kw, "rng_mode": "counter", "node_order": "rcm"}, seed=seed
+    ),
+    # Numba でコンパイルしたカーネル（Numba がなければ reference と同じ実装で動く）
+    "jit": lambda seed, **kw: iter_simulation(**{**kw, "engine": "jit"}, seed=seed),
+    # 対戦を 8×8 の対戦表の表引きで計算する配列版と、較正の見積もりで選んだもの（simulation.BACKENDS）
+    "numpy": lambda seed, **kw: iter_simulation(**{**kw, "engine": "numpy"}, seed=seed),
+    "auto": lambda seed, **kw: iter_simulation(**{**kw, "engine": "auto"}, seed=seed),
+}
+
+
+def register_engine(name: str, engine: Engine) -> None:
+    """比較対象のエンジンを追加する。"""
+    if name in ENGINES:
+        raise ValueError(f"Engine already registered: {name}")
+    ENGINES[name] = engine
+
+
+@dataclass
+class Trajectory:
+    """1 回の実行の全世代の記録。"""
+
+    summary: pd.DataFrame
+    node_ids: np.ndarray
+    strategies: np.ndarray  # shape (世代数, ノード数), int8
+    payoffs: np.ndarray  # shape (世代数, ノード数), float64
+    seconds: float
+
+
+def run_engine(engine: str | Engine, kwargs: Mapping, seed: int) -> Trajectory:
+    """エンジンを実行して全世代を記録する（実行時間はシミュレーションのみ）。"""
+    fn = ENGINES[engine] if isinstance(engine, str) else engine
+    records: List[dict] = []
+    strategies: List[np.ndarray] = []
+    payoffs: List[np.ndarray] = []
+    node_ids = np.empty(0, dtype=np.int64)
+    seconds = 0.0
+
+    snapshots = fn(seed=seed, **kwargs)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            snap = next(snapshots)
+        except StopIteration:
+            seconds += time.perf_counter() - t0
+            break
+        seconds += time.perf_counter() - t0
+        records.append(snap.metrics)
+        strategies.append(snap.strategies.copy())
+        payoffs.append(snap.payoffs.copy())
+        node_ids = snap.node_ids
+
+    return Trajectory(
+        summary=pd.DataFrame(records),
+        node_ids=node_ids,
+        strategies=np.array(strategies, dtype=np.int8).reshape(len(records), -1),
+        payoffs=np.array(payoffs, dtype=np.float64).reshape(len(records), -1),
+        seconds=seconds,
+    )
+
+
+@dataclass
+class Divergence:
+    """最初の食い違い。node は node_id（サマリ列の食い違いなら None）。"""
+
+    generation: int
+    what: str  # サマリの列名, "strategy", "payoff", "columns", "generations"
+    node: int | None = None
+    reference: object = None
+    candidate: object = None
+
+    def __str__(self) -> str:
+        where = f"generation {self.generation}, {self.what}"
+        if self.node is not None:
+            where += f", node {self.node}"
+        return f"{where}: reference={self.reference!r}, candidate={self.candidate!r}"
+
+
+def _close(a: np.ndarray, b: np.ndarray, rtol: float, atol: float) -> np.ndarray:
+    if rtol == 0 and atol == 0:
+        return (a == b) | (np.isnan(a) & np.isnan(b))
+    return np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+
+
+def compare_trajectories(
+    ref: Trajectory, cand: Trajectory, rtol: float = 0.0, atol: float = 0.0
+) -> Divergence | None:
+    """
+    サマリとノード履歴を比較し、最初の食い違い（世代の早い順, 同じ世代ではサマリ → 戦略 → 利得）を返す。
+    rtol = atol = 0 のとき浮動小数点も完全一致（nan 同士は一致）で比較する。戦略は常に完全一致。
+    """
+    if list(ref.summary.columns) != list(cand.summary.columns):
+        return Divergence(0, "columns", None, list(ref.summary.columns), list(cand.summary.columns))
+    if len(ref.summary) != len(cand.summary):
+        n = min(len(ref.summary), len(cand.summary))
+        first: Divergence | None = Divergence(n, "generations", None, len(ref.summary), len(cand.summary))
+    else:
+        first = None
+    n = min(len(ref.summary), len(cand.summary))
+
+    candidates: List[Divergence] = []
+
+    # サマリ：列ごとに最初に食い違う行
+    for col in ref.summary.columns:
+        a = ref.summary[col].to_numpy()[:n]
+        b = cand.summary[col].to_numpy()[:n]
+        if np.issubdtype(a.dtype, np.number) and np.issubdtype(b.dtype, np.number):
+            same = _close(a.astype(np.float64), b.astype(np.float64), rtol, atol)
+        else:
+            same = a == b
+        bad = np.flatnonzero(~same)
+        if len(bad):
+            g = int(bad[0])
+            ra, cb = (x.item() if hasattr(x, "item") else x for x in (a[g], b[g]))
+            candidates.append(Divergence(g, col, None, ra, cb))
+
+    # ノード履歴：世代 × ノード
+    for what, a, b, exact in (
+        ("strategy", ref.strategies[:n], cand.strategies[:n], True),
+        ("payoff", ref.payoffs[:n], cand.payoffs[:n], False),
+    ):
+        if a.shape != b.shape:
+            candidates.append(Divergence(0, what, None, a.shape, b.shape))
+            continue
+        same = (a == b) if exact else _close(a, b, rtol, atol)
+        bad = np.argwhere(~same)
+        if len(bad):
+            g, i = (int(x) for x in bad[0])
+            candidates.append(Divergence(g, what, int(ref.node_ids[i]), a[g, i].item(), b[g, i].item()))
+
+    if candidates:
+        order = {"strategy": 1, "payoff": 2}
+        return min(candidates, key=lambda d: (d.generation, order.get(d.what, 0)))
+    return first
+
+
+# ---------------------------------------------------------------------
+# フィンガープリント（golden ファイル）
+# ---------------------------------------------------------------------
+def _metric_token(value) -> str:
+    if isinstance(value, float) or isinstance(value, np.floating):
+        value = float(value)
+        return "nan" if math.isnan(value) else repr(value)
+    return repr(int(value)) if isinstance(value, (int, np.integer)) else repr(value)
+
+
+def generation_fingerprints(traj: Trajectory) -> Dict[str, List[str]]:
+    """
+    世代ごとのハッシュ（16 桁）。
+    state: 戦略・利得の配列, summary: サマリの 1 行（列名と値の repr）。
+    """
+    state = []
+    summary = []
+    columns = list(traj.summary.columns)
+    for g, row in enumerate(traj.summary.itertuples(index=False)):
+        h = hashlib.sha256()
+        h.update(traj.strategies[g].tobytes())
+        h.update(traj.payoffs[g].astype("<f8").tobytes())
+        state.append(h.hexdigest()[:16])
+        line = ";".join(f"{c}={_metric_token(v)}" for c, v in zip(columns, row))
+        summary.append(hashlib.sha256(line.encode("utf-8")).hexdigest()[:16])
+    return {"state": state, "summary": summary}
+
+
+@dataclass
+class FingerprintMismatch:
+    seed: int
+    generation: int
+    what: str  # "state" | "summary" | "generations"
+
+    def __str__(self) -> str:
+        return f"seed {self.seed}: first mismatch at generation {self.generation} ({self.what})"
+
+
+def write_golden(path: Path, config_hash: str, fingerprints: Mapping[int, dict]) -> None:
+    """
+    {seed: 世代ごとのハッシュ} を golden ファイル（JSON）に保存する。
+    ハッシュの辞書に "seconds"（参照実装の実行時間）を入れておくと速度比較に使える。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "config_hash": config_hash,
+        "seeds": {str(seed): fp for seed, fp in sorted(fingerprints.items())},
+    }
+    path.write_text(json.dumps(payload, indent=1) + "\n")
+
+
+def read_golden(path: Path) -> tuple[str, Dict[int, dict]]:
+    payload = json.loads(path.read_text())
+    return payload["config_hash"], {int(k): v for k, v in payload["seeds"].items()}
+
+
+def compare_fingerprints(
+    seed: int, golden: Dict[str, List[str]], actual: Dict[str, List[str]]
+) -> FingerprintMismatch | None:
+    """golden と実際のハッシュ列を比べ、最初に食い違った世代を返す。"""
+    for g, (gs, as_, gm, am) in enumerate(
+        zip(golden["state"], actual["state"], golden["summary"], actual["summary"])
+    ):
+        if gs != as_:
+            return FingerprintMismatch(seed, g, "state")
+        if gm != am:
+            return FingerprintMismatch(seed, g, "summary")
+    if len(golden["state"]) != len(actual["state"]):
+        return FingerprintMismatch(seed, min(len(golden["state"]), len(actual["state"])), "generations")
+    return None
+
+
+@dataclass
+class EquivalenceResult:
+    """1 つの (config, seed) の比較結果。"""
+
+    config: str
+    seed: int
+    reference_seconds: float
+    candidate_seconds: float
+    divergence: Divergence | FingerprintMismatch | None = None
+
+    @property
+    def speedup(self) -> float:
+        if self.candidate_seconds <= 0:
+            return float("nan")
+        return self.reference_seconds / self.candidate_seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.divergence is None
+
+    def as_dict(self) -> dict:
+        return {
+            "config": self.config,
+            "seed": self.seed,
+            "ok": self.ok,
+            "reference_seconds": self.reference_seconds,
+            "candidate_seconds": self.candidate_seconds,
+            "speedup": self.speedup,
+            "divergence": "" if self.divergence is None else str(self.divergence),
+        }
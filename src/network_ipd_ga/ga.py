@@ -1,13 +1,28 @@
 # ga.py
 from __future__ import annotations
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict
 from collections import Counter
 import random
 
-import networkx as nx
+import numpy as np
 
 from network_ipd_ga.agent import Agent
-from network_ipd_ga.strategy import Strategy
+from network_ipd_ga.metrics import agent_histogram
+from network_ipd_ga.rng import CounterStreams, select_width
+from network_ipd_ga.selection import (
+    DEFAULT_SELECTION,
+    Selection,
+    candidate_segments,
+    select_index,
+    select_parent,
+    select_parents,
+)
+from network_ipd_ga.strategy import Strategy, int_to_strategy
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from network_ipd_ga.graph import Graph
 
 
 def uniform_crossover(s1: Strategy, s2: Strategy, rng: random.Random) -> Strategy:
@@ -27,31 +42,44 @@ def mutate(strategy: Strategy, pm: float, rng: random.Random) -> Strategy:
     return (b[0], b[1], b[2])
 
 
-def _tournament_select(
-    candidates: List[Agent],
+def make_child(
+    candidate_agents: List[Agent],
     rng: random.Random,
-    k: int = 3,
-) -> Agent:
-    """トーナメント選択：候補から k 個無作為に取り、その中で payoff 最大の個体を選ぶ。"""
-    if len(candidates) == 1:
-        return candidates[0]
-    k = min(k, len(candidates))
-    sampled = [rng.choice(candidates) for _ in range(k)]
-    return max(sampled, key=lambda a: a.payoff)
+    mutation_rate: float,
+    meta_strategy: Strategy | None,
+    meta_influence: float,
+    selection: Selection = DEFAULT_SELECTION,
+) -> Strategy:
+    """
+    1 ノード分の子戦略を生成する。
+    candidate_agents（自分＋隣接ノード）から親を 2 回選択し（デフォルトは k=3 のトーナメント）、
+    一様交叉＋突然変異。meta_influence の確率でメタ戦略とも一様交叉する。
+    """
+    parent1 = select_parent(candidate_agents, rng, selection)
+    parent2 = select_parent(candidate_agents, rng, selection)
+
+    child = uniform_crossover(parent1.strategy, parent2.strategy, rng)
+    child = mutate(child, mutation_rate, rng)
+
+    if meta_strategy is not None and rng.random() < meta_influence:
+        # メタ戦略との一様交叉を追加で行う
+        child = uniform_crossover(child, meta_strategy, rng)
+    return child
 
 
 def reproduce_population(
     agents: List[Agent],
-    graph: nx.Graph,
+    graph: Graph | nx.Graph,
     rng: random.Random,
     mutation_rate: float = 0.01,
     meta_influence: float = 0.3,
+    selection: Selection = DEFAULT_SELECTION,
 ) -> None:
     """
     ネットワーク構造と GA に基づき、各エージェントの戦略を更新する。
 
     - 標準GA:
-        各ノードは自分＋隣接ノードから親をトーナメント選択し、
+        各ノードは自分＋隣接ノードから親を選択し（selection, デフォルトはトーナメント）、
         一様交叉＋突然変異により子戦略を生成。
     - メタ環境GA:
         上に加えて、現世代で最頻な戦略を「メタ戦略」とし、
@@ -71,18 +99,184 @@ def reproduce_population(
         neighbors = list(graph.neighbors(node))
         candidate_agents = [agent] + [id_to_agent[n] for n in neighbors]
 
-        parent1 = _tournament_select(candidate_agents, rng)
-        parent2 = _tournament_select(candidate_agents, rng)
-
-        child = uniform_crossover(parent1.strategy, parent2.strategy, rng)
-        child = mutate(child, mutation_rate, rng)
-
-        if meta_strategy is not None and rng.random() < meta_influence:
-            # メタ戦略との一様交叉を追加で行う
-            child = uniform_crossover(child, meta_strategy, rng)
-
-        new_strategies[node] = child
+        new_strategies[node] = make_child(
+            candidate_agents, rng, mutation_rate, meta_strategy, meta_influence, selection
+        )
 
     # 新しい戦略をエージェントに反映
     for agent in agents:
         agent.strategy = new_strategies[agent.id]
+
+
+# ---------------------------------------------------------------------
+# カウンタベース乱数（rng_mode="counter"）による世代交代
+# ---------------------------------------------------------------------
+# ノード i は各用途のストリームの行 i だけを使う。列の割り当て（d = selection.draws）:
+#   select   : 0〜d-1 親 1 の選択, d〜2d-1 親 2 の選択
+#   crossover: 0〜2 各ビット, mutate: 0〜2 各ビット
+#   meta     : 0 メタ戦略と交叉するか, 1〜3 交叉の各ビット
+# 乱数を使わない場合（候補が 1 つなど）も列は消費済みとみなすので、
+# 他のノードや後続の処理の乱数はずれない。
+
+
+def _crossover_counter(s1: Strategy, s2: Strategy, u: np.ndarray) -> Strategy:
+    return tuple(s1[b] if u[b] < 0.5 else s2[b] for b in range(3))  # type: ignore[return-value]
+
+
+def make_child_counter(
+    candidate_agents: List[Agent],
+    u_select: np.ndarray,
+    u_crossover: np.ndarray,
+    u_mutate: np.ndarray,
+    u_meta: np.ndarray,
+    mutation_rate: float,
+    meta_strategy: Strategy,
+    meta_influence: float,
+    selection: Selection = DEFAULT_SELECTION,
+) -> Strategy:
+    """make_child と同じ手順を、ノードに割り当てられた乱数の行で行う。"""
+    d = selection.draws
+    payoffs = [a.payoff for a in candidate_agents]
+    parent1 = candidate_agents[select_index(payoffs, u_select[0:d], selection)]
+    parent2 = candidate_agents[select_index(payoffs, u_select[d:2 * d], selection)]
+
+    child = _crossover_counter(parent1.strategy, parent2.strategy, u_crossover)
+    child = tuple(1 - child[b] if u_mutate[b] < mutation_rate else child[b] for b in range(3))
+
+    if u_meta[0] < meta_influence:
+        child = _crossover_counter(child, meta_strategy, u_meta[1:4])
+    return child  # type: ignore[return-value]
+
+
+def counter_uniforms(
+    streams: CounterStreams,
+    generation: int,
+    n: int,
+    selection: Selection,
+    start: int = 0,
+    stop: int | None = None,
+    rows: np.ndarray | None = None,
+) -> Dict[str, np.ndarray]:
+    """ノード start〜stop-1 の世代交代に使う用途ごとの一様乱数（"select" の幅は選択演算子に合わせる）。"""
+    width = select_width(selection.draws)
+    if rows is not None:
+        # 並べ替えたノードは元の位置の行を使う（全体を読んでから gather）
+        rows = rows[start:stop]
+        return {
+            "select": streams.uniforms(generation, "select", n, width=width)[rows],
+            "crossover": streams.uniforms(generation, "crossover", n)[rows],
+            "mutate": streams.uniforms(generation, "mutate", n)[rows],
+            "meta": streams.uniforms(generation, "meta", n)[rows],
+        }
+    return {
+        "select": streams.uniforms(generation, "select", n, start, stop, width=width),
+        "crossover": streams.uniforms(generation, "crossover", n, start, stop),
+        "mutate": streams.uniforms(generation, "mutate", n, start, stop),
+        "meta": streams.uniforms(generation, "meta", n, start, stop),
+    }
+
+
+def reproduce_population_counter(
+    agents: List[Agent],
+    graph: Graph | nx.Graph,
+    streams: CounterStreams,
+    generation: int,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    selection: Selection = DEFAULT_SELECTION,
+) -> None:
+    """
+    reproduce_population のカウンタベース乱数版（1 ノードずつ処理する参照実装）。
+    メタ戦略は最頻戦略（同数の場合は戦略コードの小さい方）。
+    agents は graph.nodes と同じ順に並んでいること。
+    """
+    n = len(agents)
+    id_to_agent: Dict[int, Agent] = {a.id: a for a in agents}
+    meta_strategy = int_to_strategy(int(np.argmax(agent_histogram(agents))))
+    u = counter_uniforms(streams, generation, n, selection)
+
+    new_strategies: List[Strategy] = []
+    for i, node in enumerate(graph.nodes):
+        candidate_agents = [id_to_agent[node]] + [id_to_agent[m] for m in graph.neighbors(node)]
+        new_strategies.append(
+            make_child_counter(
+                candidate_agents,
+                u["select"][i],
+                u["crossover"][i],
+                u["mutate"][i],
+                u["meta"][i],
+                mutation_rate,
+                meta_strategy,
+                meta_influence,
+                selection,
+            )
+        )
+
+    for agent, strategy in zip(agents, new_strategies):
+        agent.strategy = strategy
+
+
+def _bit_mask(u: np.ndarray, p: float) -> np.ndarray:
+    """u[:, b] < p のビット b（b=0 が最上位ビット）を立てたマスク。"""
+    hit = (u[:, :3] < p).astype(np.int64)
+    return (hit[:, 0] << 2) | (hit[:, 1] << 1) | hit[:, 2]
+
+
+def reproduce_codes_counter(
+    codes: np.ndarray,
+    payoffs: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    streams: CounterStreams,
+    generation: int,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    start: int = 0,
+    stop: int | None = None,
+    selection: Selection = DEFAULT_SELECTION,
+    rows: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    reproduce_population_counter のベクトル化版。CSR 隣接 (indptr, indices) 上で
+    ノード start〜stop-1 の子戦略コードをまとめて計算する（結果は参照実装とビット単位で一致）。
+    親選択は候補区間（自分＋隣接ノード）ごとの配列上で全ノード一括で行う（selection.select_parents）。
+    ノード範囲ごとに別プロセスで計算して連結しても同じ結果になる。
+    rows: ノードを並べ替えて（reorder.py）渡す場合の、各位置のノードの元の位置（= 乱数の行）。
+    """
+    n = len(codes)
+    if stop is None:
+        stop = n
+    nodes = np.arange(start, stop)
+    meta_code = int(np.argmax(np.bincount(codes, minlength=8)))
+    u = counter_uniforms(streams, generation, n, selection, start, stop, rows)
+
+    seg_ptr, candidates = candidate_segments(indptr, indices, nodes)
+    d = selection.draws
+    parent1 = codes[select_parents(selection, payoffs, seg_ptr, candidates, u["select"][:, :d])]
+    parent2 = codes[select_parents(selection, payoffs, seg_ptr, candidates, u["select"][:, d:2 * d])]
+    return counter_children(parent1, parent2, u, meta_code, mutation_rate, meta_influence)
+
+
+def counter_children(
+    parent1: np.ndarray,
+    parent2: np.ndarray,
+    u: Dict[str, np.ndarray],
+    meta_code: int,
+    mutation_rate: float,
+    meta_influence: float,
+) -> np.ndarray:
+    """
+    親の戦略コードの配列から子の戦略コードを作る（一様交叉 → 突然変異 → メタ戦略との交叉）。
+    u は counter_uniforms と同じ用途ごとの一様乱数（"select" 以外を使う）。
+    """
+    parent1 = parent1.astype(np.int64)
+    parent2 = parent2.astype(np.int64)
+
+    mask = _bit_mask(u["crossover"], 0.5)
+    child = (parent1 & mask) | (parent2 & ~mask & 7)
+    child ^= _bit_mask(u["mutate"], mutation_rate)
+
+    meta_mask = _bit_mask(u["meta"][:, 1:], 0.5)
+    with_meta = (child & meta_mask) | (meta_code & ~meta_mask & 7)
+    child = np.where(u["meta"][:, 0] < meta_influence, with_meta, child)
+    return child.astype(np.int8)
@@ -3,8 +3,10 @@ from __future__ import annotations
 from typing import Tuple
 import random
 
+import numpy as np
+
 from network_ipd_ga.agent import Agent
-from network_ipd_ga.strategy import decide_action, C, D
+from network_ipd_ga.strategy import decide_action, int_to_strategy, C, D
 
 # ペイオフ表
 PAYOFF_TABLE = {
@@ -51,3 +53,43 @@ def play_ipd(
         prev_i, prev_j = a_i, a_j
 
     return coop_actions, total_actions
+
+
+def pair_outcome_table(T: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    8 戦略の全ペアについて play_ipd の結果を表にする（戦略は決定的なので対戦結果も一意）。
+
+    戻り値:
+        payoff[a, b]: 戦略 a が戦略 b と T ラウンド対戦したときの a 側の利得
+        coop[a, b]  : その対戦で出た協調(C)の総数（両者合計, 対称）
+    """
+    payoff = np.zeros((8, 8), dtype=np.float64)
+    coop = np.zeros((8, 8), dtype=np.int64)
+    rng = random.Random(0)  # play_ipd は乱数を使わない
+    for a in range(8):
+        for b in range(8):
+            agent_a = Agent(id=0, strategy=int_to_strategy(a))
+            agent_b = Agent(id=1, strategy=int_to_strategy(b))
+            coop[a, b], _ = play_ipd(agent_a, agent_b, T, rng)
+            payoff[a, b] = agent_a.payoff
+    return payoff, coop
+
+
+def pair_action_table(T: int) -> np.ndarray:
+    """
+    coop_by[a, b]: 戦略 a が戦略 b と T ラウンド対戦したときに、a 側が協調(C)した回数。
+    （coop_by + coop_by.T は pair_outcome_table の coop に等しい）
+    """
+    coop_by = np.zeros((8, 8), dtype=np.int64)
+    for a in range(8):
+        for b in range(8):
+            s_a, s_b = int_to_strategy(a), int_to_strategy(b)
+            prev_a = None
+            prev_b = None
+            for t in range(T):
+                act_a = decide_action(s_a, t, prev_b)
+                act_b = decide_action(s_b, t, prev_a)
+                if act_a == C:
+                    coop_by[a, b] += 1
+                prev_a, prev_b = act_a, act_b
+    return coop_by
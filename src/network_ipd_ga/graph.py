@@ -0,0 +1,194 @@
+# graph.py
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Hashable, Iterable, Iterator, Tuple
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+# シミュレーション本体が使う無向グラフ（標準ライブラリのみ）。
+#
+# networkx の import には 100 ms 以上かかり、スイープの各サブプロセスやワーカーの起動が遅くなるため、
+# コアでは networkx.Graph の使う部分（nodes / edges / degree / neighbors / 辺の追加・削除）だけを
+# 同じ意味・同じ順序で持つこのクラスを使う。
+#
+# - 隣接は dict の dict（挿入順）で、ノード・隣接ノード・エッジの列挙順は networkx.Graph と同じ
+#   （network.py の生成関数は networkx と同じ乱数の使い方・同じ順序でグラフを作る）
+# - networkx のグラフが必要な処理（レイアウト・描画など）は to_networkx() / as_networkx() で変換する
+#   （このときだけ networkx を import する）
+# - コアの関数は networkx.Graph を渡しても同じように動く（同じ属性だけを使う）
+
+
+class _NodeView:
+    """graph.nodes（反復・len・in・graph.nodes() の呼び出しに対応）。"""
+
+    def __init__(self, adj: Dict[Hashable, Dict]) -> None:
+        self._adj = adj
+
+    def __iter__(self) -> Iterator:
+        return iter(self._adj)
+
+    def __len__(self) -> int:
+        return len(self._adj)
+
+    def __contains__(self, node) -> bool:
+        return node in self._adj
+
+    def __call__(self) -> _NodeView:
+        return self
+
+
+class _EdgeView:
+    """graph.edges。各エッジを 1 回ずつ、networkx と同じ順序 (u, v) で列挙する。"""
+
+    def __init__(self, adj: Dict[Hashable, Dict]) -> None:
+        self._adj = adj
+
+    def __iter__(self) -> Iterator[Tuple]:
+        seen = set()
+        for u, nbrs in self._adj.items():
+            for v in nbrs:
+                if v not in seen:
+                    yield u, v
+            seen.add(u)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __call__(self) -> _EdgeView:
+        return self
+
+
+class _DegreeView:
+    """graph.degree（(node, 次数) の反復, graph.degree(node), graph.degree[node]）。"""
+
+    def __init__(self, adj: Dict[Hashable, Dict]) -> None:
+        self._adj = adj
+
+    def __getitem__(self, node) -> int:
+        nbrs = self._adj[node]
+        return len(nbrs) + (node in nbrs)  # 自己ループは 2 と数える（networkx と同じ）
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for node in self._adj:
+            yield node, self[node]
+
+    def __len__(self) -> int:
+        return len(self._adj)
+
+    def __call__(self, node=None):
+        return self if node is None else self[node]
+
+
+class Graph:
+    """無向の単純グラフ（networkx.Graph の部分集合）。"""
+
+    def __init__(self, nodes: Iterable[Hashable] = ()) -> None:
+        self._adj: Dict[Hashable, Dict[Hashable, None]] = {}
+        self.graph: dict = {}
+        self.add_nodes_from(nodes)
+
+    # --- 参照 -----------------------------------------------------------------
+    @property
+    def nodes(self) -> _NodeView:
+        return _NodeView(self._adj)
+
+    @property
+    def edges(self) -> _EdgeView:
+        return _EdgeView(self._adj)
+
+    @property
+    def degree(self) -> _DegreeView:
+        return _DegreeView(self._adj)
+
+    def neighbors(self, node) -> Iterator:
+        try:
+            return iter(self._adj[node])
+        except KeyError:
+            raise ValueError(f"The node {node} is not in the graph.") from None
+
+    def has_edge(self, u, v) -> bool:
+        return u in self._adj and v in self._adj[u]
+
+    def number_of_nodes(self) -> int:
+        return len(self._adj)
+
+    def number_of_edges(self) -> int:
+        loops = sum(1 for node, nbrs in self._adj.items() if node in nbrs)
+        return (sum(len(nbrs) for nbrs in self._adj.values()) + loops) // 2
+
+    def __len__(self) -> int:
+        return len(self._adj)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._adj)
+
+    def __contains__(self, node) -> bool:
+        return node in self._adj
+
+    # --- 変更 -----------------------------------------------------------------
+    def add_node(self, node) -> None:
+        if node not in self._adj:
+            self._adj[node] = {}
+
+    def add_nodes_from(self, nodes: Iterable[Hashable]) -> None:
+        for node in nodes:
+            self.add_node(node)
+
+    def add_edge(self, u, v) -> None:
+        self.add_node(u)
+        self.add_node(v)
+        self._adj[u][v] = None
+        self._adj[v][u] = None
+
+    def add_edges_from(self, edges: Iterable[Tuple]) -> None:
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def remove_edge(self, u, v) -> None:
+        try:
+            del self._adj[u][v]
+            if u != v:
+                del self._adj[v][u]
+        except KeyError:
+            raise ValueError(f"The edge {u}-{v} is not in the graph.") from None
+
+    def remove_edges_from(self, edges: Iterable[Tuple]) -> None:
+        """存在しないエッジは無視する（networkx と同じ）。"""
+        for u, v in edges:
+            if self.has_edge(u, v):
+                self.remove_edge(u, v)
+
+    def copy(self) -> Graph:
+        G = Graph()
+        G._adj = {node: dict(nbrs) for node, nbrs in self._adj.items()}
+        G.graph = dict(self.graph)
+        return G
+
+    # --- networkx との変換 -----------------------------------------------------
+    def to_networkx(self) -> nx.Graph:
+        """networkx.Graph に変換する（ノード・エッジの列挙順は保たれる）。"""
+        import networkx as nx
+
+        G = nx.Graph()
+        G.graph.update(self.graph)
+        G.add_nodes_from(self._adj)
+        G.add_edges_from(self.edges)
+        return G
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph) -> Graph:
+        """networkx.Graph から作る（隣接ノードの順序も保つ）。"""
+        graph = cls()
+        graph._adj = {node: dict.fromkeys(G.neighbors(node)) for node in G.nodes}
+        graph.graph = dict(G.graph)
+        return graph
+
+    def __repr__(self) -> str:
+        return f"Graph(nodes={self.number_of_nodes()}, edges={self.number_of_edges()})"
+
+
+def as_networkx(graph) -> nx.Graph:
+    """Graph なら networkx.Graph に変換し、それ以外（networkx のグラフ）はそのまま返す。"""
+    if isinstance(graph, Graph):
+        return graph.to_networkx()
+    return graph
@@ -0,0 +1,312 @@
+# history.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 差分符号化したノード履歴。
+#
+# K 世代ごとに全ノードの戦略・利得（キーフレーム）を持ち、その間の世代は
+# 前世代から変わったノードだけを (ノード添字, 新しい値) の疎な配列で持つ。
+# 任意の世代は「直前のキーフレーム + それ以降の差分」で O(K·変化数) で復元できる。
+#
+# ファイル形式（*.nhist, リトルエンディアン, 各配列は 8 バイト境界にそろえる）:
+#   ヘッダ  : MAGIC, num_nodes (int64), keyframe_interval (int64), node_ids (int64[num_nodes])
+#   レコード: キーフレーム = 戦略 int8[n], 利得 float64[n]
+#             差分         = 戦略の (添字 int32[c], 値 int8[c]), 利得の (添字 int32[m], 値 float64[m])
+#   索引    : 世代ごとに (generation, offset, keyframe, c, m) の int64 配列
+#   末尾    : 索引の offset (int64), 世代数 (int64), MAGIC
+# 読み込みは np.memmap で行い、必要なレコードだけをページインする。
+
+MAGIC = b"NIPDHST1"
+DEFAULT_KEYFRAME_INTERVAL = 50
+HISTORY_SUFFIX = ".nhist"
+
+_INDEX_DTYPE = np.dtype(
+    [
+        ("generation", "<i8"),
+        ("offset", "<i8"),
+        ("keyframe", "<i8"),
+        ("num_strategy_changes", "<i8"),
+        ("num_payoff_changes", "<i8"),
+    ]
+)
+_TRAILER_SIZE = 8 + 8 + len(MAGIC)
+
+# 戦略コード 0〜7 -> ビット列 "000"〜"111"
+_BITS = np.array([format(i, "03b") for i in range(8)], dtype=object)
+
+
+def _padded(nbytes: int) -> int:
+    return (nbytes + 7) // 8 * 8
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    """
+    1 世代分の符号化済みノード状態。
+    keyframe=True のとき strategy_values / payoff_values は全ノード分（添字は空）。
+    """
+
+    keyframe: bool
+    strategy_index: np.ndarray  # int32
+    strategy_values: np.ndarray  # int8
+    payoff_index: np.ndarray  # int32
+    payoff_values: np.ndarray  # float64
+
+    def to_blobs(self) -> Tuple[bytes, bytes]:
+        """結果ストア用のバイト列（戦略, 利得）にする。"""
+        if self.keyframe:
+            return self.strategy_values.tobytes(), self.payoff_values.tobytes()
+        return (
+            self.strategy_index.tobytes() + self.strategy_values.tobytes(),
+            self.payoff_index.tobytes() + self.payoff_values.tobytes(),
+        )
+
+    @classmethod
+    def from_blobs(cls, keyframe: bool, s_blob: bytes, p_blob: bytes) -> HistoryRecord:
+        """to_blobs の逆変換。"""
+        empty = np.empty(0, dtype=np.int32)
+        if keyframe:
+            return cls(
+                True,
+                empty,
+                np.frombuffer(s_blob, dtype=np.int8),
+                empty,
+                np.frombuffer(p_blob, dtype=np.float64),
+            )
+        c = len(s_blob) // 5
+        m = len(p_blob) // 12
+        return cls(
+            False,
+            np.frombuffer(s_blob, dtype=np.int32, count=c),
+            np.frombuffer(s_blob, dtype=np.int8, offset=4 * c),
+            np.frombuffer(p_blob, dtype=np.int32, count=m),
+            np.frombuffer(p_blob, dtype=np.float64, offset=4 * m),
+        )
+
+    def apply(self, strategies: np.ndarray, payoffs: np.ndarray) -> None:
+        """前世代の状態 (strategies, payoffs) をこの世代の状態に書き換える。"""
+        if self.keyframe:
+            strategies[:] = self.strategy_values
+            payoffs[:] = self.payoff_values
+        else:
+            strategies[self.strategy_index] = self.strategy_values
+            payoffs[self.payoff_index] = self.payoff_values
+
+
+class DeltaEncoder:
+    """世代ごとの全ノード状態を、keyframe_interval 世代ごとのキーフレーム + 差分に符号化する。"""
+
+    def __init__(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be >= 1.")
+        self.keyframe_interval = keyframe_interval
+        self.count = 0
+        self.prev_strategies: np.ndarray | None = None
+        self.prev_payoffs: np.ndarray | None = None
+
+    def encode(self, strategies: np.ndarray, payoffs: np.ndarray) -> HistoryRecord:
+        strategies = np.ascontiguousarray(strategies, dtype=np.int8)
+        payoffs = np.ascontiguousarray(payoffs, dtype=np.float64)
+        keyframe = self.count % self.keyframe_interval == 0
+        self.count += 1
+
+        if keyframe:
+            empty = np.empty(0, dtype=np.int32)
+            record = HistoryRecord(True, empty, strategies.copy(), empty, payoffs.copy())
+        else:
+            s_idx = np.flatnonzero(strategies != self.prev_strategies).astype(np.int32)
+            p_idx = np.flatnonzero(payoffs != self.prev_payoffs).astype(np.int32)
+            record = HistoryRecord(False, s_idx, strategies[s_idx], p_idx, payoffs[p_idx])
+
+        self.prev_strategies = strategies.copy()
+        self.prev_payoffs = payoffs.copy()
+        return record
+
+
+class HistoryWriter:
+    """差分符号化したノード履歴を .nhist ファイルに追記する。close で索引を書き込む。"""
+
+    def __init__(
+        self,
+        path: Path,
+        node_ids: np.ndarray,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.encoder = DeltaEncoder(keyframe_interval)
+        self.num_nodes = len(node_ids)
+        self.index: list[tuple] = []
+        self.f: BinaryIO = path.open("wb")
+        self.f.write(MAGIC)
+        self.f.write(np.array([self.num_nodes, keyframe_interval], dtype="<i8").tobytes())
+        self.f.write(np.ascontiguousarray(node_ids, dtype="<i8").tobytes())
+
+    def _write_array(self, a: np.ndarray) -> None:
+        data = a.tobytes()
+        self.f.write(data)
+        self.f.write(b"\0" * (_padded(len(data)) - len(data)))
+
+    def write(self, generation: int, strategies: np.ndarray, payoffs: np.ndarray) -> None:
+        if len(strategies) != self.num_nodes:
+            raise ValueError(f"Expected {self.num_nodes} nodes, got {len(strategies)}.")
+        record = self.encoder.encode(strategies, payoffs)
+        offset = self.f.tell()
+        if record.keyframe:
+            self._write_array(record.strategy_values)
+            self._write_array(record.payoff_values)
+        else:
+            self._write_array(record.strategy_index)
+            self._write_array(record.strategy_values)
+            self._write_array(record.payoff_index)
+            self._write_array(record.payoff_values)
+        self.index.append(
+            (
+                int(generation),
+                offset,
+                int(record.keyframe),
+                len(record.strategy_index),
+                len(record.payoff_index),
+            )
+        )
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        index_offset = self.f.tell()
+        self.f.write(np.array(self.index, dtype=_INDEX_DTYPE).tobytes())
+        self.f.write(np.array([index_offset, len(self.index)], dtype="<i8").tobytes())
+        self.f.write(MAGIC)
+        self.f.close()
+
+
+class NodeHistory:
+    """
+    .nhist ファイルの読み込み（np.memmap）。
+
+        with NodeHistory(path) as h:
+            strategies, payoffs = h.state(100)      # 任意の世代を O(K·変化数) で復元
+            for gen, s, p in h.iter_states(): ...   # 先頭から順に O(変化数) ずつ
+            node_df = h.to_frame()                  # run_simulation の node_df と同じ形式
+
+    戦略・利得の配列は node_ids と同じ並び（graph.nodes の順）。
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if bytes(self.mm[: len(MAGIC)]) != MAGIC or bytes(self.mm[-len(MAGIC):]) != MAGIC:
+            raise ValueError(f"Not a complete node history file: {self.path}")
+
+        self.num_nodes, self.keyframe_interval = (
+            int(x) for x in np.frombuffer(self.mm, dtype="<i8", count=2, offset=len(MAGIC))
+        )
+        self.node_ids = np.frombuffer(self.mm, dtype="<i8", count=self.num_nodes, offset=len(MAGIC) + 16)
+
+        index_offset, num_records = np.frombuffer(
+            self.mm, dtype="<i8", count=2, offset=len(self.mm) - _TRAILER_SIZE
+        )
+        self.index = np.frombuffer(
+            self.mm, dtype=_INDEX_DTYPE, count=int(num_records), offset=int(index_offset)
+        )
+        self.generations = self.index["generation"]
+        self._position = {int(g): i for i, g in enumerate(self.generations)}
+        # 各レコード位置から見て直前（自身を含む）のキーフレームの位置
+        positions = np.arange(len(self.index))
+        self._keyframe_of = np.maximum.accumulate(np.where(self.index["keyframe"] == 1, positions, 0))
+
+    def close(self) -> None:
+        # 返した配列がビューとして参照している間はマッピングが残る（参照がなくなれば解放）
+        self.mm = None
+
+    def __enter__(self) -> NodeHistory:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def record(self, pos: int) -> HistoryRecord:
+        """pos 番目（世代番号ではなく記録順）のレコードを memmap 上のビューとして返す。"""
+        _, offset, keyframe, c, m = (int(x) for x in self.index[pos])
+        if keyframe:
+            n = self.num_nodes
+            s = np.frombuffer(self.mm, dtype=np.int8, count=n, offset=offset)
+            p = np.frombuffer(self.mm, dtype="<f8", count=n, offset=offset + _padded(n))
+            empty = np.empty(0, dtype=np.int32)
+            return HistoryRecord(True, empty, s, empty, p)
+
+        s_idx = np.frombuffer(self.mm, dtype="<i4", count=c, offset=offset)
+        offset += _padded(4 * c)
+        s_val = np.frombuffer(self.mm, dtype=np.int8, count=c, offset=offset)
+        offset += _padded(c)
+        p_idx = np.frombuffer(self.mm, dtype="<i4", count=m, offset=offset)
+        offset += _padded(4 * m)
+        p_val = np.frombuffer(self.mm, dtype="<f8", count=m, offset=offset)
+        return HistoryRecord(False, s_idx, s_val, p_idx, p_val)
+
+    def state(self, generation: int) -> Tuple[np.ndarray, np.ndarray]:
+        """generation の (戦略コード int8[n], 利得 float64[n])。"""
+        if generation not in self._position:
+            raise KeyError(f"Generation {generation} not in {self.path}")
+        pos = self._position[generation]
+        strategies = np.empty(self.num_nodes, dtype=np.int8)
+        payoffs = np.empty(self.num_nodes, dtype=np.float64)
+        for i in range(int(self._keyframe_of[pos]), pos + 1):
+            self.record(i).apply(strategies, payoffs)
+        return strategies, payoffs
+
+    def strategies(self, generation: int) -> np.ndarray:
+        return self.state(generation)[0]
+
+    def payoffs(self, generation: int) -> np.ndarray:
+        return self.state(generation)[1]
+
+    def iter_states(
+        self, generations: Sequence[int] | None = None
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """(generation, 戦略, 利得) を記録順に返す（generations を指定するとその世代だけ）。"""
+        wanted = None if generations is None else {int(g) for g in generations}
+        strategies = np.empty(self.num_nodes, dtype=np.int8)
+        payoffs = np.empty(self.num_nodes, dtype=np.float64)
+        if wanted is None:
+            start, stop = 0, len(self.index)
+        else:
+            positions = [self._position[g] for g in wanted if g in self._position]
+            if not positions:
+                return
+            start, stop = int(self._keyframe_of[min(positions)]), max(positions) + 1
+        for i in range(start, stop):
+            self.record(i).apply(strategies, payoffs)
+            gen = int(self.generations[i])
+            if wanted is None or gen in wanted:
+                yield gen, strategies.copy(), payoffs.copy()
+
+    def to_frame(self, generations: Sequence[int] | None = None) -> pd.DataFrame:
+        """run_simulation の node_df と同じ形式の DataFrame にする。"""
+        import pandas as pd
+
+        frames = [
+            pd.DataFrame(
+                {
+                    "generation": gen,
+                    "node_id": self.node_ids,
+                    "strategy_int": s.astype(np.int64),
+                    "strategy_bits": _BITS[s],
+                    "payoff": p,
+                }
+            )
+            for gen, s, p in self.iter_states(generations)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["generation", "node_id", "strategy_int", "strategy_bits", "payoff"])
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,304 @@
+# kernels.py
+from __future__ import annotations
+from typing import Tuple
+import logging
+import os
+import random
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.selection import DEFAULT_SELECTION, Selection
+
+# JIT コンパイルした内側のループ（engine="jit"）。
+#
+# 同期更新の 1 世代の
+#   - 全エッジの繰り返し囚人のジレンマと利得の加算（game.play_ipd のラウンドのループ）
+#   - 親選択（トーナメント / ルーレット / ランク）・一様交叉・突然変異・メタ戦略との交叉
+#     （ga.reproduce_population, selection.select_parent）
+# を、戦略コード（0〜7）・利得・CSR 隣接 (indptr, indices) の NumPy 配列の上のループとして書き、
+# Numba があれば njit でネイティブコードにする。コンパイル結果はディスクにキャッシュされ
+# （cache=True, 場所は NUMBA_CACHE_DIR で変更可）、2 回目以降のプロセスではコンパイルしない。
+#
+# 逐次の乱数（rng_mode="sequential"）は random.Random と同じ Mersenne Twister をカーネル内で進め、
+# 終了後に状態を random.Random に書き戻す。random() / choice() の乱数の使い方も CPython と同じなので、
+# 結果は Python の実装とビット単位で一致する。Fermi 則の親選択は exp の丸めが NumPy と一致する保証が
+# ないため、カーネルを使わない（対戦のみカーネル）。
+#
+# Numba がない（または NETWORK_IPD_GA_JIT=0）のときは AVAILABLE が False になり、
+# simulation.py は従来の Python の実装で実行する。このモジュールは engine="jit" のときだけ import する
+# （numba の import は重いため）。
+
+try:
+    if os.environ.get("NETWORK_IPD_GA_JIT", "1") == "0":
+        raise ImportError("disabled by NETWORK_IPD_GA_JIT=0")
+    import numba
+
+    AVAILABLE = True
+    jit = numba.njit(cache=True, nogil=True)
+except ImportError:
+    AVAILABLE = False
+
+    def jit(func):
+        return func
+
+
+# 親選択の演算子のコード（カーネルに文字列を渡さない）
+_OPERATOR_CODES = {"tournament": 0, "roulette": 1, "rank": 2}
+
+# Mersenne Twister（MT19937）の定数
+_N = 624
+_M = 397
+
+
+def supports(selection: Selection) -> bool:
+    """selection の世代交代をカーネルで計算できるか（Fermi 則は不可）。"""
+    return selection.operator in _OPERATOR_CODES
+
+
+# ---------------------------------------------------------------------
+# 対戦
+# ---------------------------------------------------------------------
+@jit
+def _play_pair(a: int, b: int, T: int) -> Tuple[int, int, int]:
+    """戦略コード a, b の T ラウンドの対戦（game.play_ipd と同じ）。戻り値: (a の利得, b の利得, 協調の総数)。"""
+    prev_a = -1
+    prev_b = -1
+    pay_a = 0
+    pay_b = 0
+    coop = 0
+    for t in range(T):
+        # t == 0 は b0（最上位ビット）, 以降は相手の直前の行動が D なら b1, C なら b2
+        if t == 0:
+            act_a = (a >> 2) & 1
+            act_b = (b >> 2) & 1
+        else:
+            act_a = (a >> (1 - prev_b)) & 1
+            act_b = (b >> (1 - prev_a)) & 1
+        if act_a == 1 and act_b == 1:
+            pay_a += 3
+            pay_b += 3
+        elif act_a == 1:
+            pay_b += 5
+        elif act_b == 1:
+            pay_a += 5
+        else:
+            pay_a += 1
+            pay_b += 1
+        coop += act_a + act_b
+        prev_a = act_a
+        prev_b = act_b
+    return pay_a, pay_b, coop
+
+
+@jit
+def play_edges(codes: np.ndarray, edge_u: np.ndarray, edge_v: np.ndarray, T: int, payoffs: np.ndarray) -> int:
+    """
+    全エッジ (edge_u[e], edge_v[e]) で対戦し、payoffs（ノード位置ごと）に利得を加える。
+    戦略は 8 種類なので先に 8×8 の対戦結果を作り、エッジごとは表引きだけにする。戻り値: 協調の総数。
+    """
+    pay = np.zeros((8, 8), dtype=np.int64)
+    coop = np.zeros((8, 8), dtype=np.int64)
+    for a in range(8):
+        for b in range(8):
+            pa, pb, c = _play_pair(a, b, T)
+            pay[a, b] = pa
+            coop[a, b] = c
+    total = 0
+    for e in range(len(edge_u)):
+        u = edge_u[e]
+        v = edge_v[e]
+        cu = codes[u]
+        cv = codes[v]
+        payoffs[u] += pay[cu, cv]
+        payoffs[v] += pay[cv, cu]
+        total += coop[cu, cv]
+    return total
+
+
+# ---------------------------------------------------------------------
+# random.Random と同じ乱数列（MT19937, CPython の _randommodule.c と同じ手順）
+# ---------------------------------------------------------------------
+@jit
+def _genrand(mt: np.ndarray, pos: np.ndarray) -> int:
+    """32 ビットの乱数を 1 つ取り出す（mt: 624 語の状態, pos[0]: 次に使う位置）。"""
+    if pos[0] >= _N:
+        for kk in range(_N):
+            y = (mt[kk] & 0x80000000) | (mt[(kk + 1) % _N] & 0x7FFFFFFF)
+            mag = 0x9908B0DF if y & 1 else 0
+            mt[kk] = mt[(kk + _M) % _N] ^ (y >> 1) ^ mag
+        pos[0] = 0
+    y = mt[pos[0]]
+    pos[0] += 1
+    y ^= y >> 11
+    y ^= (y << 7) & 0x9D2C5680
+    y ^= (y << 15) & 0xEFC60000
+    y ^= y >> 18
+    return y & 0xFFFFFFFF
+
+
+@jit
+def _random(mt: np.ndarray, pos: np.ndarray) -> float:
+    """random.Random.random() と同じ 53 ビット精度の [0, 1) の乱数。"""
+    a = _genrand(mt, pos) >> 5
+    b = _genrand(mt, pos) >> 6
+    return (a * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+
+@jit
+def _randbelow(n: int, mt: np.ndarray, pos: np.ndarray) -> int:
+    """random.Random._randbelow(n)（choice が使う棄却法, n < 2**32）。"""
+    k = 0
+    m = n
+    while m > 0:
+        k += 1
+        m >>= 1
+    r = _genrand(mt, pos) >> (32 - k)
+    while r >= n:
+        r = _genrand(mt, pos) >> (32 - k)
+    return r
+
+
+def _get_state(rng: random.Random) -> Tuple[np.ndarray, np.ndarray]:
+    version, internal, _ = rng.getstate()
+    return np.array(internal[:_N], dtype=np.int64), np.array([internal[_N]], dtype=np.int64)
+
+
+def _set_state(rng: random.Random, mt: np.ndarray, pos: np.ndarray) -> None:
+    version, _, gauss_next = rng.getstate()
+    rng.setstate((version, tuple(int(x) for x in mt) + (int(pos[0]),), gauss_next))
+
+
+# ---------------------------------------------------------------------
+# 世代交代
+# ---------------------------------------------------------------------
+@jit
+def _candidate(i: int, j: int, indptr: np.ndarray, indices: np.ndarray) -> int:
+    """ノード i の候補 j（0 が自分, 以降は隣接ノード）。"""
+    if j == 0:
+        return i
+    return indices[indptr[i] + j - 1]
+
+
+@jit
+def _select(i, indptr, indices, payoffs, op, k, mt, pos, weights):
+    """selection.select_parent と同じ乱数の使い方で、ノード i の親のノード位置を選ぶ。"""
+    c = indptr[i + 1] - indptr[i] + 1
+    if op == 0:
+        # トーナメント: 候補 1 つなら乱数を使わない, 同点は先に引いた方
+        if c == 1:
+            return i
+        best = -1
+        for _ in range(min(k, c)):
+            node = _candidate(i, _randbelow(c, mt, pos), indptr, indices)
+            if best < 0 or payoffs[node] > payoffs[best]:
+                best = node
+        return best
+
+    u = _random(mt, pos)
+    for j in range(c):
+        weights[j] = payoffs[_candidate(i, j, indptr, indices)]
+    if op == 2:
+        # 順位（昇順に 1, 2, …, 同点は候補の並び順）
+        order = np.argsort(weights[:c], kind="mergesort")
+        for r in range(c):
+            weights[order[r]] = r + 1
+    # selection._proportional_index
+    total = 0.0
+    for j in range(c):
+        total += weights[j]
+        weights[j] = total
+    if total <= 0:
+        return _candidate(i, int(u * c), indptr, indices)
+    target = np.floor(u * total)
+    for j in range(c):
+        if weights[j] > target:
+            return _candidate(i, j, indptr, indices)
+    return _candidate(i, c - 1, indptr, indices)
+
+
+@jit
+def _crossover(s1: int, s2: int, mt: np.ndarray, pos: np.ndarray) -> int:
+    """ga.uniform_crossover（ビット b0 = 最上位ビットから順に乱数を引く）。"""
+    child = 0
+    for bit in range(2, -1, -1):
+        src = s1 if _random(mt, pos) < 0.5 else s2
+        child |= src & (1 << bit)
+    return child
+
+
+@jit
+def _reproduce(codes, payoffs, indptr, indices, op, k, mutation_rate, meta_influence, meta_code, mt, pos):
+    n = len(codes)
+    new_codes = np.empty(n, dtype=np.int8)
+    weights = np.empty(n + 1, dtype=np.float64)
+    for i in range(n):
+        p1 = _select(i, indptr, indices, payoffs, op, k, mt, pos, weights)
+        p2 = _select(i, indptr, indices, payoffs, op, k, mt, pos, weights)
+        child = _crossover(codes[p1], codes[p2], mt, pos)
+        for bit in range(2, -1, -1):
+            if _random(mt, pos) < mutation_rate:
+                child ^= 1 << bit
+        if _random(mt, pos) < meta_influence:
+            child = _crossover(child, meta_code, mt, pos)
+        new_codes[i] = child
+    return new_codes
+
+
+def meta_code_sequential(codes: np.ndarray) -> int:
+    """
+    ga.reproduce_population のメタ戦略（Counter.most_common と同じく、
+    最頻の戦略のうちノードの並びで最初に現れるもの）。
+    """
+    counts = np.bincount(codes, minlength=8)
+    tied = np.flatnonzero(counts == counts.max())
+    if len(tied) == 1:
+        return int(tied[0])
+    first = [int(np.argmax(codes == c)) for c in tied]
+    return int(tied[int(np.argmin(first))])
+
+
+def reproduce_codes_sequential(
+    codes: np.ndarray,
+    payoffs: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    rng: random.Random,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    selection: Selection = DEFAULT_SELECTION,
+) -> np.ndarray:
+    """
+    ga.reproduce_population のカーネル版。codes / payoffs は graph.nodes の並び、(indptr, indices) は
+    network.csr_adjacency。rng の乱数を同じ順序で消費して状態を進め、子の戦略コード（int8）を返す。
+    """
+    if not supports(selection):
+        raise ValueError(f"Selection {selection.operator!r} is not supported by the JIT kernels.")
+    mt, pos = _get_state(rng)
+    new_codes = _reproduce(
+        codes.astype(np.int64),
+        payoffs.astype(np.float64),
+        indptr,
+        indices,
+        _OPERATOR_CODES[selection.operator],
+        selection.k,
+        float(mutation_rate),
+        float(meta_influence),
+        meta_code_sequential(codes),
+        mt,
+        pos,
+    )
+    _set_state(rng, mt, pos)
+    return new_codes
+
+
+def warm_up() -> None:
+    """小さな入力で全カーネルを 1 回呼ぶ（キャッシュがなければここでコンパイルする）。"""
+    codes = np.array([0, 5, 7], dtype=np.int8)
+    edge_u, edge_v = np.array([0, 1], dtype=np.int64), np.array([1, 2], dtype=np.int64)
+    payoffs = np.zeros(3)
+    play_edges(codes, edge_u, edge_v, 2, payoffs)
+    indptr, indices = np.array([0, 1, 3, 4]), np.array([1, 0, 2, 1])
+    for op in _OPERATOR_CODES:
+        reproduce_codes_sequential(codes, payoffs, indptr, indices, random.Random(0), selection=Selection(op))
+    logger.debug("JIT kernels ready")
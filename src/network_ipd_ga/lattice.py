@@ -0,0 +1,214 @@
+# lattice.py
+from __future__ import annotations
+from typing import Dict, Generator, List, Literal, Tuple
+import math
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.agent import Agent
+from network_ipd_ga.game import pair_action_table, pair_outcome_table
+from network_ipd_ga.ga import counter_children, counter_uniforms
+from network_ipd_ga.metrics import (
+    assortativity_from_pair_counts,
+    cluster_metrics,
+    same_strategy_clusters,
+    strategy_pair_counts,
+)
+from network_ipd_ga.rng import CounterStreams, initial_strategy_codes
+from network_ipd_ga.selection import DEFAULT_SELECTION, Selection, select_parents_dense
+from network_ipd_ga.snapshot import GenerationSnapshot, summary_metrics
+from network_ipd_ga.strategy import int_to_strategy
+
+# 周期境界の 2 次元正方格子（lattice）。空間 IPD の標準的な設定。
+#
+# 戦略・利得は (高さ H, 幅 W) の 2 次元配列で持ち、ノード ID は行優先（id = y * W + x）。
+# 隣接は近傍のオフセット (dy, dx) の並びだけで表し、エッジリストも隣接の辞書も作らない。
+#   - 利得: オフセットごとに戦略の配列を周期的にシフトし（np.roll）、8×8 のペア対戦表から
+#           payoff += P[自分の戦略, シフトした戦略] と足し込む（戦略は決定的なので対戦表で厳密）
+#   - 親選択: 自分＋近傍の利得・戦略をシフトで (ノード数, 候補数) の配列に積み、
+#             selection.select_parents_dense で全ノード一括に選ぶ
+#   - 空間メトリクス: 半分のオフセット（各エッジを 1 回ずつ）のシフトで同戦略エッジ・戦略ペアを数える
+#     （クラスタだけは同戦略の隣接ペアの添字でラベル伝播する）
+#
+# 乱数は rng_mode によらず常にカウンタベース（ノード i は行 i）。近傍を同じ順序で並べた CSR 上の
+# counter モードのエンジンと結果はビット単位で一致する。
+#
+#   von_neumann: 上下左右の 4 近傍（デフォルト）
+#   moore      : 斜めを含む 8 近傍
+LatticeNeighborhood = Literal["von_neumann", "moore"]
+NEIGHBORHOODS: Dict[str, Tuple[Tuple[int, int], ...]] = {
+    "von_neumann": ((-1, 0), (0, -1), (0, 1), (1, 0)),
+    "moore": ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)),
+}
+
+
+def lattice_shape(num_agents: int, width: int | None = None) -> Tuple[int, int]:
+    """
+    ノード数と幅から格子の形 (H, W) を決める。width=None なら正方格子（num_agents は平方数）。
+    近傍が重ならないよう H, W >= 3 を要求する。
+    """
+    if width is None:
+        width = math.isqrt(num_agents)
+    if width <= 0 or num_agents % width != 0:
+        raise ValueError(f"num_agents={num_agents} is not divisible into rows of width {width}.")
+    height = num_agents // width
+    if height < 3 or width < 3:
+        raise ValueError(f"Lattice must be at least 3x3 (got {height}x{width}).")
+    return height, width
+
+
+def neighbor_offsets(neighborhood: LatticeNeighborhood) -> Tuple[Tuple[int, int], ...]:
+    """近傍のオフセット (dy, dx) の並び（隣接ノードの順序）。"""
+    if neighborhood not in NEIGHBORHOODS:
+        raise ValueError(f"Unknown lattice neighborhood: {neighborhood}")
+    return NEIGHBORHOODS[neighborhood]
+
+
+def shift(grid: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    """周期境界でのシフト。戻り値[y, x] = grid[(y + dy) % H, (x + dx) % W]。"""
+    return np.roll(grid, (-dy, -dx), axis=(0, 1))
+
+
+def lattice_payoffs(
+    grid: np.ndarray,
+    offsets: Tuple[Tuple[int, int], ...],
+    payoff_table: np.ndarray,
+    coop_by_table: np.ndarray,
+) -> Tuple[np.ndarray, int]:
+    """
+    全ノードの利得（2 次元配列）と協調(C)の総数を近傍のシフトで求める。
+    各エッジは両端から 1 回ずつ数えるので、協調の総数は各ノードの自分の協調の和。
+    """
+    own = grid.astype(np.int64) * 8
+    payoffs = np.zeros(grid.shape, dtype=np.float64)
+    coop_actions = 0
+    for dy, dx in offsets:
+        pair = own + shift(grid, dy, dx)
+        payoffs += payoff_table.ravel()[pair]
+        coop_actions += int(coop_by_table.ravel()[pair].sum())
+    return payoffs, coop_actions
+
+
+def lattice_spatial_metrics(grid: np.ndarray, offsets: Tuple[Tuple[int, int], ...]) -> dict:
+    """空間構造メトリクス（metrics.spatial_metrics と同じ列）をシフトから計算する。"""
+    # 各エッジを 1 回ずつ数えるため、オフセットの半分（(dy, dx) > (0, 0)）だけを使う
+    half = [(dy, dx) for dy, dx in offsets if (dy, dx) > (0, 0)]
+    node_index = np.arange(grid.size).reshape(grid.shape)
+    counts = np.zeros((8, 8), dtype=np.int64)
+    same_u, same_v = [], []
+    for dy, dx in half:
+        other = shift(grid, dy, dx)
+        counts += strategy_pair_counts(grid, other)
+        same = (grid == other).ravel()
+        same_u.append(np.flatnonzero(same))
+        same_v.append(shift(node_index, dy, dx).ravel()[same])
+    num_edges = grid.size * len(half)
+    labels = same_strategy_clusters(grid.ravel(), np.concatenate(same_u), np.concatenate(same_v))
+    return {
+        "same_strategy_edge_frac": float(np.trace(counts)) / num_edges,
+        "strategy_assortativity": assortativity_from_pair_counts(counts),
+        **cluster_metrics(labels),
+    }
+
+
+def reproduce_grid(
+    grid: np.ndarray,
+    payoffs: np.ndarray,
+    offsets: Tuple[Tuple[int, int], ...],
+    streams: CounterStreams,
+    generation: int,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    selection: Selection = DEFAULT_SELECTION,
+) -> np.ndarray:
+    """全ノードの子戦略を、自分＋近傍を候補とする親選択でまとめて計算する（戻り値も 2 次元配列）。"""
+    n = grid.size
+    codes = grid.ravel()
+    meta_code = int(np.argmax(np.bincount(codes, minlength=8)))
+    cand_payoffs = np.stack(
+        [payoffs.ravel()] + [shift(payoffs, dy, dx).ravel() for dy, dx in offsets], axis=1
+    )
+    cand_codes = np.stack([codes] + [shift(grid, dy, dx).ravel() for dy, dx in offsets], axis=1)
+    rows = np.arange(n)
+
+    u = counter_uniforms(streams, generation, n, selection)
+    d = selection.draws
+    parent1 = cand_codes[rows, select_parents_dense(selection, cand_payoffs, u["select"][:, :d])]
+    parent2 = cand_codes[rows, select_parents_dense(selection, cand_payoffs, u["select"][:, d:2 * d])]
+    child = counter_children(parent1, parent2, u, meta_code, mutation_rate, meta_influence)
+    return child.reshape(grid.shape)
+
+
+def iter_lattice_simulation(
+    num_agents: int,
+    generations: int,
+    T: int,
+    mutation_rate: float,
+    meta_influence: float,
+    seed: int,
+    width: int | None = None,
+    neighborhood: LatticeNeighborhood = "von_neumann",
+    spatial_metrics: bool = True,
+    selection: Selection = DEFAULT_SELECTION,
+) -> Generator[GenerationSnapshot, None, List[Agent]]:
+    """
+    周期境界の 2 次元格子で同期更新のシミュレーションを行い、世代ごとのスナップショットを yield する。
+    スナップショットの戦略・利得は行優先に並べた 1 次元配列（ノード ID = 位置）。
+    ジェネレータの戻り値は最終世代のエージェントリスト（iter_simulation と同じ）。
+    """
+    shape = lattice_shape(num_agents, width)
+    offsets = neighbor_offsets(neighborhood)
+    logger.info(f"Lattice {shape[0]}x{shape[1]} ({neighborhood}, {len(offsets)} neighbors)")
+
+    streams = CounterStreams(seed)
+    grid = initial_strategy_codes(streams, num_agents).astype(np.int8).reshape(shape)
+    node_ids = np.arange(num_agents, dtype=np.int64)
+    payoff_table, _ = pair_outcome_table(T)
+    coop_by_table = pair_action_table(T)
+    total_actions = num_agents * len(offsets) * T
+
+    payoffs = np.zeros(shape, dtype=np.float64)
+    reproduce_time = 0.0
+    for gen in range(generations):
+        t_start = time.perf_counter()
+        payoffs, coop_actions = lattice_payoffs(grid, offsets, payoff_table, coop_by_table)
+        realized_coop_rate = coop_actions / total_actions if total_actions > 0 else 0.0
+        t_played = time.perf_counter()
+
+        metrics = summary_metrics(gen, realized_coop_rate, grid.ravel(), payoffs.ravel())
+        if spatial_metrics:
+            metrics.update(lattice_spatial_metrics(grid, offsets))
+        yield GenerationSnapshot(
+            generation=gen,
+            node_ids=node_ids,
+            strategies=grid.ravel(),
+            payoffs=payoffs.ravel(),
+            metrics=metrics,
+            timings={
+                "play": t_played - t_start,
+                "metrics": time.perf_counter() - t_played,
+                "reproduce": reproduce_time,
+            },
+        )
+
+        t_reproduce = time.perf_counter()
+        grid = reproduce_grid(
+            grid, payoffs, offsets, streams, gen,
+            mutation_rate=mutation_rate,
+            meta_influence=meta_influence,
+            selection=selection,
+        )
+        reproduce_time = time.perf_counter() - t_reproduce
+        logger.info(
+            f"Gen {gen}: coop(real={realized_coop_rate:.3f}, "
+            f"strategy={metrics['strategy_coop_rate']:.3f}), "
+            f"div={metrics['diversity']:.3f}, avg_payoff={metrics['avg_payoff']:.3f}"
+        )
+
+    return [
+        Agent(id=i, strategy=int_to_strategy(c), payoff=p)
+        for i, c, p in zip(node_ids.tolist(), grid.ravel().tolist(), payoffs.ravel().tolist())
+    ]
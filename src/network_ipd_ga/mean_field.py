@@ -0,0 +1,513 @@
+# mean_field.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Generator, List, Literal, Sequence
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.game import pair_outcome_table
+from network_ipd_ga.metrics import NUM_STRATEGIES, STRATEGY_LABELS
+from network_ipd_ga.network import csr_adjacency
+from network_ipd_ga.selection import DEFAULT_SELECTION, Selection, fermi_probability
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import pandas as pd
+    from network_ipd_ga.graph import Graph
+
+# 8 戦略の GA（＋メタ戦略との交叉）の決定論的な近似（平均場・ペア近似）。
+#
+# エージェントを動かさず、戦略の分布の期待値を世代ごとの写像で進める（世代交代は同期なので
+# 微分方程式ではなく差分方程式）。1 世代の計算量はノード数によらないので、meta_influence ×
+# mutation_rate の数千点を数秒〜数十秒で走査でき、エージェントの実行は選んだ点の確認だけに使える。
+#
+#   mean_field: 次数クラス d ごとの戦略分布 x_d（異質平均場）。隣接ノードは辺の端点の分布
+#               （次数 k に比例した重み）から独立に引き、利得はその期待値 k × Σ_c x̄_c P[s, c] で近似する
+#   pair      : 隣接ペアの戦略の同時分布 X[a, b]（ペア近似, 次数は平均次数で一様とみなす）。
+#               ノード a の残りの隣接ノードは条件付き分布 X[a, ·] / x_a から引き、隣接ノード間の相関を残す
+#
+# どちらも対戦は game.pair_outcome_table の 8×8 の対戦表, 親選択は Selection（tournament / roulette /
+# rank / fermi）の確率を候補の型の分布から計算し, 子は一様交叉 → 突然変異 → メタ戦略との交叉の
+# 確率をそのまま 8×8 の行列で適用する（ga.counter_children と同じ順序・確率）。
+# メタ戦略は分布の最頻の戦略（同率は小さいコード, np.argmax と同じ）。ただし初期分布は一様で 8 戦略が
+# 同率なので、最初の世代のメタ戦略を argmax で決めると常に 000 になり、meta_influence が大きいと結果が
+# この同率の扱いだけで決まってしまう。エージェントでは初期の最頻の戦略は乱数で決まるので、最初のメタ戦略が
+# 8 通りそれぞれの枝を並べて進め、メトリクスは枝の平均にする（乱数のシードについての平均に相当）。
+# 近似なので、tournament 以外の選択と、候補の重複・利得のばらつきの効果は粗い。
+#
+# 出力は run_simulation のサマリ DataFrame と同じ列。戦略数の列は期待値（x × ノード数, 実数）,
+# クラスタの列は近似では定義できないので nan。
+ApproximationMethod = Literal["mean_field", "pair"]
+APPROXIMATION_METHODS = ("mean_field", "pair")
+
+DEFAULT_MAX_DEGREE_CLASSES = 8
+
+_CODES = np.arange(NUM_STRATEGIES)
+_POPCOUNT = np.array([bin(c).count("1") for c in range(NUM_STRATEGIES)])
+# _AGREE[m, s, c]: 戦略 s と c がマスク m のビットで一致する
+_AGREE = (((_CODES[:, None] ^ _CODES[None, :])[None, :, :] & _CODES[:, None, None]) == 0).astype(np.float64)
+# _CROSSOVER[(s1, s2), c]: 一様交叉で親 s1, s2 から子 c ができる確率（マスク m のビットは s1, 残りは s2）
+_CROSSOVER = np.einsum("mxc,myc->xyc", _AGREE, _AGREE[::-1]).reshape(-1, NUM_STRATEGIES) / NUM_STRATEGIES
+# _META[meta, c, c']: メタ戦略 meta との交叉で子 c が c' になる確率（マスク m のビットは子, 残りはメタ戦略）
+_META = np.einsum("mxc,myc->yxc", _AGREE, _AGREE[::-1]) / NUM_STRATEGIES
+_CLUSTER_COLUMNS = ("num_clusters", "max_cluster_size", "mean_cluster_size")
+
+
+@dataclass(frozen=True)
+class DegreeClasses:
+    """
+    近似に渡す次数構造。
+    degrees     : 各クラスの代表次数（整数）
+    weights     : 各クラスのノードの割合
+    edge_weights: 辺の端点がそのクラスである割合（次数に比例）
+    """
+
+    degrees: np.ndarray
+    weights: np.ndarray
+    edge_weights: np.ndarray
+
+    @property
+    def mean_degree(self) -> float:
+        return float(self.weights @ self.degrees)
+
+
+def degree_classes(degrees: np.ndarray, max_classes: int = DEFAULT_MAX_DEGREE_CLASSES) -> DegreeClasses:
+    """
+    ノードの次数の配列から次数クラスを作る。異なる次数が max_classes を超える場合は
+    （scale_free の裾のように）次数 + 1 の対数で等間隔のビンにまとめ、ビン内の平均次数を代表にする。
+    """
+    degrees = np.asarray(degrees, dtype=np.int64)
+    values, counts = np.unique(degrees, return_counts=True)
+    if len(values) > max_classes:
+        bins = np.geomspace(values[0] + 1, values[-1] + 1, max_classes + 1)
+        index = np.clip(np.searchsorted(bins, values + 1, side="right") - 1, 0, max_classes - 1)
+    else:
+        index = np.arange(len(values))
+    nodes = np.bincount(index, counts).astype(np.float64)
+    ends = np.bincount(index, counts * values).astype(np.float64)
+    keep = nodes > 0
+    nodes, ends = nodes[keep], ends[keep]
+    total_ends = ends.sum()
+    return DegreeClasses(
+        degrees=np.rint(ends / nodes).astype(np.int64),
+        weights=nodes / nodes.sum(),
+        edge_weights=ends / total_ends if total_ends > 0 else nodes / nodes.sum(),
+    )
+
+
+def topology_degrees(
+    topology: str,
+    num_agents: int,
+    seed: int = 0,
+    small_world_k: int = 4,
+    small_world_p: float = 0.1,
+    scale_free_m: int = 2,
+    lattice_neighborhood: str = "von_neumann",
+    graph: Graph | nx.Graph | None = None,
+) -> np.ndarray:
+    """
+    topology のノードの次数の配列。グラフのトポロジーは seed から生成したグラフ（または graph）の次数,
+    well_mixed は全員が候補なので N - 1, lattice は近傍の数。
+    """
+    if topology == "well_mixed":
+        return np.full(num_agents, num_agents - 1, dtype=np.int64)
+    if topology == "lattice":
+        from network_ipd_ga.lattice import neighbor_offsets
+
+        return np.full(num_agents, len(neighbor_offsets(lattice_neighborhood)), dtype=np.int64)
+    if graph is None:
+        from network_ipd_ga.simulation import build_graph
+
+        graph = build_graph(topology, num_agents, seed, small_world_k, small_world_p, scale_free_m)
+    indptr, _ = csr_adjacency(graph)
+    return np.diff(indptr)
+
+
+# ---------------------------------------------------------------------
+# 親選択の確率（配列は最後の軸がパラメータ点 B）
+# ---------------------------------------------------------------------
+def _above(q: np.ndarray, pi_j: np.ndarray, pi_t: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    分布 q（利得 pi_j, 形 (..., J, B)）から 1 つ引いたとき、利得が π_t（形 (..., T, B)）より
+    大きい確率と等しい確率（同点は相対誤差 1e-9 まで）。
+    """
+    diff = pi_j[..., :, None, :] - pi_t[..., None, :, :]
+    tol = 1e-9 * (1.0 + np.abs(pi_t[..., None, :, :]))
+    q = q[..., :, None, :]
+    gt = (q * (diff > tol)).sum(axis=-3)
+    return gt, (q * (diff >= -tol)).sum(axis=-3) - gt
+
+
+def select_probabilities(
+    selection: Selection,
+    fixed_q: np.ndarray,
+    fixed_pi: np.ndarray,
+    back_q: np.ndarray,
+    back_pi: np.ndarray,
+    back_weight: np.ndarray | float,
+    num_candidates: np.ndarray | float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    候補（自分＋隣接ノード）を一様に 1 つ引いたときの型の分布を
+      固定の候補 fixed（先頭が自分, ペア近似では相手も）: 引く確率 fixed_q (..., F, B), 利得 fixed_pi
+      背景の分布 back（残りの隣接ノードの型）        : 引く確率 back_weight × back_q (..., J, B), 利得 back_pi
+    の混合で表し、親がそれぞれである確率 (p_fixed, p_back) を返す。
+    back_q（合計 1）・back_pi は行の軸が 1 でよく（行の間で共通）、背景どうしの比較はその形のまま 1 回だけ行う。
+    back_weight と候補数 num_candidates（c = 次数 + 1）は (..., 1, 1) にブロードキャストできる形。
+    候補の重複や利得のばらつきは無視し、引いた候補は互いに独立とみなす。
+    """
+    op = selection.operator
+    c = np.asarray(num_candidates, dtype=np.float64)
+    w = np.asarray(back_weight, dtype=np.float64)
+
+    if op == "roulette":
+        p_fixed, p_back = fixed_q * fixed_pi, w * back_q * back_pi
+        total = p_fixed.sum(axis=-2, keepdims=True) + p_back.sum(axis=-2, keepdims=True)
+        ok = total > 0
+        scale = np.where(ok, 1.0 / np.where(ok, total, 1.0), 0.0)
+        return np.where(ok, p_fixed * scale, fixed_q), np.where(ok, p_back * scale, w * back_q)
+
+    if op == "fermi":
+        # 自分以外から 1 つ引き（確率は q / (1 - q_自分)）, 確率 1 / (1 + exp((P_x - P_y) / K)) で y
+        others = 1.0 - fixed_q[..., :1, :]
+        scale = np.divide(1.0, others, out=np.zeros_like(others), where=others > 0)
+        own_pi = fixed_pi[..., :1, :]
+        p_fixed = fixed_q * scale * fermi_probability(own_pi - fixed_pi, selection.temperature)
+        p_fixed[..., 0, :] = 0.0
+        p_back = w * back_q * scale * fermi_probability(own_pi - back_pi, selection.temperature)
+        p_fixed[..., 0, :] = 1.0 - p_fixed.sum(axis=-2) - p_back.sum(axis=-2)
+        return p_fixed, p_back
+
+    # tournament / rank: 各候補より利得が大きい候補・同点の候補を引く確率
+    gt_ff, eq_ff = _above(fixed_q, fixed_pi, fixed_pi)
+    gt_bf, eq_bf = _above(back_q, back_pi, fixed_pi)
+    gt_fb, eq_fb = _above(fixed_q, fixed_pi, back_pi)
+    gt_bb, eq_bb = _above(back_q, back_pi, back_pi)
+    q = (fixed_q, w * back_q)
+    gt = (gt_ff + w * gt_bf, gt_fb + w * gt_bb)
+    eq = (eq_ff + w * eq_bf, eq_fb + w * eq_bb)
+
+    if op == "tournament":
+        # k 回の抽出の最大が t と同点の組: P(全員 <= t) - P(全員 < t) を組の中で q に比例して分ける
+        k = np.minimum(selection.k, c)
+        out = []
+        for q_i, gt_i, eq_i in zip(q, gt, eq):
+            not_above = np.clip(1.0 - gt_i, 0.0, 1.0)
+            top = not_above ** k - np.clip(not_above - eq_i, 0.0, 1.0) ** k
+            out.append(np.divide(q_i * top, eq_i, out=np.zeros(np.broadcast_shapes(q_i.shape, eq_i.shape)),
+                                 where=eq_i > 0))
+        return out[0], out[1]
+
+    # rank: 順位の期待値 1 + (c - 1) × P(他の候補の利得が下)（同点は半分）に比例
+    weights = [q_i * (1.0 + (c - 1.0) * (1.0 - gt_i - eq_i / 2)) for q_i, gt_i, eq_i in zip(q, gt, eq)]
+    total = weights[0].sum(axis=-2, keepdims=True) + weights[1].sum(axis=-2, keepdims=True)
+    return weights[0] / total, weights[1] / total
+
+
+# ---------------------------------------------------------------------
+# 子の戦略の分布（一様交叉 → 突然変異 → メタ戦略との交叉）
+# ---------------------------------------------------------------------
+def mutation_matrix(mutation_rate: np.ndarray) -> np.ndarray:
+    """M[c, c', B] = 各ビットを確率 mutation_rate で反転したとき c が c' になる確率。"""
+    mu = np.asarray(mutation_rate, dtype=np.float64)[None, None, :]
+    flips = _POPCOUNT[_CODES[:, None] ^ _CODES[None, :]][:, :, None]
+    return mu ** flips * (1.0 - mu) ** (3 - flips)
+
+
+def offspring_distribution(
+    parents: np.ndarray,
+    mutation_rate: np.ndarray,
+    meta_influence: np.ndarray,
+    meta_code: np.ndarray,
+) -> np.ndarray:
+    """
+    parents: shape (R, 8, B) の親の戦略の分布（2 人の親は独立に同じ分布から選ぶ）。
+    mutation_rate, meta_influence, meta_code: shape (B,)。戻り値は子の戦略の分布 (R, 8, B)。
+    交叉は親の分布について 2 次, 突然変異・メタ戦略との交叉は線形なので 1 つの 8×8 の行列にまとめる。
+    """
+    rows, _, batch = parents.shape
+    by_code = parents.transpose(1, 0, 2)  # (8, R, B)
+    pairs = (by_code[:, None] * by_code[None]).reshape(NUM_STRATEGIES**2, rows * batch)
+    child = (_CROSSOVER.T @ pairs).reshape(NUM_STRATEGIES, rows, batch)
+    lam = np.asarray(meta_influence, dtype=np.float64)
+    mix = (1.0 - lam) * np.eye(NUM_STRATEGIES)[:, :, None] + lam * _META[meta_code].transpose(1, 2, 0)
+    after = (mutation_matrix(mutation_rate)[:, :, None, :] * mix[None]).sum(axis=1)
+    child = (after[:, :, None, :] * child[:, None]).sum(axis=0)
+    return child.transpose(1, 0, 2)
+
+
+# ---------------------------------------------------------------------
+# 1 世代の写像
+# ---------------------------------------------------------------------
+def mean_field_step(
+    x: np.ndarray,
+    classes: DegreeClasses,
+    payoff_table: np.ndarray,
+    mutation_rate: np.ndarray,
+    meta_influence: np.ndarray,
+    selection: Selection = DEFAULT_SELECTION,
+    meta_code: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    異質平均場の 1 世代。x: shape (D, 8, B) の次数クラスごとの戦略分布。
+    meta_code: 各点のメタ戦略 (B,)（None なら集団の分布の最頻の戦略）。
+    隣接ノードの型は (戦略 s, 次数クラス d) の 8D 通りで, 利得は k_d × Σ_c x̄_c P[s, c]
+    （x̄ は辺の端点の戦略分布）。型の分布・利得は全行で共通なので、背景どうしの比較は 1 回で済む。
+    """
+    num_classes, _, batch = x.shape
+    k = classes.degrees.astype(np.float64)
+    types = NUM_STRATEGIES * num_classes
+    neighbor = np.tensordot(classes.edge_weights, x, axes=1)
+    f = payoff_table @ neighbor  # f[s, B] = Σ_c P[s, c] x̄_c
+    pi = (f[:, None, :] * k[None, :, None]).reshape(types, batch)
+    # 隣接ノードの型の分布 r[(s, d)] = 端点の次数クラスの割合 × そのクラスの戦略分布
+    r = (x.transpose(1, 0, 2) * classes.edge_weights[None, :, None]).reshape(types, batch)
+
+    # 行 = 自分の型 (a, d)（型と同じ並び）, 固定の候補は自分だけ
+    row_k = np.tile(k, NUM_STRATEGIES)[:, None, None]
+    p_self, p_back = select_probabilities(
+        selection, 1.0 / (row_k + 1), pi[:, None, :], r[None], pi[None], row_k / (row_k + 1), row_k + 1
+    )
+    parents = p_back.reshape(types, NUM_STRATEGIES, num_classes, batch).sum(axis=2)
+    by_class = parents.reshape(NUM_STRATEGIES, num_classes, NUM_STRATEGIES, batch)
+    by_class += p_self.reshape(NUM_STRATEGIES, num_classes, 1, batch) * np.eye(NUM_STRATEGIES)[:, None, :, None]
+    parents /= parents.sum(axis=1, keepdims=True)
+
+    if meta_code is None:
+        meta_code = np.argmax(np.tensordot(classes.weights, x, axes=1), axis=0)
+    child = offspring_distribution(parents, mutation_rate, meta_influence, meta_code)
+    # 各ノードは自分の次数クラスにとどまる: x'_d = Σ_a x_d[a] child[(a, d)]
+    child = child.reshape(NUM_STRATEGIES, num_classes, NUM_STRATEGIES, batch)
+    new_x = (x.transpose(1, 0, 2)[:, :, None, :] * child).sum(axis=0)
+    # 丸め誤差の蓄積を防ぐため正規化する（交叉は分布について 2 次なので誤差が世代ごとに増幅される）
+    return new_x / new_x.sum(axis=1, keepdims=True)
+
+
+def pair_step(
+    pairs: np.ndarray,
+    degree: int,
+    payoff_table: np.ndarray,
+    mutation_rate: np.ndarray,
+    meta_influence: np.ndarray,
+    selection: Selection = DEFAULT_SELECTION,
+    meta_code: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    ペア近似の 1 世代。pairs: shape (8, 8, B) の隣接ペアの戦略の同時分布（対称）。
+    meta_code: 各点のメタ戦略 (B,)（None なら分布の最頻の戦略）。
+    ペア (a, b) の a の候補は 自分・相手 b・残り degree - 1 個の隣接ノード（X[a, ·] / x_a から）。
+    各ノードの残りの隣接ノードも同じ条件付き分布から引いて利得の期待値を求める。
+    2 つの端点の子は (a, b) を条件に独立とみなす: X'[a', b'] = Σ X[a, b] C(a' | a; b) C(b' | b; a)。
+    """
+    k = float(degree)
+    x = pairs.sum(axis=1)
+    cond = np.divide(pairs, x[:, None, :], out=np.broadcast_to(x[None], pairs.shape).copy(), where=x[:, None, :] > 0)
+    rest = (k - 1) * (cond * payoff_table[:, :, None]).sum(axis=1)  # 残りの隣接ノードとの利得
+
+    # 行 = ペア (a, b), 固定の候補 = [自分, 相手], 背景 = 残りの隣接ノード c（b によらない）
+    fixed_pi = np.stack(
+        [payoff_table[:, :, None] + rest[:, None, :], payoff_table.T[:, :, None] + rest[None]], axis=2
+    )
+    back_pi = (payoff_table.T[:, :, None] + rest[None])[:, None]  # [a, 1, c] = P[c, a] + rest_c
+    p_fixed, p_back = select_probabilities(
+        selection, np.full((1, 1, 2, 1), 1.0 / (k + 1)), fixed_pi, cond[:, None], back_pi, (k - 1) / (k + 1), k + 1
+    )
+
+    eye = np.eye(NUM_STRATEGIES)
+    parents = p_back + p_fixed[:, :, :1] * eye[:, None, :, None] + p_fixed[:, :, 1:] * eye[None, :, :, None]
+    parents /= parents.sum(axis=2, keepdims=True)
+    if meta_code is None:
+        meta_code = np.argmax(x, axis=0)
+    child = offspring_distribution(parents.reshape(64, NUM_STRATEGIES, -1), mutation_rate, meta_influence, meta_code)
+    # new[p, q] = Σ_{a, b} X[a, b] C[a, b, p] C[b, a, q]
+    weighted = (pairs.reshape(64, 1, -1) * child).transpose(2, 1, 0)  # [B, p, (a, b)]
+    swapped = child.reshape(8, 8, NUM_STRATEGIES, -1).transpose(3, 1, 0, 2).reshape(-1, 64, NUM_STRATEGIES)
+    new_pairs = (weighted @ swapped).transpose(1, 2, 0)
+    return new_pairs / new_pairs.sum(axis=(0, 1), keepdims=True)
+
+
+# ---------------------------------------------------------------------
+# メトリクス（サマリ DataFrame と同じ列, B 点まとめて）
+# ---------------------------------------------------------------------
+def approximation_metrics(
+    generation: int,
+    x: np.ndarray,
+    pairs: np.ndarray,
+    avg_payoff: np.ndarray,
+    coop_table: np.ndarray,
+    T: int,
+    num_agents: int,
+    spatial_metrics: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    x: 集団の戦略分布 (B, 8), pairs: 辺の両端の戦略の同時分布 (B, 8, 8)。
+    histogram_metrics / spatial_metrics と同じ定義を分布について計算する（列 -> 長さ B の配列）。
+    """
+    batch = len(x)
+    columns: Dict[str, np.ndarray] = {
+        "generation": np.full(batch, generation),
+        "realized_coop_rate": np.einsum("bxy,xy->b", pairs, coop_table) / (2.0 * T),
+        "strategy_coop_rate": x @ _POPCOUNT / 3.0,
+        "diversity": -(x * np.log(np.where(x > 0, x, 1.0))).sum(axis=1),
+        "avg_payoff": avg_payoff,
+    }
+    for label, counts in zip(STRATEGY_LABELS, (x * num_agents).T):
+        columns[label] = counts
+    if spatial_metrics:
+        # metrics.assortativity_from_pair_counts と同じ式（度数表の代わりに同時分布）
+        e = (pairs + pairs.transpose(0, 2, 1)) / 2
+        a = e.sum(axis=2)
+        sum_a2 = (a * a).sum(axis=1)
+        trace = np.trace(e, axis1=1, axis2=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            assortativity = np.where(sum_a2 < 1.0, (trace - sum_a2) / (1.0 - sum_a2), np.nan)
+        columns["same_strategy_edge_frac"] = trace
+        columns["strategy_assortativity"] = assortativity
+        for name in _CLUSTER_COLUMNS:
+            columns[name] = np.full(batch, np.nan)
+    return columns
+
+
+def iter_approximation(
+    meta_influence: Sequence[float] | np.ndarray,
+    mutation_rate: Sequence[float] | np.ndarray,
+    classes: DegreeClasses,
+    T: int,
+    generations: int,
+    num_agents: int,
+    method: ApproximationMethod = "mean_field",
+    selection: Selection = DEFAULT_SELECTION,
+    spatial_metrics: bool = True,
+) -> Generator[Dict[str, np.ndarray], None, None]:
+    """
+    パラメータ点 (meta_influence[i], mutation_rate[i]) の B 点をまとめて進め、
+    世代ごとにメトリクスの列（列 -> 長さ B の配列）を yield する。初期分布は 8 戦略で一様で、
+    最初のメタ戦略 8 通りの枝（内部では 8B 点）を進めたメトリクスの平均を返す。
+    """
+    if method not in APPROXIMATION_METHODS:
+        raise ValueError(f"Unknown approximation method: {method}")
+    lam, mu = np.broadcast_arrays(
+        np.asarray(meta_influence, dtype=np.float64), np.asarray(mutation_rate, dtype=np.float64)
+    )
+    lam, mu = lam.ravel(), mu.ravel()
+    batch = len(lam)
+    payoff_table, coop_table = pair_outcome_table(T)
+    # 列 = 枝 × パラメータ点（枝 m の最初のメタ戦略はコード m）
+    branches = NUM_STRATEGIES
+    first_meta = np.repeat(_CODES, batch)
+    lam, mu = np.tile(lam, branches), np.tile(mu, branches)
+
+    # 状態は最後の軸がパラメータ点: mean_field は (D, 8, B), pair は (8, 8, B)
+    if method == "mean_field":
+        state = np.full((len(classes.degrees), NUM_STRATEGIES, branches * batch), 1.0 / NUM_STRATEGIES)
+    else:
+        degree = max(1, int(round(classes.mean_degree)))
+        state = np.full((NUM_STRATEGIES, NUM_STRATEGIES, branches * batch), 1.0 / NUM_STRATEGIES**2)
+
+    for gen in range(generations):
+        if method == "mean_field":
+            x = np.tensordot(classes.weights, state, axes=1)
+            neighbor = np.tensordot(classes.edge_weights, state, axes=1)
+            pairs = neighbor[:, None, :] * neighbor[None, :, :]
+            f = payoff_table @ neighbor
+            avg_payoff = np.tensordot(classes.weights * classes.degrees, (state * f[None]).sum(axis=1), axes=1)
+        else:
+            x = state.sum(axis=1)
+            pairs = state
+            avg_payoff = degree * (state * payoff_table[:, :, None]).sum(axis=(0, 1))
+        columns = approximation_metrics(
+            gen, x.T, pairs.transpose(2, 0, 1), avg_payoff, coop_table, T, num_agents, spatial_metrics
+        )
+        yield {
+            name: values[:batch] if name == "generation" else values.reshape(branches, batch).mean(axis=0)
+            for name, values in columns.items()
+        }
+
+        meta_code = first_meta if gen == 0 else None
+        if method == "mean_field":
+            state = mean_field_step(state, classes, payoff_table, mu, lam, selection, meta_code)
+        else:
+            state = pair_step(state, degree, payoff_table, mu, lam, selection, meta_code)
+
+
+def scan_approximation(
+    meta_influence: Sequence[float] | np.ndarray,
+    mutation_rate: Sequence[float] | np.ndarray,
+    classes: DegreeClasses,
+    T: int,
+    generations: int,
+    num_agents: int,
+    method: ApproximationMethod = "mean_field",
+    selection: Selection = DEFAULT_SELECTION,
+    spatial_metrics: bool = True,
+    final_only: bool = True,
+    chunk_size: int = 32,
+) -> pd.DataFrame:
+    """
+    パラメータ点の列（meta_influence, mutation_rate は同じ長さ）を chunk_size 点ずつ
+    （最初のメタ戦略の枝を含めて 8 × chunk_size 列）まとめて計算し、
+    meta_influence・mutation_rate とサマリの列の DataFrame を返す（final_only なら最終世代の行だけ）。
+    """
+    import pandas as pd
+
+    lam, mu = np.broadcast_arrays(
+        np.asarray(meta_influence, dtype=np.float64), np.asarray(mutation_rate, dtype=np.float64)
+    )
+    lam, mu = lam.ravel(), mu.ravel()
+    frames: List[pd.DataFrame] = []
+    for start in range(0, len(lam), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        rows: List[pd.DataFrame] = []
+        for columns in iter_approximation(
+            lam[chunk], mu[chunk], classes, T, generations, num_agents, method, selection, spatial_metrics
+        ):
+            if final_only and columns["generation"][0] != generations - 1:
+                continue
+            rows.append(pd.DataFrame({"meta_influence": lam[chunk], "mutation_rate": mu[chunk], **columns}))
+        frames.extend(rows)
+        logger.info(f"Scanned {min(start + chunk_size, len(lam))}/{len(lam)} points")
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(["meta_influence", "mutation_rate", "generation"], kind="stable", ignore_index=True)
+
+
+def run_approximation(
+    topology: str = "cycle",
+    num_agents: int = 100,
+    generations: int = 100,
+    T: int = 50,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    small_world_k: int = 4,
+    small_world_p: float = 0.1,
+    scale_free_m: int = 2,
+    seed: int = 0,
+    method: ApproximationMethod = "mean_field",
+    graph: Graph | nx.Graph | None = None,
+    spatial_metrics: bool = True,
+    selection: str = "tournament",
+    tournament_k: int = 3,
+    fermi_temperature: float = 1.0,
+    lattice_neighborhood: str = "von_neumann",
+    max_degree_classes: int = DEFAULT_MAX_DEGREE_CLASSES,
+    **_ignored,
+) -> pd.DataFrame:
+    """
+    1 つのパラメータ点の近似の軌跡を、run_simulation のサマリ DataFrame と同じ列で返す。
+    引数は run_simulation と同じ（cfg.simulation_kwargs() を渡せる）。seed は次数構造のグラフの生成にだけ使う。
+    """
+    import pandas as pd
+
+    degrees = topology_degrees(
+        topology, num_agents, seed, small_world_k, small_world_p, scale_free_m, lattice_neighborhood, graph
+    )
+    classes = degree_classes(degrees, max_degree_classes)
+    selector = Selection(selection, k=tournament_k, temperature=fermi_temperature)
+    rows = [
+        {name: values[0] for name, values in columns.items()}
+        for columns in iter_approximation(
+            [meta_influence], [mutation_rate], classes, T, generations, num_agents, method, selector, spatial_metrics
+        )
+    ]
+    return pd.DataFrame(rows)
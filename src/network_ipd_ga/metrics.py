@@ -1,34 +1,212 @@
 # metrics.py
 from __future__ import annotations
-from typing import List
-from collections import Counter
+from typing import Callable, Dict, List
 import math
 
+import numpy as np
+
 from network_ipd_ga.agent import Agent
-from network_ipd_ga.strategy import cooperation_potential, Strategy
+from network_ipd_ga.strategy import strategy_to_int
 
+NUM_STRATEGIES = 8
 
-def strategy_diversity_entropy(agents: List[Agent]) -> float:
-    """
-    戦略分布のシャノンエントロピーを多様性指標として用いる。
-    """
-    counter = Counter(a.strategy for a in agents)
-    total = sum(counter.values())
+# 戦略コード 0〜7 に対応する列名 "000"〜"111"
+STRATEGY_LABELS = [format(i, "03b") for i in range(NUM_STRATEGIES)]
+
+# 戦略コードごとの 1 ビットの数（協調ポテンシャル = popcount / 3）
+_POPCOUNT = [bin(i).count("1") for i in range(NUM_STRATEGIES)]
+
+HistogramMetric = Callable[[np.ndarray], float]
+
+
+# ---------------------------------------------------------------------
+# 戦略ヒストグラム（8 ビン）
+# ---------------------------------------------------------------------
+def strategy_histogram(strategies: np.ndarray) -> np.ndarray:
+    """戦略コード（0〜7）の配列から 8 ビンのヒストグラムを作る。"""
+    return np.bincount(strategies, minlength=NUM_STRATEGIES)
+
+
+def update_histogram(hist: np.ndarray | List[int], old: int, new: int) -> None:
+    """1 ノードの戦略が old -> new に変わったときにヒストグラムを O(1) で更新する。"""
+    if old != new:
+        hist[old] -= 1
+        hist[new] += 1
+
+
+def agent_histogram(agents: List[Agent]) -> np.ndarray:
+    """エージェントリストから戦略ヒストグラムを作る。"""
+    codes = np.fromiter((strategy_to_int(a.strategy) for a in agents), dtype=np.int8, count=len(agents))
+    return strategy_histogram(codes)
+
+
+# ---------------------------------------------------------------------
+# ヒストグラムから O(8) で計算するメトリクス
+# ---------------------------------------------------------------------
+def entropy_from_histogram(hist: np.ndarray) -> float:
+    """戦略分布のシャノンエントロピー（多様性指標）。"""
+    counts = hist.tolist()
+    total = sum(counts)
     if total == 0:
         return 0.0
 
     entropy = 0.0
-    for count in counter.values():
+    for count in counts:
+        if count == 0:
+            continue
         p = count / total
         entropy -= p * math.log(p + 1e-12)
     return entropy
 
 
+def cooperation_potential_from_histogram(hist: np.ndarray) -> float:
+    """協調ポテンシャル（3 ビット中の 1 の割合）の集団平均。"""
+    counts = hist.tolist()
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    return sum(c * k for c, k in zip(counts, _POPCOUNT)) / (3.0 * total)
+
+
+def strategy_counts(hist: np.ndarray) -> Dict[str, int]:
+    """各戦略（000〜111）の個体数を列名つきの辞書にする。"""
+    return dict(zip(STRATEGY_LABELS, hist.tolist()))
+
+
+# 世代ごとに計算するヒストグラムメトリクス（列名 -> 関数）。
+# register_histogram_metric で追加したものもサマリ DataFrame の列になる。
+HISTOGRAM_METRICS: Dict[str, HistogramMetric] = {
+    "strategy_coop_rate": cooperation_potential_from_histogram,
+    "diversity": entropy_from_histogram,
+}
+
+
+def register_histogram_metric(name: str, fn: HistogramMetric) -> None:
+    """戦略ヒストグラムの関数として定義したメトリクスを追加する。"""
+    if name in HISTOGRAM_METRICS:
+        raise ValueError(f"Metric already registered: {name}")
+    HISTOGRAM_METRICS[name] = fn
+
+
+def histogram_metrics(hist: np.ndarray) -> Dict[str, float]:
+    """登録済みの全ヒストグラムメトリクスを計算する。"""
+    return {name: fn(hist) for name, fn in HISTOGRAM_METRICS.items()}
+
+
+# ---------------------------------------------------------------------
+# エッジ配列 (u, v) 上の空間構造メトリクス
+# ---------------------------------------------------------------------
+def same_strategy_edge_fraction(strategies: np.ndarray, u: np.ndarray, v: np.ndarray) -> float:
+    """両端が同じ戦略であるエッジの割合。"""
+    if len(u) == 0:
+        return float("nan")
+    return float(np.count_nonzero(strategies[u] == strategies[v])) / len(u)
+
+
+def strategy_assortativity(strategies: np.ndarray, u: np.ndarray, v: np.ndarray) -> float:
+    """
+    戦略（8 カテゴリ）に関する Newman の assortativity 係数。
+        r = (Σ_i e_ii - Σ_i a_i^2) / (1 - Σ_i a_i^2)
+    e: 両向きに数えたエッジの戦略ペア分布, a: その周辺分布。
+    全エッジの端点が 1 戦略だけのとき（分母 0）は nan。
+    """
+    if len(u) == 0:
+        return float("nan")
+    return assortativity_from_pair_counts(strategy_pair_counts(strategies[u], strategies[v]))
+
+
+def strategy_pair_counts(su: np.ndarray, sv: np.ndarray) -> np.ndarray:
+    """エッジ両端の戦略ペア (su, sv) の 8×8 の度数表（向きは区別する）。"""
+    return np.bincount(
+        su.astype(np.int64).ravel() * NUM_STRATEGIES + sv.astype(np.int64).ravel(),
+        minlength=NUM_STRATEGIES**2,
+    ).reshape(NUM_STRATEGIES, NUM_STRATEGIES)
+
+
+def assortativity_from_pair_counts(counts: np.ndarray) -> float:
+    """
+    戦略ペアの度数表（strategy_pair_counts の和でもよい）から assortativity 係数を計算する。
+    エッジリストを持たない格子（lattice.py）でもシフトした配列の度数表から同じ値を求められる。
+    """
+    num_edges = int(counts.sum())
+    if num_edges == 0:
+        return float("nan")
+    e = (counts + counts.T) / (2.0 * num_edges)
+    a = e.sum(axis=1)
+    sum_a2 = float(a @ a)
+    if sum_a2 >= 1.0:
+        return float("nan")
+    return (float(np.trace(e)) - sum_a2) / (1.0 - sum_a2)
+
+
+def same_strategy_clusters(strategies: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    同じ戦略のノードが隣接してできる連結成分（クラスタ）のラベルを返す。
+    ラベルは各クラスタ内の最小ノード添字。
+
+    同戦略エッジだけを使い、ベクトル化したラベル伝播
+    （最小ラベルへのフック + ポインタジャンプ）で求める。反復回数は概ね O(log N)。
+    """
+    n = len(strategies)
+    same = strategies[u] == strategies[v]
+    su, sv = u[same], v[same]
+    parent = np.arange(n)
+
+    while True:
+        pu = parent[su]
+        pv = parent[sv]
+        diff = pu != pv
+        if not diff.any():
+            return parent
+        # 大きいラベルの根を小さいラベルにつなぐ（ラベルは単調減少するので閉路はできない）
+        np.minimum.at(parent, np.maximum(pu, pv)[diff], np.minimum(pu, pv)[diff])
+        # ポインタジャンプで全ノードを根に直結させる
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def cluster_size_distribution(labels: np.ndarray) -> np.ndarray:
+    """クラスタサイズの分布。戻り値[s] = サイズ s のクラスタ数。"""
+    sizes = np.bincount(labels)
+    return np.bincount(sizes[sizes > 0])
+
+
+def spatial_metrics(strategies: np.ndarray, u: np.ndarray, v: np.ndarray) -> Dict[str, float]:
+    """エッジ配列から計算する空間構造メトリクス一式（サマリ DataFrame の列）。"""
+    return {
+        "same_strategy_edge_frac": same_strategy_edge_fraction(strategies, u, v),
+        "strategy_assortativity": strategy_assortativity(strategies, u, v),
+        **cluster_metrics(same_strategy_clusters(strategies, u, v)),
+    }
+
+
+def cluster_metrics(labels: np.ndarray) -> Dict[str, float]:
+    """クラスタのラベルからクラスタ数・最大サイズ・平均サイズを求める。"""
+    sizes = np.bincount(labels)
+    sizes = sizes[sizes > 0]
+    return {
+        "num_clusters": int(len(sizes)),
+        "max_cluster_size": int(sizes.max()) if len(sizes) else 0,
+        "mean_cluster_size": float(sizes.mean()) if len(sizes) else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------
+# エージェントリストを受け取る従来の API
+# ---------------------------------------------------------------------
+def strategy_diversity_entropy(agents: List[Agent]) -> float:
+    """
+    戦略分布のシャノンエントロピーを多様性指標として用いる。
+    """
+    return entropy_from_histogram(agent_histogram(agents))
+
+
 def cooperation_rate_from_strategies(agents: List[Agent]) -> float:
     """
     各戦略の協調ポテンシャルを平均した値を協力率の近似として用いる。
     （実際の対戦から計測したい場合は simulation 側でカウントする）
     """
-    if not agents:
-        return 0.0
-    return sum(cooperation_potential(a.strategy) for a in agents) / len(agents)
+    return cooperation_potential_from_histogram(agent_histogram(agents))
@@ -1,14 +1,26 @@
 # network.py
 from __future__ import annotations
-import networkx as nx
+from typing import TYPE_CHECKING, Tuple
+import random
 
+import numpy as np
 
-def make_cycle_graph(num_agents: int) -> nx.Graph:
+from network_ipd_ga.graph import Graph
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+
+def make_cycle_graph(num_agents: int) -> Graph:
     """
     1次元（環状）のネットワークを生成する。
     各ノードは左右1つずつ、計2つの隣接ノードを持つ。
     """
-    return nx.cycle_graph(num_agents)
+    # networkx.cycle_graph と同じ（エッジの追加順も同じ）
+    G = Graph(range(num_agents))
+    nodes = list(range(num_agents))
+    G.add_edges_from(zip(nodes, nodes[1:] + nodes[:1]))
+    return G
 
 
 def make_small_world_graph(
@@ -16,7 +28,7 @@ def make_small_world_graph(
     k: int = 4,
     p: float = 0.1,
     seed: int | None = None,
-) -> nx.Graph:
+) -> Graph:
     """
     Watts-Strogatz 型の小世界ネットワークを生成する。
     num_agents: ノード数
@@ -28,14 +40,33 @@ def make_small_world_graph(
     if k % 2 == 1:
         k -= 1  # 偶数にそろえる
 
-    return nx.watts_strogatz_graph(num_agents, k, p, seed=seed)
+    # networkx.watts_strogatz_graph と同じ手順・同じ乱数の使い方
+    # （seed が同じなら同じグラフ, 隣接ノードの順序も同じ）
+    rng = random.Random(seed)
+    G = Graph(range(num_agents))
+    nodes = list(range(num_agents))
+    for j in range(1, k // 2 + 1):
+        G.add_edges_from(zip(nodes, nodes[j:] + nodes[0:j]))
+    for j in range(1, k // 2 + 1):
+        for u, v in zip(nodes, nodes[j:] + nodes[0:j]):
+            if rng.random() < p:
+                w = rng.choice(nodes)
+                # 自己ループ・多重エッジは作らない
+                while w == u or G.has_edge(u, w):
+                    w = rng.choice(nodes)
+                    if G.degree(u) >= num_agents - 1:
+                        break  # この再結線はしない
+                else:
+                    G.remove_edge(u, v)
+                    G.add_edge(u, w)
+    return G
 
 
 def make_scale_free_graph(
     num_agents: int,
     m: int = 2,
     seed: int | None = None,
-) -> nx.Graph:
+) -> Graph:
     """
     Barabási-Albert 型のスケールフリーネットワークを生成する。
     num_agents: ノード数
@@ -46,4 +77,56 @@ def make_scale_free_graph(
     if m >= num_agents:
         raise ValueError("m must be smaller than num_agents.")
 
-    return nx.barabasi_albert_graph(num_agents, m, seed=seed)
+    # networkx.barabasi_albert_graph と同じ手順・同じ乱数の使い方
+    # （初期グラフは m + 1 ノードのスター, ハブは 0）
+    rng = random.Random(seed)
+    G = Graph(range(m + 1))
+    G.add_edges_from((0, node) for node in range(1, m + 1))
+    # 次数の数だけ繰り返したノードのリスト（ここから一様に選ぶと次数に比例した選択になる）
+    repeated_nodes = [node for node, d in G.degree for _ in range(d)]
+    for source in range(m + 1, num_agents):
+        # 重複のない m 個（集合の反復順も networkx と同じになる）
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(repeated_nodes))
+        G.add_edges_from(zip([source] * m, targets))
+        repeated_nodes.extend(targets)
+        repeated_nodes.extend([source] * m)
+    return G
+
+
+def edge_index_arrays(graph: Graph | nx.Graph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    エッジを 2 本の整数配列 (u, v) に変換する。
+    値はノード ID ではなく graph.nodes の並びでの位置（エージェントリストの添字）。
+    共有グラフ（shared_graph.CSRGraph）は作り直さずに共有の配列を返す。
+    """
+    if hasattr(graph, "edge_index_arrays"):
+        return graph.edge_index_arrays()
+    index = {node: i for i, node in enumerate(graph.nodes)}
+    m = graph.number_of_edges()
+    edges = np.fromiter(
+        (index[x] for e in graph.edges for x in e), dtype=np.int64, count=2 * m
+    ).reshape(m, 2)
+    return edges[:, 0].copy(), edges[:, 1].copy()
+
+
+def csr_adjacency(graph: Graph | nx.Graph) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    隣接リストを CSR 形式 (indptr, indices) に変換する。
+    ノード位置 i の隣接ノードは indices[indptr[i]:indptr[i + 1]]
+    （graph.neighbors と同じ順, 値は graph.nodes の並びでの位置）。
+    共有グラフ（shared_graph.CSRGraph）は作り直さずに共有の配列を返す。
+    """
+    if hasattr(graph, "csr_adjacency"):
+        return graph.csr_adjacency()
+    index = {node: i for i, node in enumerate(graph.nodes)}
+    degrees = np.fromiter((d for _, d in graph.degree), dtype=np.int64, count=len(index))
+    indptr = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter(
+        (index[m] for node in graph.nodes for m in graph.neighbors(node)),
+        dtype=np.int64,
+        count=int(indptr[-1]),
+    )
+    return indptr, indices
@@ -0,0 +1,210 @@
+# paired.py
+from __future__ import annotations
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, Generator, List, Sequence
+import json
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.agent import Agent
+from network_ipd_ga.config_loader import ENGINE_FIELDS, OUTPUT_FIELDS, SimulationConfig
+from network_ipd_ga.game import pair_outcome_table
+from network_ipd_ga.ga import counter_children, counter_uniforms
+from network_ipd_ga.network import csr_adjacency, edge_index_arrays
+from network_ipd_ga.rng import CounterStreams, initial_strategy_codes
+from network_ipd_ga.selection import Selection, SelectionOperator, candidate_segments, select_parents
+from network_ipd_ga.snapshot import GenerationSnapshot, summary_metrics
+from network_ipd_ga.strategy import int_to_strategy
+
+if TYPE_CHECKING:
+    import networkx as nx
+    from network_ipd_ga.graph import Graph
+    from network_ipd_ga.sinks import Sink
+
+# 共通乱数（common random numbers, CRN）による meta_influence の対応のある比較。
+#
+# meta_influence だけが異なる設定（configs/exp の *_metaXX.yml など）を、同じ seed について
+# 1 プロセスで同時に進める。どの設定も
+#   - 同じグラフ（seed から生成）・同じ初期戦略
+#   - 同じカウンタベース乱数（rng.CounterStreams の (seed, 世代, ノード, 用途) の値を 1 回だけ生成して共有）
+# を使うので、設定間の違いはメタ戦略との交叉の確率（u["meta"][:, 0] < meta_influence）だけになる。
+# 設定間の差を seed ごとに取れば seed 間のばらつきの大部分が打ち消され、少ない seed で差を推定できる。
+#
+# 各設定の軌跡は rng_mode="counter" で単独に実行した結果とビット単位で一致する
+# （対戦は戦略ペアの対戦表から, 世代交代は同じ乱数の行で計算する）。
+# 乱数の揃った軌跡が必要なため、rng_mode="sequential" の設定は counter に切り替えて実行する（paired_config）。
+# 対応するのは同期更新・再結線なしのグラフ上のトポロジー（cycle / small_world / scale_free）。
+
+# 対応のある比較で設定ごとに異なってよいフィールド
+PAIRED_FIELD = "meta_influence"
+
+
+def paired_config(cfg: SimulationConfig) -> SimulationConfig:
+    """
+    対応のある実行で使う設定。乱数を揃えるため rng_mode="counter" にする。
+    もともと counter の設定はそのまま（単独の実行と同じ結果）, sequential の設定は
+    結果が変わるので出力名に "_crn" を付ける（config_hash も rng_mode を含むので別になる）。
+    """
+    if cfg.rng_mode == "counter":
+        return cfg
+    return replace(cfg, rng_mode="counter", output_base=f"{cfg.output_base}_crn")
+
+
+def paired_key(cfg: SimulationConfig) -> str:
+    """meta_influence 以外の、結果を決めるパラメータ（同じ値の設定どうしを対にできる）。"""
+    params = {
+        k: v for k, v in cfg.as_dict().items()
+        if k != PAIRED_FIELD and k not in OUTPUT_FIELDS and k not in ENGINE_FIELDS
+    }
+    return json.dumps(params, sort_keys=True)
+
+
+def paired_groups(configs: Sequence[SimulationConfig]) -> List[List[SimulationConfig]]:
+    """設定を meta_influence 以外が等しいグループに分ける（グループ内は meta_influence の昇順）。"""
+    groups: Dict[str, List[SimulationConfig]] = {}
+    for cfg in configs:
+        groups.setdefault(paired_key(paired_config(cfg)), []).append(cfg)
+    return [sorted(g, key=lambda c: c.meta_influence) for g in groups.values()]
+
+
+class PairedSinks:
+    """対応のある実行の世代ごとのスナップショットのリストを、設定ごとの sink に振り分ける。"""
+
+    def __init__(self, sinks_per_run: Sequence[Sequence[Sink]]) -> None:
+        self.sinks_per_run = [list(s) for s in sinks_per_run]
+
+    def write(self, snaps: List[GenerationSnapshot]) -> None:
+        for snap, sinks in zip(snaps, self.sinks_per_run):
+            for sink in sinks:
+                sink.write(snap)
+
+    def close(self) -> None:
+        for sinks in self.sinks_per_run:
+            for sink in sinks:
+                sink.close()
+
+
+def iter_paired_simulation(
+    meta_influences: Sequence[float],
+    topology: str = "cycle",
+    num_agents: int = 100,
+    generations: int = 100,
+    T: int = 50,
+    mutation_rate: float = 0.01,
+    small_world_k: int = 4,
+    small_world_p: float = 0.1,
+    scale_free_m: int = 2,
+    seed: int = 0,
+    graph: Graph | nx.Graph | None = None,
+    spatial_metrics: bool = True,
+    update_mode: str = "sync",
+    rewire_rate: float = 0.0,
+    rng_mode: str = "counter",
+    selection: SelectionOperator = "tournament",
+    tournament_k: int = 3,
+    fermi_temperature: float = 1.0,
+    **_ignored,
+) -> Generator[List[GenerationSnapshot], None, List[List[Agent]]]:
+    """
+    meta_influences の各値の集団を同じグラフ・同じ初期戦略・同じ乱数で同時に進め、
+    世代ごとにスナップショットのリスト（meta_influences の順）を yield する。
+    戦略・利得は (設定数, ノード数) の配列で持ち、対戦はエッジ配列と戦略ペアの対戦表から一括で計算する。
+    他の引数は iter_simulation と同じ（async_schedule など同期更新で使わないものは無視する）。
+    ジェネレータの戻り値は設定ごとの最終世代のエージェントリスト。
+    """
+    if topology in ("well_mixed", "lattice"):
+        raise ValueError(f"Paired runs are not supported for topology='{topology}'.")
+    if update_mode != "sync" or rewire_rate > 0:
+        raise ValueError("Paired runs support only update_mode='sync' without rewiring.")
+    if rng_mode != "counter":
+        raise ValueError("Paired runs require rng_mode='counter' (aligned random streams).")
+
+    if graph is None:
+        from network_ipd_ga.simulation import build_graph
+
+        graph = build_graph(topology, num_agents, seed, small_world_k, small_world_p, scale_free_m)
+    selector = Selection(selection, k=tournament_k, temperature=fermi_temperature)
+    meta = np.asarray(meta_influences, dtype=np.float64)
+    runs = len(meta)
+
+    n = graph.number_of_nodes()
+    node_ids = np.fromiter(graph.nodes, dtype=np.int64, count=n)
+    edge_u, edge_v = edge_index_arrays(graph)
+    indptr, indices = csr_adjacency(graph)
+    # 候補区間はグラフが固定なので 1 回だけ作り、全設定・全世代で共有する
+    seg_ptr, candidates = candidate_segments(indptr, indices, np.arange(n))
+    payoff_table, coop_table = pair_outcome_table(T)
+    total_actions = 2 * T * len(edge_u)
+    # 設定 r のノード i の利得は bincount の位置 r * n + i に足し込む
+    run_offset = (np.arange(runs) * n)[:, None]
+
+    streams = CounterStreams(seed)
+    codes = np.tile(initial_strategy_codes(streams, n).astype(np.int8), (runs, 1))
+    payoffs = np.zeros((runs, n), dtype=np.float64)
+    reproduce_time = 0.0
+    for gen in range(generations):
+        t_start = time.perf_counter()
+        pair = codes[:, edge_u].astype(np.int64) * 8 + codes[:, edge_v]
+        pair_rev = codes[:, edge_v].astype(np.int64) * 8 + codes[:, edge_u]
+        payoffs = (
+            np.bincount((run_offset + edge_u).ravel(), payoff_table.ravel()[pair].ravel(), runs * n)
+            + np.bincount((run_offset + edge_v).ravel(), payoff_table.ravel()[pair_rev].ravel(), runs * n)
+        ).reshape(runs, n)
+        coop_actions = coop_table.ravel()[pair].sum(axis=1)
+        t_played = time.perf_counter()
+
+        snaps = []
+        for r in range(runs):
+            t_metrics = time.perf_counter()
+            realized_coop_rate = int(coop_actions[r]) / total_actions if total_actions > 0 else 0.0
+            metrics = summary_metrics(
+                gen,
+                realized_coop_rate,
+                codes[r],
+                payoffs[r],
+                edges=(edge_u, edge_v) if spatial_metrics else None,
+            )
+            snaps.append(
+                GenerationSnapshot(
+                    generation=gen,
+                    node_ids=node_ids,
+                    strategies=codes[r],
+                    payoffs=payoffs[r],
+                    metrics=metrics,
+                    timings={
+                        "play": (t_played - t_start) / runs,
+                        "metrics": time.perf_counter() - t_metrics,
+                        "reproduce": reproduce_time / runs,
+                    },
+                )
+            )
+        yield snaps
+
+        t_reproduce = time.perf_counter()
+        # 乱数は全設定で共通（1 回だけ生成）。設定ごとに違うのは親の利得とメタ戦略の交叉の確率だけ
+        u = counter_uniforms(streams, gen, n, selector)
+        d = selector.draws
+        new_codes = np.empty_like(codes)
+        for r in range(runs):
+            meta_code = int(np.argmax(np.bincount(codes[r], minlength=8)))
+            parent1 = codes[r][select_parents(selector, payoffs[r], seg_ptr, candidates, u["select"][:, :d])]
+            parent2 = codes[r][select_parents(selector, payoffs[r], seg_ptr, candidates, u["select"][:, d:2 * d])]
+            new_codes[r] = counter_children(parent1, parent2, u, meta_code, mutation_rate, float(meta[r]))
+        codes = new_codes
+        reproduce_time = time.perf_counter() - t_reproduce
+        logger.info(
+            f"Gen {gen}: " + ", ".join(
+                f"meta={m:g} coop={s.metrics['realized_coop_rate']:.3f}" for m, s in zip(meta, snaps)
+            )
+        )
+
+    return [
+        [
+            Agent(id=i, strategy=int_to_strategy(c), payoff=p)
+            for i, c, p in zip(node_ids.tolist(), codes[r].tolist(), payoffs[r].tolist())
+        ]
+        for r in range(runs)
+    ]
@@ -0,0 +1,119 @@
+# reorder.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Literal, Tuple
+
+import numpy as np
+
+# キャッシュ局所性のためのノードの並べ替え。
+#
+# BA や再結線した WS のグラフでは、隣接ノードの位置が配列上でばらばらに散らばるため、
+# 10^6 ノード規模では世代交代の候補の gather（payoffs[candidates] など）がキャッシュを外しやすい。
+# CSR を作る前にノードを帯幅の小さい順（RCM・BFS）や次数順に並べ替えると、隣接ノードが近くに並ぶ。
+#
+# 並べ替えは配列ベースのエンジンの内部だけで使い、出力（node_df・グラフ）は元の順序・ID に戻す。
+# 隣接ノードの並び（候補の順序）と各ノードの乱数の行は元のまま保つので、結果は並べ替えによらず一致する。
+#
+#   original: 並べ替えない（graph.nodes の順, デフォルト）
+#   rcm     : reverse Cuthill–McKee（連結成分ごとに最小次数のノードから BFS し、隣接ノードは次数の昇順, 最後に反転）
+#   bfs     : 幅優先探索の順（連結成分ごとに位置の小さいノードから, 隣接ノードは CSR の順）
+#   degree  : 次数の降順（同じ次数は元の順）。ハブの行がまとまる
+NodeOrder = Literal["original", "rcm", "bfs", "degree"]
+NODE_ORDERS = ("original", "rcm", "bfs", "degree")
+
+
+@dataclass(frozen=True)
+class Reordering:
+    """
+    ノードの並べ替え。perm[新しい位置] = 元の位置, inverse[元の位置] = 新しい位置。
+    元の順序の配列 x は x[perm] で新しい順序になり, 新しい順序の配列 y は y[inverse] で元に戻る。
+    """
+
+    perm: np.ndarray
+    inverse: np.ndarray
+
+    @classmethod
+    def from_perm(cls, perm: np.ndarray) -> Reordering:
+        perm = np.asarray(perm, dtype=np.int64)
+        inverse = np.empty_like(perm)
+        inverse[perm] = np.arange(len(perm))
+        return cls(perm, inverse)
+
+    def to_new(self, values: np.ndarray) -> np.ndarray:
+        return values[self.perm]
+
+    def to_original(self, values: np.ndarray) -> np.ndarray:
+        return values[self.inverse]
+
+    def permute_csr(self, indptr: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CSR 隣接を新しい位置で付け直す。
+        新しい位置 p の隣接ノードは元のノード perm[p] の隣接ノードを同じ並びで写したもの。
+        """
+        degrees = np.diff(indptr)[self.perm]
+        new_indptr = np.zeros(len(self.perm) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=new_indptr[1:])
+        # 新しい並びでの各エントリの元の CSR 上の位置
+        offset = np.arange(new_indptr[-1]) - np.repeat(new_indptr[:-1], degrees)
+        source = np.repeat(indptr[self.perm], degrees) + offset
+        return new_indptr, self.inverse[indices[source]]
+
+
+def bandwidth(indptr: np.ndarray, indices: np.ndarray) -> int:
+    """隣接行列の帯幅 max |i - j|（エッジがなければ 0）。"""
+    if len(indices) == 0:
+        return 0
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return int(np.abs(rows - indices).max())
+
+
+def _bfs_order(indptr: np.ndarray, indices: np.ndarray, by_degree: bool) -> np.ndarray:
+    """
+    連結成分ごとの幅優先探索の訪問順。
+    by_degree=True のときは Cuthill–McKee の順（成分の始点は最小次数, 各ノードの隣接ノードは次数の昇順）。
+    """
+    n = len(indptr) - 1
+    degree = np.diff(indptr)
+    if by_degree:
+        # 各ノードの隣接ノードを次数の昇順（同じ次数は CSR の順）に並べ替えておく
+        rows = np.repeat(np.arange(n), degree)
+        indices = indices[np.lexsort((degree[indices], rows))]
+        starts = np.argsort(degree, kind="stable")
+    else:
+        starts = np.arange(n)
+
+    # 探索そのものは 1 ノードずつ（直径の大きいグラフでも O(N + E)）
+    ptr = indptr.tolist()
+    nbrs = indices.tolist()
+    visited = bytearray(n)
+    order: list = []
+    for s in starts.tolist():
+        if visited[s]:
+            continue
+        visited[s] = 1
+        head = len(order)
+        order.append(s)
+        while head < len(order):
+            v = order[head]
+            head += 1
+            for w in nbrs[ptr[v] : ptr[v + 1]]:
+                if not visited[w]:
+                    visited[w] = 1
+                    order.append(w)
+    return np.array(order, dtype=np.int64)
+
+
+def node_ordering(indptr: np.ndarray, indices: np.ndarray, method: NodeOrder) -> Reordering:
+    """CSR 隣接から並べ替え（Reordering）を計算する。"""
+    if method not in NODE_ORDERS:
+        raise ValueError(f"Unknown node order: {method}")
+    n = len(indptr) - 1
+    if method == "original":
+        perm = np.arange(n)
+    elif method == "degree":
+        perm = np.argsort(-np.diff(indptr), kind="stable")
+    elif method == "bfs":
+        perm = _bfs_order(indptr, indices, by_degree=False)
+    else:
+        perm = _bfs_order(indptr, indices, by_degree=True)[::-1]
+    return Reordering.from_perm(perm)
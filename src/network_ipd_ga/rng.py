@@ -0,0 +1,84 @@
+# rng.py
+from __future__ import annotations
+from typing import Dict, Literal, Tuple
+
+import numpy as np
+
+
+# sequential: 1 つの random.Random(seed) を順に呼ぶ従来方式（デフォルト, 既存の結果と一致）
+# counter   : (seed, generation, purpose) ごとのカウンタベース乱数（Philox）。
+#             ノード i の乱数は行 i に固定されるため、計算の順序や分割に依存しない
+RngMode = Literal["sequential", "counter"]
+
+# 用途 -> (ストリーム番号, 1 ノードあたりの乱数の数)。
+# Philox は 1 カウンタで 64 bit 値を 4 個出すので、幅は 4 の倍数にそろえる
+# （任意のノードから O(1) で読み始められるようにするため）。
+STREAM_PURPOSES: Dict[str, Tuple[int, int]] = {
+    "init": (0, 4),       # 初期戦略の 3 ビット
+    "select": (1, 8),     # 親 1・親 2 の選択（幅は選択演算子に応じて変える, select_width）
+    "crossover": (2, 4),  # 一様交叉の 3 ビット
+    "mutate": (3, 4),     # 突然変異の 3 ビット
+    "meta": (4, 4),       # メタ戦略と交叉するかどうか 1 回 + 交叉の 3 ビット
+}
+
+
+class CounterStreams:
+    """
+    seed から (generation, purpose) ごとに独立な乱数ストリームを導出する。
+
+    ストリームは SeedSequence(seed, spawn_key=(generation, purpose)) を鍵とする Philox で、
+    ノード i が使う一様乱数は uniforms(...) の行 i に固定される。
+    ノード範囲 [start, stop) だけを読んでも全体を読んだときと同じ値になるため、
+    逐次・ベクトル化・複数プロセスへの分割のどれで計算しても結果はビット単位で一致する。
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+
+    def uniforms(
+        self,
+        generation: int,
+        purpose: str,
+        num_nodes: int,
+        start: int = 0,
+        stop: int | None = None,
+        width: int | None = None,
+    ) -> np.ndarray:
+        """
+        ノード start〜stop-1 の一様乱数 [0, 1)。shape = (stop - start, 幅)。
+        width を省略すると STREAM_PURPOSES の幅（指定する場合は 4 の倍数）。
+        """
+        if purpose not in STREAM_PURPOSES:
+            raise ValueError(f"Unknown stream purpose: {purpose}")
+        stream, default_width = STREAM_PURPOSES[purpose]
+        if width is None:
+            width = default_width
+        if width < 1 or width % 4:
+            raise ValueError(f"Stream width must be a positive multiple of 4: {width}")
+        if stop is None:
+            stop = num_nodes
+        if not (0 <= start <= stop <= num_nodes):
+            raise ValueError(f"Invalid node range [{start}, {stop}) for {num_nodes} nodes.")
+
+        seq = np.random.SeedSequence(self.seed, spawn_key=(generation, stream))
+        bitgen = np.random.Philox(seq)
+        bitgen.advance(start * width // 4)
+        return np.random.Generator(bitgen).random((stop - start, width))
+
+    def node_uniforms(
+        self, generation: int, purpose: str, num_nodes: int, node: int, width: int | None = None
+    ) -> np.ndarray:
+        """ノード node（添字）1 つ分の一様乱数。"""
+        return self.uniforms(generation, purpose, num_nodes, node, node + 1, width=width)[0]
+
+
+def select_width(draws_per_parent: int) -> int:
+    """親 2 人分の選択に使う "select" ストリームの幅（4 の倍数, 最低 8）。"""
+    return max(8, (2 * draws_per_parent + 3) // 4 * 4)
+
+
+def initial_strategy_codes(streams: CounterStreams, num_nodes: int) -> np.ndarray:
+    """counter モードの初期戦略（各ビット 50%）を戦略コードの配列で返す。"""
+    u = streams.uniforms(0, "init", num_nodes)
+    bits = (u[:, :3] < 0.5).astype(np.int8)
+    return (bits[:, 0] << 2) | (bits[:, 1] << 1) | bits[:, 2]
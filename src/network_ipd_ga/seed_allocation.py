@@ -0,0 +1,150 @@
+# seed_allocation.py
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, Sequence
+import csv
+import math
+
+from network_ipd_ga.config_loader import SimulationConfig
+
+# seed の適応的な割り当て（run_all_experiments.py --adaptive）。
+#
+# 設定ごとに seed をバッチで追加し、指定したメトリクスの最終世代の値について
+# 平均の信頼区間（Student の t 分布）の幅が目標以下になるか、seed の上限に達したら止める。
+# ばらつきの小さい設定は少ない seed で終わり、計算はばらつきの大きい設定に回る。
+# 使った seed と達成した精度は割り当て表（CSV）に記録する。
+
+ALLOCATION_COLUMNS = [
+    "config", "config_hash", "metric", "num_seeds", "seeds",
+    "mean", "ci_width", "target_width", "confidence", "converged",
+]
+
+
+def t_quantile(p: float, df: int) -> float:
+    """
+    Student の t 分布の p 分位点（scipy を使わない近似）。
+    df = 1, 2 は閉じた式, df >= 3 は正規分位点からの Cornish–Fisher 展開（誤差 1% 未満）。
+    """
+    if df < 1:
+        raise ValueError(f"Degrees of freedom must be >= 1 (got {df}).")
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z**3 + z) / 4
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+    g4 = (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df**2 + g3 / df**3 + g4 / df**4
+
+
+def confidence_interval(values: Sequence[float], confidence: float = 0.95) -> tuple[float, float]:
+    """平均と、その信頼区間の半幅（seed が 2 つ未満なら半幅は inf）。"""
+    n = len(values)
+    if n == 0:
+        return float("nan"), float("inf")
+    mean = sum(values) / n
+    if n < 2:
+        return mean, float("inf")
+    var = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return mean, t_quantile(0.5 + confidence / 2, n - 1) * math.sqrt(var / n)
+
+
+def final_values_from_csv(cfg: SimulationConfig, seeds: Sequence[int], metrics: Sequence[str]) -> Dict[str, List[float]]:
+    """run_single_experiment.py の世代サマリ CSV から、各 seed の最終世代のメトリクスを読む。"""
+    values: Dict[str, List[float]] = {m: [] for m in metrics}
+    for seed in seeds:
+        path = cfg.output_dir / "csvs" / f"{cfg.output_base}_seed{seed:04d}.csv"
+        with path.open(newline="") as f:
+            last = None
+            for last in csv.DictReader(f):
+                pass
+        if last is None:
+            continue
+        for m in metrics:
+            if last[m] != "":  # nan は空欄で保存される
+                values[m].append(float(last[m]))
+    return values
+
+
+def final_values_from_store(
+    store_path: Path, cfg: SimulationConfig, seeds: Sequence[int], metrics: Sequence[str]
+) -> Dict[str, List[float]]:
+    """結果ストアから、各 seed の最終世代のメトリクスを 1 クエリで読む。"""
+    from network_ipd_ga.store import ResultsStore
+
+    with ResultsStore(store_path) as store:
+        df = store.final_metrics(metrics, where={"config_hash": cfg.config_hash(), "seed": list(seeds)})
+    return {m: df[m].dropna().astype(float).tolist() for m in metrics}
+
+
+@dataclass
+class SeedAllocation:
+    """1 設定・1 メトリクスの seed の割り当てと達成した精度（割り当て表の 1 行）。"""
+
+    config: str
+    config_hash: str
+    metric: str
+    seeds: List[int]
+    mean: float
+    ci_width: float
+    target_width: float
+    confidence: float
+
+    @property
+    def converged(self) -> bool:
+        return self.ci_width <= self.target_width
+
+    def as_row(self) -> dict:
+        return {
+            "config": self.config,
+            "config_hash": self.config_hash,
+            "metric": self.metric,
+            "num_seeds": len(self.seeds),
+            "seeds": " ".join(map(str, self.seeds)),
+            "mean": self.mean,
+            "ci_width": self.ci_width,
+            "target_width": self.target_width,
+            "confidence": self.confidence,
+            "converged": self.converged,
+        }
+
+
+def allocate(
+    cfg: SimulationConfig,
+    name: str,
+    seeds: Sequence[int],
+    values: Dict[str, List[float]],
+    target_width: float,
+    confidence: float,
+) -> List[SeedAllocation]:
+    """各メトリクスの信頼区間（全幅 = 2 × 半幅）を計算して割り当て表の行を作る。"""
+    rows = []
+    for metric, vals in values.items():
+        mean, half = confidence_interval(vals, confidence)
+        rows.append(
+            SeedAllocation(
+                config=name,
+                config_hash=cfg.config_hash(),
+                metric=metric,
+                seeds=list(seeds),
+                mean=mean,
+                ci_width=2 * half,
+                target_width=target_width,
+                confidence=confidence,
+            )
+        )
+    return rows
+
+
+def write_allocation_report(path: Path, allocations: Sequence[SeedAllocation]) -> None:
+    """割り当て表を CSV に書き出す。"""
+    rows = [a.as_row() for a in allocations]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=ALLOCATION_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
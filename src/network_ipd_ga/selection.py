@@ -0,0 +1,292 @@
+# selection.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Literal, Sequence, Tuple
+import math
+import random
+
+import numpy as np
+
+from network_ipd_ga.agent import Agent
+
+# 親選択の演算子（候補 = 自分＋隣接ノード）
+#   tournament: 候補から k 回復元抽出し、利得最大（同点は先に引いた方）
+#   roulette  : 利得に比例した確率で選ぶ（全候補の利得が 0 なら一様）
+#   rank      : 候補内の利得の順位（昇順に 1, 2, …, 同点は候補の並び順）に比例した確率で選ぶ
+#   fermi     : 隣接ノード y を一様に選び、確率 1 / (1 + exp((P_x - P_y) / K)) で y, それ以外は自分
+SelectionOperator = Literal["tournament", "roulette", "rank", "fermi"]
+SELECTION_OPERATORS = ("tournament", "roulette", "rank", "fermi")
+
+
+@dataclass(frozen=True)
+class Selection:
+    """親選択の設定。k はトーナメントサイズ, temperature は Fermi 則の K。"""
+
+    operator: SelectionOperator = "tournament"
+    k: int = 3
+    temperature: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.operator not in SELECTION_OPERATORS:
+            raise ValueError(f"Unknown selection operator: {self.operator}")
+        if self.k < 1:
+            raise ValueError("Tournament size k must be >= 1.")
+        if self.temperature <= 0:
+            raise ValueError("Fermi temperature must be > 0.")
+
+    @property
+    def draws(self) -> int:
+        """親 1 人を選ぶのに使う一様乱数の数。"""
+        if self.operator == "tournament":
+            return self.k
+        if self.operator == "fermi":
+            return 2
+        return 1
+
+
+DEFAULT_SELECTION = Selection()
+
+
+def fermi_probability(diff: np.ndarray, temperature: float) -> np.ndarray:
+    """
+    Fermi 則の模倣確率 1 / (1 + exp(diff / K))（diff = 自分の利得 - 相手の利得）。
+    逐次版・ベクトル化版の両方がこの関数を使う（exp の丸めを揃えるため）。
+    """
+    with np.errstate(over="ignore"):
+        return 1.0 / (1.0 + np.exp(np.asarray(diff, dtype=np.float64) / temperature))
+
+
+# ---------------------------------------------------------------------
+# 1 ノード分の選択（候補の利得のリスト + 一様乱数）
+# ---------------------------------------------------------------------
+def _rank_weights(payoffs: Sequence[float]) -> List[int]:
+    order = sorted(range(len(payoffs)), key=payoffs.__getitem__)  # 安定ソート
+    ranks = [0] * len(payoffs)
+    for r, i in enumerate(order):
+        ranks[i] = r + 1
+    return ranks
+
+
+def _proportional_index(weights: Sequence[float], u: float) -> int:
+    """
+    重みに比例した確率で添字を選ぶ。重みは非負の整数値（利得・順位）を仮定し、
+    floor(u * 合計) < 累積和 となる最初の添字を返す（ベクトル化版と同じ比較）。
+    """
+    total = 0.0
+    cumsum = []
+    for w in weights:
+        total += w
+        cumsum.append(total)
+    if total <= 0:
+        return int(u * len(weights))
+    target = math.floor(u * total)
+    for i, c in enumerate(cumsum):
+        if c > target:
+            return i
+    return len(weights) - 1
+
+
+def select_index(payoffs: Sequence[float], u: Sequence[float], selection: Selection) -> int:
+    """
+    候補の利得 payoffs（先頭が自分）から 1 つ選び、その添字を返す。
+    u は selection.draws 個の一様乱数 [0, 1)。
+    """
+    c = len(payoffs)
+    op = selection.operator
+    if op == "tournament":
+        k = min(selection.k, c)
+        picks = [int(u[t] * c) for t in range(k)]
+        return max(picks, key=payoffs.__getitem__)
+    if op == "roulette":
+        return _proportional_index(payoffs, u[0])
+    if op == "rank":
+        return _proportional_index(_rank_weights(payoffs), u[0])
+    # fermi
+    if c == 1:
+        return 0
+    j = 1 + int(u[0] * (c - 1))
+    p = float(fermi_probability(np.array([payoffs[0] - payoffs[j]]), selection.temperature)[0])
+    return j if u[1] < p else 0
+
+
+def select_parent(candidates: List[Agent], rng: random.Random, selection: Selection) -> Agent:
+    """逐次の乱数（random.Random）で候補から親を 1 人選ぶ。"""
+    if selection.operator == "tournament":
+        # 従来の _tournament_select と同じ乱数の使い方（k=3 で既存の結果を再現）
+        if len(candidates) == 1:
+            return candidates[0]
+        k = min(selection.k, len(candidates))
+        sampled = [rng.choice(candidates) for _ in range(k)]
+        return max(sampled, key=lambda a: a.payoff)
+    u = [rng.random() for _ in range(selection.draws)]
+    return candidates[select_index([a.payoff for a in candidates], u, selection)]
+
+
+# ---------------------------------------------------------------------
+# 全ノード一括の選択（CSR で区切った候補の配列上でベクトル化）
+# ---------------------------------------------------------------------
+def candidate_segments(
+    indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    nodes の各ノードの候補（自分＋隣接ノード）を 1 本の配列に並べる。
+    戻り値 (seg_ptr, candidates): ノード nodes[r] の候補は candidates[seg_ptr[r]:seg_ptr[r + 1]]
+    （先頭が自分, 以降は隣接ノードを CSR の順で）。
+    """
+    sizes = indptr[nodes + 1] - indptr[nodes] + 1
+    seg_ptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=seg_ptr[1:])
+    offset = np.arange(seg_ptr[-1]) - np.repeat(seg_ptr[:-1], sizes)
+    source = np.repeat(indptr[nodes] - 1, sizes) + offset
+    candidates = np.where(
+        offset == 0, np.repeat(nodes, sizes), np.take(indices, source, mode="clip") if len(indices) else 0
+    )
+    return seg_ptr, candidates
+
+
+def _segment_rank_weights(values: np.ndarray, seg_id: np.ndarray, seg_ptr: np.ndarray) -> np.ndarray:
+    """各区間内での values の昇順順位（1 始まり, 同点は並び順）。"""
+    order = np.lexsort((values, seg_id))  # 区間ごとに values の昇順（安定）
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.arange(len(values)) - seg_ptr[seg_id[order]] + 1
+    return ranks
+
+
+def select_parents(
+    selection: Selection,
+    payoffs: np.ndarray,
+    seg_ptr: np.ndarray,
+    candidates: np.ndarray,
+    u: np.ndarray,
+) -> np.ndarray:
+    """
+    全ノード（候補区間ごと）の親をまとめて選び、親のノード位置の配列を返す。
+    u: shape (ノード数, selection.draws) の一様乱数（ノード r の行を使う）。
+    結果は各ノードで select_index を呼んだ場合とビット単位で一致する。
+    """
+    starts = seg_ptr[:-1]
+    sizes = np.diff(seg_ptr)
+    rows = np.arange(len(starts))
+    op = selection.operator
+
+    if op == "tournament":
+        k = selection.k
+        pos = (u[:, :k] * sizes[:, None]).astype(np.int64)
+        picked = candidates[starts[:, None] + pos]
+        valid = np.arange(k) < np.minimum(k, sizes)[:, None]
+        score = np.where(valid, payoffs[picked], -np.inf)
+        # argmax は同点のとき最初の要素を返す（max と同じ）
+        return picked[rows, np.argmax(score, axis=1)]
+
+    if op in ("roulette", "rank"):
+        seg_id = np.repeat(rows, sizes)
+        if op == "roulette":
+            weights = payoffs[candidates].astype(np.float64)
+        else:
+            weights = _segment_rank_weights(payoffs[candidates], seg_id, seg_ptr)
+        if len(weights) and weights.min() < 0:
+            raise ValueError("Proportional selection requires non-negative weights.")
+        # 区間ごとの累積和を全体の累積和の差で表し、searchsorted で一括検索する
+        # （重みは整数値なので累積和は厳密で、floor(u * 合計) との比較も逐次版と一致する）
+        cumsum = np.concatenate(([0.0], np.cumsum(weights)))
+        base = cumsum[starts]
+        total = cumsum[seg_ptr[1:]] - base
+        target = np.floor(u[:, 0] * total)
+        entry = np.searchsorted(cumsum[1:], base + target, side="right")
+        uniform = starts + (u[:, 0] * sizes).astype(np.int64)
+        entry = np.where(total > 0, np.minimum(entry, seg_ptr[1:] - 1), uniform)
+        return candidates[entry]
+
+    # fermi
+    own = candidates[starts]
+    has_neighbor = sizes > 1
+    j = 1 + (u[:, 0] * np.maximum(sizes - 1, 1)).astype(np.int64)
+    other = candidates[np.minimum(starts + j, seg_ptr[1:] - 1)]
+    p = fermi_probability(payoffs[own] - payoffs[other], selection.temperature)
+    return np.where(has_neighbor & (u[:, 1] < p), other, own)
+
+
+# ---------------------------------------------------------------------
+# 完全混合（well_mixed）: 候補は集団全体（ノードの並び順）
+# ---------------------------------------------------------------------
+def select_parents_well_mixed(selection: Selection, payoffs: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    候補を集団全体（位置 0〜N-1, 自分を含む）として全ノードの親をまとめて選ぶ。
+    候補はどのノードでも共通なので、累積和・順位は 1 回だけ計算する（O(N)）。
+    fermi は自分以外から一様に 1 人選ぶ。u: shape (ノード数, selection.draws)。
+    """
+    n = len(payoffs)
+    op = selection.operator
+
+    if op == "tournament":
+        picked = (u[:, :selection.k] * n).astype(np.int64)
+        # argmax は同点のとき最初の要素を返す（先に引いた方）
+        return picked[np.arange(len(u)), np.argmax(payoffs[picked], axis=1)]
+
+    if op in ("roulette", "rank"):
+        if op == "roulette":
+            weights = payoffs.astype(np.float64)
+        else:
+            weights = np.empty(n, dtype=np.float64)
+            weights[np.argsort(payoffs, kind="stable")] = np.arange(1, n + 1)
+        if n and weights.min() < 0:
+            raise ValueError("Proportional selection requires non-negative weights.")
+        cumsum = np.cumsum(weights)
+        total = cumsum[-1] if n else 0.0
+        if total <= 0:
+            return (u[:, 0] * n).astype(np.int64)
+        target = np.floor(u[:, 0] * total)
+        return np.minimum(np.searchsorted(cumsum, target, side="right"), n - 1)
+
+    # fermi
+    own = np.arange(len(u))
+    if n == 1:
+        return own
+    other = (u[:, 0] * (n - 1)).astype(np.int64)
+    other += other >= own  # 自分を飛ばす
+    p = fermi_probability(payoffs[own] - payoffs[other], selection.temperature)
+    return np.where(u[:, 1] < p, other, own)
+
+
+# ---------------------------------------------------------------------
+# 格子（lattice）: 全ノードの候補の数が同じなので (ノード数, 候補数) の密な配列で選ぶ
+# ---------------------------------------------------------------------
+def select_parents_dense(selection: Selection, cand_payoffs: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    cand_payoffs: shape (ノード数, c) の候補の利得（列 0 が自分, 以降は隣接ノード）。
+    各ノードで選んだ候補の列番号を返す。u: shape (ノード数, selection.draws)。
+    候補の並びが同じなら select_parents（CSR の候補区間）とビット単位で一致する。
+    """
+    n, c = cand_payoffs.shape
+    rows = np.arange(n)
+    op = selection.operator
+
+    if op == "tournament":
+        k = selection.k
+        cols = (u[:, :k] * c).astype(np.int64)
+        score = cand_payoffs[rows[:, None], cols]
+        if k > c:
+            score[:, c:] = -np.inf
+        return cols[rows, np.argmax(score, axis=1)]
+
+    if op in ("roulette", "rank"):
+        if op == "roulette":
+            weights = cand_payoffs.astype(np.float64)
+        else:
+            weights = np.empty((n, c), dtype=np.float64)
+            order = np.argsort(cand_payoffs, axis=1, kind="stable")
+            np.put_along_axis(weights, order, np.arange(1, c + 1, dtype=np.float64)[None, :], axis=1)
+        if weights.size and weights.min() < 0:
+            raise ValueError("Proportional selection requires non-negative weights.")
+        cumsum = np.cumsum(weights, axis=1)
+        total = cumsum[:, -1]
+        target = np.floor(u[:, 0] * total)
+        col = np.minimum((cumsum <= target[:, None]).sum(axis=1), c - 1)
+        return np.where(total > 0, col, (u[:, 0] * c).astype(np.int64))
+
+    # fermi
+    if c == 1:
+        return np.zeros(n, dtype=np.int64)
+    col = 1 + (u[:, 0] * (c - 1)).astype(np.int64)
+    p = fermi_probability(cand_payoffs[:, 0] - cand_payoffs[rows, col], selection.temperature)
+    return np.where(u[:, 1] < p, col, 0)
@@ -0,0 +1,378 @@
+# shared_graph.py
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: ロックなし（同時に解放・接続しない前提）
+    fcntl = None
+
+if TYPE_CHECKING:
+    import networkx as nx
+    from network_ipd_ga.graph import Graph
+
+# プロセス間で共有する読み取り専用のグラフ（並列スイープのワーカー用）。
+#
+# 並列のスイープでは、各ワーカーが同じグラフ（同じ topology・パラメータ・seed）を作り直すか
+# unpickle して、グラフと派生データ（エッジ配列・CSR 隣接）のコピーをワーカーの数だけ持つ。
+# ここではグラフを次の整数配列（int64）にして 1 回だけ .npy ファイルに書き出し、
+#   node_ids : graph.nodes の並びのノード ID
+#   indptr, indices : CSR 隣接（network.csr_adjacency）
+#   degrees  : 次数
+#   edge_u, edge_v : エッジ配列（network.edge_index_arrays, 対戦・空間メトリクスのペア）
+# ワーカーは np.load(mmap_mode="r") で読み取り専用にマップする（コピーしない。ページキャッシュを全プロセスで共有）。
+# 置き場所は既定で /dev/shm（RAM 上のファイルシステム, なければ一時ディレクトリ,
+# 環境変数 NETWORK_IPD_GA_SHARED_DIR で変更可）。
+#
+# 共有したグラフのディレクトリには接続中のプロセスごとに参照ファイル（refs/<pid>.<uuid>）を置き、
+# release() で最後の参照が外れたときにディレクトリを削除する（参照カウント）。
+# 異常終了したプロセスの参照は pid が存在しなければ数えない。
+#
+# CSRGraph は配列の上の Graph と同じ読み取り API（nodes / edges / degree / neighbors）のビューで、
+# iter_simulation の graph にそのまま渡せる。エッジ配列・CSR は network.edge_index_arrays /
+# csr_adjacency が作り直さずに共有の配列を返す。列挙順は元のグラフと同じなので結果も同じ。
+# ノード ID が整数のグラフだけを共有できる（network.py の生成関数のグラフは 0..N-1）。
+
+ARRAYS = ("node_ids", "indptr", "indices", "degrees", "edge_u", "edge_v")
+
+_META = "meta.json"
+_REFS = "refs"
+_LOCK = ".lock"
+
+
+def default_root() -> Path:
+    """共有グラフの置き場所（NETWORK_IPD_GA_SHARED_DIR, /dev/shm, 一時ディレクトリの順）。"""
+    env = os.environ.get("NETWORK_IPD_GA_SHARED_DIR")
+    if env:
+        return Path(env)
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+    return base / "network_ipd_ga_graphs"
+
+
+def graph_key(topology: str, num_agents: int, seed: int, small_world_k: int, small_world_p: float, scale_free_m: int) -> str:
+    """simulation.build_graph の引数ごとの共有グラフの名前（同じ引数なら同じグラフ）。"""
+    params = {
+        "topology": topology,
+        "num_agents": num_agents,
+        "seed": seed,
+        "small_world_k": small_world_k,
+        "small_world_p": small_world_p,
+        "scale_free_m": scale_free_m,
+    }
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{topology}_n{num_agents}_seed{seed}_{digest}"
+
+
+def graph_arrays(graph: Graph | nx.Graph) -> Dict[str, np.ndarray]:
+    """グラフを共有する配列（ARRAYS）に変換する。"""
+    from network_ipd_ga.network import csr_adjacency, edge_index_arrays
+
+    if isinstance(graph, CSRGraph):
+        return dict(graph.arrays)
+    try:
+        node_ids = np.fromiter(graph.nodes, dtype=np.int64, count=graph.number_of_nodes())
+    except (TypeError, ValueError):
+        raise ValueError("Only graphs with integer node IDs can be shared.") from None
+    indptr, indices = csr_adjacency(graph)
+    edge_u, edge_v = edge_index_arrays(graph)
+    return {
+        "node_ids": node_ids,
+        "indptr": indptr,
+        "indices": indices,
+        "degrees": np.diff(indptr),
+        "edge_u": edge_u,
+        "edge_v": edge_v,
+    }
+
+
+# ---------------------------------------------------------------------
+# 配列の上の読み取り専用グラフ
+# ---------------------------------------------------------------------
+class CSRGraph:
+    """CSR 配列の上の読み取り専用の無向グラフ（Graph の参照 API と同じ意味・同じ順序）。"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        self.arrays = arrays
+        self.graph: dict = {}
+        n = len(arrays["node_ids"])
+        ids = arrays["node_ids"]
+        # ノード ID が 0..N-1 なら位置と同じなので辞書を作らない
+        self._identity = n == 0 or (int(ids[0]) == 0 and int(ids[-1]) == n - 1 and bool(np.all(np.diff(ids) == 1)))
+        self._index: Dict[int, int] | None = None
+
+    # --- 共有の配列（network.py がそのまま使う） -----------------------------------------
+    def edge_index_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.arrays["edge_u"], self.arrays["edge_v"]
+
+    def csr_adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.arrays["indptr"], self.arrays["indices"]
+
+    # --- 参照 -----------------------------------------------------------------
+    def _position(self, node) -> int:
+        if self._identity:
+            if isinstance(node, (int, np.integer)) and 0 <= node < len(self):
+                return int(node)
+            raise KeyError(node)
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.arrays["node_ids"].tolist())}
+        return self._index[node]
+
+    @property
+    def nodes(self) -> CSRGraph:
+        return self
+
+    def __call__(self) -> CSRGraph:
+        return self
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.arrays["node_ids"].tolist())
+
+    def __len__(self) -> int:
+        return len(self.arrays["node_ids"])
+
+    def __contains__(self, node) -> bool:
+        try:
+            self._position(node)
+        except KeyError:
+            return False
+        return True
+
+    @property
+    def edges(self) -> _CSREdgeView:
+        return _CSREdgeView(self)
+
+    @property
+    def degree(self) -> _CSRDegreeView:
+        return _CSRDegreeView(self)
+
+    def neighbors(self, node) -> Iterator[int]:
+        try:
+            i = self._position(node)
+        except KeyError:
+            raise ValueError(f"The node {node} is not in the graph.") from None
+        indptr, indices = self.arrays["indptr"], self.arrays["indices"]
+        nbrs = indices[indptr[i] : indptr[i + 1]]
+        if not self._identity:
+            nbrs = self.arrays["node_ids"][nbrs]
+        return iter(nbrs.tolist())
+
+    def has_edge(self, u, v) -> bool:
+        try:
+            i, j = self._position(u), self._position(v)
+        except KeyError:
+            return False
+        indptr, indices = self.arrays["indptr"], self.arrays["indices"]
+        return bool(np.any(indices[indptr[i] : indptr[i + 1]] == j))
+
+    def number_of_nodes(self) -> int:
+        return len(self)
+
+    def number_of_edges(self) -> int:
+        return len(self.arrays["edge_u"])
+
+    # --- 変換 -----------------------------------------------------------------
+    def to_graph(self) -> Graph:
+        """変更できる Graph にコピーする（再結線など、グラフを書き換える処理に渡すとき）。"""
+        from network_ipd_ga.graph import Graph
+
+        graph = Graph()
+        graph._adj = {node: dict.fromkeys(self.neighbors(node)) for node in self}
+        return graph
+
+    def to_networkx(self) -> nx.Graph:
+        return self.to_graph().to_networkx()
+
+    def __repr__(self) -> str:
+        return f"CSRGraph(nodes={self.number_of_nodes()}, edges={self.number_of_edges()})"
+
+
+class _CSREdgeView:
+    """CSRGraph.edges（Graph と同じく、位置の小さい端点から (u, v) の順）。"""
+
+    def __init__(self, graph: CSRGraph) -> None:
+        self._graph = graph
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        ids = self._graph.arrays["node_ids"]
+        edge_u, edge_v = self._graph.edge_index_arrays()
+        if self._graph._identity:
+            return zip(edge_u.tolist(), edge_v.tolist())
+        return zip(ids[edge_u].tolist(), ids[edge_v].tolist())
+
+    def __len__(self) -> int:
+        return self._graph.number_of_edges()
+
+    def __call__(self) -> _CSREdgeView:
+        return self
+
+
+class _CSRDegreeView:
+    """CSRGraph.degree（(node, 次数) の反復, degree(node), degree[node]）。"""
+
+    def __init__(self, graph: CSRGraph) -> None:
+        self._graph = graph
+
+    def __getitem__(self, node) -> int:
+        return int(self._graph.arrays["degrees"][self._graph._position(node)])
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(iter(self._graph), self._graph.arrays["degrees"].tolist())
+
+    def __len__(self) -> int:
+        return len(self._graph)
+
+    def __call__(self, node=None):
+        return self if node is None else self[node]
+
+
+# ---------------------------------------------------------------------
+# 共有（ファイルの作成・接続・参照カウント）
+# ---------------------------------------------------------------------
+class _Lock:
+    """置き場所ごとの排他ロック（接続と最後の解放が重ならないように）。"""
+
+    def __init__(self, root: Path) -> None:
+        root.mkdir(parents=True, exist_ok=True)
+        self._path = root / _LOCK
+        self._file = None
+
+    def __enter__(self) -> _Lock:
+        self._file = self._path.open("a")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _live_refs(path: Path) -> list:
+    """path の参照のうち、プロセスが生きているもの（死んだプロセスの参照は削除する）。"""
+    live = []
+    for ref in (path / _REFS).iterdir():
+        pid = int(ref.name.split(".")[0])
+        if _alive(pid):
+            live.append(ref)
+        else:
+            ref.unlink(missing_ok=True)
+    return live
+
+
+class SharedGraph:
+    """
+    共有グラフへの 1 つの参照。publish() で作成（または既存のものに接続）し、attach() で接続する。
+    graph は CSRGraph（配列は読み取り専用のメモリマップ）。release() か with ブロックの終わりで参照を外す。
+    """
+
+    def __init__(self, path: Path, ref: Path) -> None:
+        self.path = path
+        self._ref = ref
+        meta = json.loads((path / _META).read_text())
+        self.meta: dict = meta
+        self.graph = CSRGraph({name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS})
+
+    @classmethod
+    def publish(cls, graph: Graph | nx.Graph | CSRGraph, key: str, root: Path | str | None = None) -> SharedGraph:
+        """graph を root/key に書き出して参照を返す（同じ key が既にあればそれに接続する）。"""
+        root = Path(root) if root is not None else default_root()
+        path = root / key
+        with _Lock(root):
+            if not (path / _META).exists():
+                arrays = graph_arrays(graph)
+                # 一時ディレクトリに書いてから rename する（書きかけのグラフに接続させない）
+                tmp = root / f".{key}.{uuid.uuid4().hex}.tmp"
+                (tmp / _REFS).mkdir(parents=True)
+                for name in ARRAYS:
+                    np.save(tmp / f"{name}.npy", np.ascontiguousarray(arrays[name], dtype=np.int64))
+                meta = {"key": key, "num_nodes": len(arrays["node_ids"]), "num_edges": len(arrays["edge_u"])}
+                (tmp / _META).write_text(json.dumps(meta))
+                shutil.rmtree(path, ignore_errors=True)
+                os.replace(tmp, path)
+                size = sum(arrays[name].nbytes for name in ARRAYS)
+                logger.info(f"Published shared graph {key} ({size / 1e6:.1f} MB) to {path}")
+            return cls._add_ref(path)
+
+    @classmethod
+    def attach(cls, path: Path | str) -> SharedGraph:
+        """publish() で作った共有グラフに接続する。"""
+        path = Path(path)
+        with _Lock(path.parent):
+            if not (path / _META).exists():
+                raise FileNotFoundError(f"No shared graph at {path} (already released?).")
+            return cls._add_ref(path)
+
+    @classmethod
+    def _add_ref(cls, path: Path) -> SharedGraph:
+        ref = path / _REFS / f"{os.getpid()}.{uuid.uuid4().hex}"
+        ref.touch()
+        return cls(path, ref)
+
+    def release(self) -> None:
+        """参照を外す。最後の参照なら共有グラフを削除する（2 回目以降は何もしない）。"""
+        if self._ref is None:
+            return
+        with _Lock(self.path.parent):
+            self._ref.unlink(missing_ok=True)
+            self._ref = None
+            if self.path.exists() and not _live_refs(self.path):
+                shutil.rmtree(self.path, ignore_errors=True)
+                logger.info(f"Removed shared graph {self.path.name}")
+
+    @property
+    def refcount(self) -> int:
+        """現在の参照の数（生きているプロセスのもの）。"""
+        with _Lock(self.path.parent):
+            return len(_live_refs(self.path)) if self.path.exists() else 0
+
+    def __enter__(self) -> SharedGraph:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"SharedGraph({self.path}, {self.graph!r})"
+
+
+# ワーカープロセスで接続済みの共有グラフ（同じグラフの実行ごとに接続し直さない）
+_attached: Dict[str, SharedGraph] = {}
+
+
+def attached_graph(path: Path | str) -> CSRGraph:
+    """
+    このプロセスで path の共有グラフに接続して CSRGraph を返す（2 回目からは同じもの）。
+    参照はプロセスの終了時に外す（プロセスプールのワーカーでも multiprocessing の終了処理で外れる。
+    異常終了した場合も pid で死んだ参照と判定される）。
+    """
+    key = str(path)
+    shared = _attached.get(key)
+    if shared is None:
+        from multiprocessing.util import Finalize
+
+        shared = _attached[key] = SharedGraph.attach(path)
+        Finalize(shared, shared.release, exitpriority=0)
+    return shared.graph
@@ -1,34 +1,66 @@
 # simulation.py
 from __future__ import annotations
-from typing import Literal, Tuple, List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Generator, Literal, Tuple, List
 import random
+import time
 import logging
 logger = logging.getLogger(__name__)
 
-import pandas as pd
-import networkx as nx
+import numpy as np
 
-from network_ipd_ga.network import make_cycle_graph, make_small_world_graph, make_scale_free_graph
+from network_ipd_ga.network import (
+    make_cycle_graph,
+    make_small_world_graph,
+    make_scale_free_graph,
+    edge_index_arrays,
+    csr_adjacency,
+)
 from network_ipd_ga.agent import Agent
-from network_ipd_ga.strategy import random_strategy, strategy_to_int, int_to_strategy
-from network_ipd_ga.game import play_ipd
-from network_ipd_ga.ga import reproduce_population
-from network_ipd_ga.metrics import strategy_diversity_entropy, cooperation_rate_from_strategies
-from collections import Counter
+from network_ipd_ga.strategy import int_to_strategy, random_strategy, strategy_to_int
+from network_ipd_ga.game import pair_outcome_table, play_ipd
+from network_ipd_ga.ga import (
+    reproduce_codes_counter,
+    reproduce_population,
+    reproduce_population_counter,
+)
+from network_ipd_ga.reorder import NodeOrder, bandwidth, node_ordering
+from network_ipd_ga.rng import CounterStreams, RngMode, initial_strategy_codes
+from network_ipd_ga.selection import Selection, SelectionOperator
+from network_ipd_ga.snapshot import GenerationSnapshot, summary_metrics
+from network_ipd_ga.asynchronous import RewireTarget, Schedule, iter_async_simulation
+from network_ipd_ga.well_mixed import iter_well_mixed_simulation
+from network_ipd_ga.lattice import LatticeNeighborhood, iter_lattice_simulation
+from network_ipd_ga.graph import Graph, as_networkx
+from network_ipd_ga.sinks import DataFrameSink, run_sinks
 
+if TYPE_CHECKING:
+    import networkx as nx
+    import pandas as pd
+    from network_ipd_ga.shared_graph import CSRGraph
 
-Topology = Literal["cycle", "small_world", "scale_free"]
+
+# well_mixed はグラフを作らない完全混合の集団（well_mixed.py）,
+# lattice はエッジリストを作らない周期境界の 2 次元格子（lattice.py）
+Topology = Literal["cycle", "small_world", "scale_free", "well_mixed", "lattice"]
 ModelType = Literal["ga", "meta_ga"]
+UpdateMode = Literal["sync", "async"]
+# 計算方法（結果は同じ, BACKENDS）: python（従来の実装）| numpy（対戦を配列の表引きで）|
+# jit（Numba でコンパイルしたカーネル, kernels.py）| auto（問題の大きさから選ぶ, autotune.py）
+Engine = Literal["python", "numpy", "jit", "auto"]
 
 
-def _build_graph(
+def build_graph(
     topology: Topology,
     num_agents: int,
     seed: int,
     small_world_k: int,
     small_world_p: float,
     scale_free_m: int,
-) -> nx.Graph:
+) -> Graph | None:
+    """topology のネットワークを生成する（well_mixed・lattice はグラフを作らないので None）。"""
+    if topology in ("well_mixed", "lattice"):
+        return None
     if topology == "cycle":
         return make_cycle_graph(num_agents)
     elif topology == "small_world":
@@ -38,7 +70,7 @@ def _build_graph(
     else:
         raise ValueError(f"Unknown topology: {topology}")
 
-def run_simulation(
+def iter_simulation(
     topology: Topology = "cycle",
     num_agents: int = 100,
     generations: int = 100,
@@ -49,108 +81,518 @@ def run_simulation(
     scale_free_m: int = 2,
     seed: int = 0,
     meta_influence: float = 0.3,
-) -> Tuple[pd.DataFrame, nx.Graph, List[Agent], pd.DataFrame]:
+    graph: Graph | nx.Graph | CSRGraph | None = None,
+    spatial_metrics: bool = True,
+    update_mode: UpdateMode = "sync",
+    async_schedule: Schedule = "random_sequential",
+    report_interval: int | None = None,
+    rewire_rate: float = 0.0,
+    rewire_target: RewireTarget = "random",
+    rng_mode: RngMode = "sequential",
+    selection: SelectionOperator = "tournament",
+    tournament_k: int = 3,
+    fermi_temperature: float = 1.0,
+    node_order: NodeOrder = "original",
+    lattice_width: int | None = None,
+    lattice_neighborhood: LatticeNeighborhood = "von_neumann",
+    engine: Engine = "python",
+    counter_backend: Literal["vectorized", "serial"] = "vectorized",
+) -> Generator[GenerationSnapshot, None, List[Agent]]:
     """
-    1つのネットワーク上で、指定したモデルタイプ（標準GA or メタ環境GA）
-    による戦略進化をシミュレーションする。
+    run_simulation と同じシミュレーションを 1 世代ずつ進め、
+    各世代の GenerationSnapshot を yield するジェネレータ。
+    履歴をメモリに溜めないため、世代数によらずメモリ使用量は一定。
 
-    戻り値:
-        df: 世代ごとの協力率・多様性などの時系列 DataFrame
-        graph: 使用したネットワークグラフ
-        agents: 最終世代のエージェントリスト
+    graph を渡した場合はそれを使い、None なら topology などから生成する。
+    プロセス間の共有グラフ（shared_graph.CSRGraph）も渡せる（エッジ配列・CSR は共有の配列をそのまま使う）。
+    topology="well_mixed" のときはグラフを作らず、完全混合の集団を
+    戦略ヒストグラムから O(N) で計算する（well_mixed.py, 乱数は常にカウンタベース）。
+    topology="lattice" のときは lattice_width × (num_agents / lattice_width) の周期境界の格子
+    （lattice_width=None なら正方格子）を、近傍 lattice_neighborhood（von_neumann / moore）の
+    シフトで計算する（lattice.py, 乱数は常にカウンタベース）。
+    spatial_metrics=True のとき、エッジ配列上の空間構造メトリクス
+    （同戦略エッジ割合・assortativity・同戦略クラスタ数/サイズ）も列に加える。
+    update_mode="async" のときは非同期更新（asynchronous.iter_async_simulation）で進め、
+    report_interval 回の更新ごとに 1 スナップショットを yield する。
+    rewire_rate > 0 でネットワークも共進化させる（非同期更新のみ対応）。
+    rng_mode="counter" のときは初期戦略と世代交代の乱数を (seed, 世代, ノード, 用途) ごとの
+    カウンタベース乱数（rng.CounterStreams）から取り、ベクトル化した世代交代で進める
+    （同期更新のみ対応。結果は計算方法・分割によらず一致するが、sequential とは異なる）。
+    selection は親選択の演算子（tournament / roulette / rank / fermi, selection.py）で、
+    tournament_k はトーナメントサイズ, fermi_temperature は Fermi 則の K。
+    node_order はベクトル化した世代交代の内部でのノードの並べ替え（rcm / bfs / degree, reorder.py）。
+    隣接ノードの gather のキャッシュ局所性を上げるためのもので、結果・出力の順序は変わらない
+    （rng_mode="counter" のベクトル化版のみ対応）。
+    engine="jit" は同期更新のグラフ上の対戦と（逐次乱数・Fermi 則以外の）世代交代を
+    JIT コンパイルしたカーネル（kernels.py）で計算する。結果は engine="python" とビット単位で一致し、
+    Numba がなければ警告を出して従来の実装で実行する（非同期更新・well_mixed・lattice では使わない）。
+    engine="numpy" は対戦だけを 8×8 の対戦表の表引きと bincount で計算する（世代交代は従来の実装）。
+    engine="auto" はノード数・エッジ数・次数の偏り・世代数から、マシンごとにキャッシュした
+    較正ベンチマーク（autotune.py）で最も速いと見積もった計算方法を選び、選んだ理由をログに出す。
+    counter_backend="serial" は counter モードの世代交代を 1 ノードずつの参照実装で行う
+    （ベクトル化版との等価性の検証用。結果は同じ）。
+    ジェネレータの戻り値（StopIteration.value）は最終世代のエージェントリスト。
     """
     rng = random.Random(seed)
+    selector = Selection(selection, k=tournament_k, temperature=fermi_temperature)
+    if engine != "auto" and engine not in BACKENDS:
+        raise ValueError(f"Unknown engine: {engine} (choose from auto, {', '.join(BACKENDS)})")
 
-    graph = _build_graph(
-        topology=topology,
-        num_agents=num_agents,
-        seed=seed,
-        small_world_k=small_world_k,
-        small_world_p=small_world_p,
-        scale_free_m=scale_free_m,
-    )
+    if topology == "well_mixed":
+        if update_mode != "sync" or rewire_rate > 0 or node_order != "original":
+            raise ValueError("topology='well_mixed' supports only update_mode='sync' without rewiring.")
+        return (
+            yield from iter_well_mixed_simulation(
+                num_agents=num_agents,
+                generations=generations,
+                T=T,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                seed=seed,
+                selection=selector,
+            )
+        )
+    if topology == "lattice":
+        if update_mode != "sync" or rewire_rate > 0 or node_order != "original":
+            raise ValueError("topology='lattice' supports only update_mode='sync' without rewiring.")
+        return (
+            yield from iter_lattice_simulation(
+                num_agents=num_agents,
+                generations=generations,
+                T=T,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                seed=seed,
+                width=lattice_width,
+                neighborhood=lattice_neighborhood,
+                spatial_metrics=spatial_metrics,
+                selection=selector,
+            )
+        )
+
+    if graph is None:
+        graph = build_graph(
+            topology=topology,
+            num_agents=num_agents,
+            seed=seed,
+            small_world_k=small_world_k,
+            small_world_p=small_world_p,
+            scale_free_m=scale_free_m,
+        )
+
+    if rewire_rate > 0:
+        from network_ipd_ga.shared_graph import CSRGraph
+
+        if isinstance(graph, CSRGraph):
+            graph = graph.to_graph()  # 共有グラフは読み取り専用なので、再結線するときはコピーを使う
+
+    if rng_mode not in ("sequential", "counter"):
+        raise ValueError(f"Unknown rng mode: {rng_mode}")
+    if rng_mode == "counter" and update_mode != "sync":
+        raise ValueError("rng_mode='counter' requires update_mode='sync'.")
+    if node_order != "original" and (rng_mode != "counter" or counter_backend != "vectorized"):
+        raise ValueError("node_order requires rng_mode='counter' with the vectorized backend.")
 
     # エージェント初期化
-    agents: List[Agent] = [
-        Agent(id=node, strategy=random_strategy(rng)) for node in graph.nodes
-    ]
+    if rng_mode == "counter":
+        streams = CounterStreams(seed)
+        init_codes = initial_strategy_codes(streams, graph.number_of_nodes())
+        agents: List[Agent] = [
+            Agent(id=node, strategy=int_to_strategy(int(c)))
+            for node, c in zip(graph.nodes, init_codes)
+        ]
+    else:
+        agents = [Agent(id=node, strategy=random_strategy(rng)) for node in graph.nodes]
+    if update_mode == "async":
+        return (
+            yield from iter_async_simulation(
+                graph,
+                agents,
+                rng,
+                generations=generations,
+                T=T,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                schedule=async_schedule,
+                report_interval=report_interval,
+                spatial_metrics=spatial_metrics,
+                rewire_rate=rewire_rate,
+                rewire_target=rewire_target,
+                selection=selector,
+            )
+        )
+    elif update_mode != "sync":
+        raise ValueError(f"Unknown update mode: {update_mode}")
+    if rewire_rate > 0:
+        raise ValueError("Network rewiring (rewire_rate > 0) requires update_mode='async'.")
+
+    node_ids = np.fromiter((a.id for a in agents), dtype=np.int64, count=len(agents))
+
+    # 空間メトリクス用のエッジ配列（グラフは固定なので 1 回だけ作る）
+    edge_u, edge_v = edge_index_arrays(graph)
+
+    if engine == "auto":
+        from network_ipd_ga.autotune import choose_engine
 
-    history_records = []
-    node_history: List[dict] = []
+        engine = choose_engine(graph, generations, T, rng_mode, selector)
 
+    # 配列版の計算方法（numpy / jit）: 戦略は codes（graph.nodes の並びの戦略コード）で持ち、
+    # エージェントには世代交代を従来の実装で行うときと最後に書き戻す
+    kernels = BACKENDS[engine].load()
+    codes = None
+    jit_reproduce = False
+    if kernels is not None:
+        codes = _codes_of(agents)
+        jit_reproduce = (
+            rng_mode == "sequential"
+            and kernels.reproduce_codes_sequential is not None
+            and kernels.supports(selector)
+        )
+        if engine == "jit" and rng_mode == "sequential" and not jit_reproduce:
+            logger.info(f"Selection {selector.operator!r} is not compiled; reproduction runs in Python.")
+
+    order = None
+    if rng_mode == "counter" or jit_reproduce:
+        indptr, indices = csr_adjacency(graph)
+    if rng_mode == "counter":
+        if node_order != "original":
+            # 世代交代の内部ではノードを並べ替えた CSR を使い、子の戦略は元の順序に戻す
+            order = node_ordering(indptr, indices, node_order)
+            before = bandwidth(indptr, indices)
+            indptr, indices = order.permute_csr(indptr, indices)
+            logger.info(f"Node order {node_order}: bandwidth {before} -> {bandwidth(indptr, indices)}")
+
+    reproduce_time = 0.0
+    payoffs = None
     for gen in range(generations):
-        # 利得リセット
-        for a in agents:
-            a.reset_payoff()
-
-        # 実際の対戦から協力率を測るためのカウンタ
-        coop_actions_total = 0
-        total_actions = 0
-
-        # 各エッジで繰り返しゲームを実行
-        id_to_agent = {a.id: a for a in agents}
-        for i, j in graph.edges:
-            ai = id_to_agent[i]
-            aj = id_to_agent[j]
-            coop, acts = play_ipd(ai, aj, T, rng)
-            coop_actions_total += coop
-            total_actions += acts
+        t_start = time.perf_counter()
+        if codes is not None:
+            # 全エッジの対戦と利得の加算を配列で（numpy の表引き・jit のカーネル）
+            payoffs = np.zeros(len(codes), dtype=np.float64)
+            coop_actions_total = int(kernels.play_edges(codes, edge_u, edge_v, T, payoffs))
+            total_actions = 2 * T * len(edge_u)
+        else:
+            # 利得リセット
+            for a in agents:
+                a.reset_payoff()
+
+            # 実際の対戦から協力率を測るためのカウンタ
+            coop_actions_total = 0
+            total_actions = 0
+
+            # 各エッジで繰り返しゲームを実行
+            id_to_agent = {a.id: a for a in agents}
+            for i, j in graph.edges:
+                ai = id_to_agent[i]
+                aj = id_to_agent[j]
+                coop, acts = play_ipd(ai, aj, T, rng)
+                coop_actions_total += coop
+                total_actions += acts
 
         realized_coop_rate = (
             coop_actions_total / total_actions if total_actions > 0 else 0.0
         )
+        t_played = time.perf_counter()
+
+        # 戦略・利得の配列（スナップショット兼メトリクス計算用）
+        if codes is not None:
+            strategies = codes
+        else:
+            strategies = _codes_of(agents)
+            payoffs = np.fromiter((a.payoff for a in agents), dtype=np.float64, count=len(agents))
 
-        # 戦略分布から見た協調ポテンシャル
-        strategy_coop_rate = cooperation_rate_from_strategies(agents)
-
-        # 戦略多様性（エントロピー）
-        diversity = strategy_diversity_entropy(agents)
-
-        # --- 各戦略（000〜111）の個体数をカウント ---
-        counter = Counter(strategy_to_int(a.strategy) for a in agents)
-        strategy_counts = {}
-        for i in range(8):
-            bits = "".join(str(b) for b in int_to_strategy(i))
-            strategy_counts[f"{bits}"] = counter.get(i, 0)
-
-        history_records.append(
-            {
-                "generation": gen,
-                "realized_coop_rate": realized_coop_rate,
-                "strategy_coop_rate": strategy_coop_rate,
-                "diversity": diversity,
-                "avg_payoff": sum(a.payoff for a in agents) / len(agents),
-                **strategy_counts,
-            }
+        metrics = summary_metrics(
+            gen,
+            realized_coop_rate,
+            strategies,
+            payoffs,
+            edges=(edge_u, edge_v) if spatial_metrics else None,
         )
 
-        # --- 各ノードの戦略と利得を履歴に保存 ---
-        for a in agents:
-            node_history.append(
-                {
-                    "generation": gen,
-                    "node_id": a.id,
-                    "strategy_int": strategy_to_int(a.strategy),
-                    "strategy_bits": "".join(str(b) for b in a.strategy),
-                    "payoff": a.payoff,
-                }
-            )
+        # --- 各ノードの戦略と利得をスナップショットとして渡す ---
+        yield GenerationSnapshot(
+            generation=gen,
+            node_ids=node_ids,
+            strategies=strategies,
+            payoffs=payoffs,
+            metrics=metrics,
+            timings={
+                "play": t_played - t_start,
+                "metrics": time.perf_counter() - t_played,
+                "reproduce": reproduce_time,
+            },
+        )
 
         # 次世代の戦略を生成（GA + メタ環境）
-        reproduce_population(
-            agents=agents,
-            graph=graph,
-            rng=rng,
+        t_reproduce = time.perf_counter()
+        if jit_reproduce:
+            codes = kernels.reproduce_codes_sequential(
+                strategies, payoffs, indptr, indices, rng,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                selection=selector,
+            )
+        elif codes is not None and rng_mode == "counter" and counter_backend == "vectorized":
+            codes = _reproduce_counter(
+                strategies, payoffs, indptr, indices, streams, gen, order,
+                mutation_rate, meta_influence, selector,
+            )
+        elif codes is not None:
+            # カーネルのない世代交代（Fermi 則・counter の参照実装）はエージェントに書き戻して従来の実装で
+            _sync_agents(agents, codes, payoffs)
+            if rng_mode == "counter":
+                reproduce_population_counter(
+                    agents, graph, streams, gen,
+                    mutation_rate=mutation_rate,
+                    meta_influence=meta_influence,
+                    selection=selector,
+                )
+            else:
+                reproduce_population(
+                    agents=agents,
+                    graph=graph,
+                    rng=rng,
+                    mutation_rate=mutation_rate,
+                    meta_influence=meta_influence,
+                    selection=selector,
+                )
+            codes = _codes_of(agents)
+        elif rng_mode == "counter" and counter_backend == "serial":
+            reproduce_population_counter(
+                agents, graph, streams, gen,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                selection=selector,
+            )
+        elif rng_mode == "counter":
+            new_codes = _reproduce_counter(
+                strategies, payoffs, indptr, indices, streams, gen, order,
+                mutation_rate, meta_influence, selector,
+            )
+            for a, c in zip(agents, new_codes.tolist()):
+                a.strategy = int_to_strategy(c)
+        else:
+            reproduce_population(
+                agents=agents,
+                graph=graph,
+                rng=rng,
+                mutation_rate=mutation_rate,
+                meta_influence=meta_influence,
+                selection=selector,
+            )
+        reproduce_time = time.perf_counter() - t_reproduce
+        logger.info(
+            f"Gen {gen}: coop(real={realized_coop_rate:.3f}, "
+            f"strategy={metrics['strategy_coop_rate']:.3f}), "
+            f"div={metrics['diversity']:.3f}, avg_payoff={metrics['avg_payoff']:.3f}"
+        )
+
+    if codes is not None and payoffs is not None:
+        _sync_agents(agents, codes, payoffs)
+    return agents
+
+
+# ---------------------------------------------------------------------
+# 計算方法の登録（engine）
+# ---------------------------------------------------------------------
+@dataclass(frozen=True)
+class Backend:
+    """
+    同期更新のグラフ上の世代の計算方法。どれも結果はビット単位で同じ。
+    load() は配列版の演算（play_edges / supports / reproduce_codes_sequential を持つもの）を返し、
+    None ならエージェントのリスト上の従来のループで実行する。
+    available() は engine="auto" の候補にできるか（依存ライブラリがあるか）。
+    array_play は対戦を 8×8 の対戦表で計算するか（対戦のコストがラウンド数 T によらない）。
+    """
+
+    name: str
+    description: str
+    load: Callable[[], object | None]
+    available: Callable[[], bool] = lambda: True
+    array_play: bool = True
+
+
+BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> None:
+    """計算方法を登録する（同じ名前は上書きしない）。"""
+    if backend.name in BACKENDS or backend.name == "auto":
+        raise ValueError(f"Engine {backend.name!r} is already registered.")
+    BACKENDS[backend.name] = backend
+
+
+class ArrayPlay:
+    """
+    engine="numpy" の演算。全エッジの対戦を 8×8 の対戦表（game.pair_outcome_table）の表引きと
+    bincount で計算する。速くなるのは対戦だけで、世代交代は rng_mode="sequential" では従来のエージェントの
+    ループ（1 本の乱数列の消費量が各ノードの抽選の結果に依存するので、結果を変えずにはベクトル化できない）,
+    "counter" では他の計算方法と同じベクトル化した実装（reproduce_codes_counter）。
+    """
+
+    reproduce_codes_sequential = None
+
+    def __init__(self) -> None:
+        self._tables: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @staticmethod
+    def supports(selection: Selection) -> bool:
+        return False
+
+    def play_edges(self, codes: np.ndarray, edge_u: np.ndarray, edge_v: np.ndarray, T: int, payoffs: np.ndarray) -> int:
+        """kernels.play_edges と同じ（payoffs に利得を加え、協調の総数を返す）。利得は整数なので和の順序によらず同じ。"""
+        if T not in self._tables:
+            self._tables[T] = pair_outcome_table(T)
+        payoff_table, coop_table = self._tables[T]
+        pair = codes[edge_u].astype(np.int64) * 8 + codes[edge_v]
+        pair_rev = codes[edge_v].astype(np.int64) * 8 + codes[edge_u]
+        n = len(payoffs)
+        payoffs += np.bincount(edge_u, payoff_table.ravel()[pair], n)
+        payoffs += np.bincount(edge_v, payoff_table.ravel()[pair_rev], n)
+        return int(coop_table.ravel()[pair].sum())
+
+
+def _load_kernels():
+    """engine="jit" のカーネル（kernels.py）。Numba がなければ警告して None（従来の実装で実行）。"""
+    from network_ipd_ga import kernels
+
+    if not kernels.AVAILABLE:
+        logger.warning("Numba is not available; engine='jit' falls back to the Python implementation.")
+        return None
+    return kernels
+
+
+def _kernels_available() -> bool:
+    from network_ipd_ga import kernels
+
+    return kernels.AVAILABLE
+
+
+register_backend(Backend(
+    "python", "agent objects and play_ipd per edge (reference)", load=lambda: None, array_play=False,
+))
+register_backend(Backend(
+    "numpy", "pair-table lookups and bincount over edge arrays; reproduction in Python under sequential rng", load=ArrayPlay,
+))
+register_backend(Backend(
+    "jit", "Numba kernels for play and reproduction (kernels.py)", load=_load_kernels, available=_kernels_available,
+))
+
+
+def _codes_of(agents: List[Agent]) -> np.ndarray:
+    return np.fromiter((strategy_to_int(a.strategy) for a in agents), dtype=np.int8, count=len(agents))
+
+
+def _sync_agents(agents: List[Agent], codes: np.ndarray, payoffs: np.ndarray) -> None:
+    """戦略コード・利得の配列をエージェントに書き戻す。"""
+    for a, c, p in zip(agents, codes.tolist(), payoffs.tolist()):
+        a.strategy = int_to_strategy(c)
+        a.payoff = p
+
+
+def _reproduce_counter(
+    strategies: np.ndarray,
+    payoffs: np.ndarray,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    streams: CounterStreams,
+    gen: int,
+    order,
+    mutation_rate: float,
+    meta_influence: float,
+    selector: Selection,
+) -> np.ndarray:
+    """カウンタベース乱数のベクトル化世代交代（order があれば並べ替えた CSR 上で計算して元の順に戻す）。"""
+    if order is None:
+        return reproduce_codes_counter(
+            strategies, payoffs, indptr, indices, streams, gen,
             mutation_rate=mutation_rate,
             meta_influence=meta_influence,
+            selection=selector,
         )
-        logger.info(
-            f"Gen {gen}: coop(real={realized_coop_rate:.3f}, "
-            f"strategy={strategy_coop_rate:.3f}), "
-            f"div={diversity:.3f}, avg_payoff={history_records[-1]['avg_payoff']:.3f}"
+    return order.to_original(
+        reproduce_codes_counter(
+            order.to_new(strategies), order.to_new(payoffs), indptr, indices, streams, gen,
+            mutation_rate=mutation_rate,
+            meta_influence=meta_influence,
+            selection=selector,
+            rows=order.perm,
         )
+    )
+
 
-    df = pd.DataFrame(history_records)
-    node_df = pd.DataFrame(node_history)
+def run_simulation(
+    topology: Topology = "cycle",
+    num_agents: int = 100,
+    generations: int = 100,
+    T: int = 50,
+    mutation_rate: float = 0.01,
+    small_world_k: int = 4,
+    small_world_p: float = 0.1,
+    scale_free_m: int = 2,
+    seed: int = 0,
+    meta_influence: float = 0.3,
+    spatial_metrics: bool = True,
+    update_mode: UpdateMode = "sync",
+    async_schedule: Schedule = "random_sequential",
+    report_interval: int | None = None,
+    rewire_rate: float = 0.0,
+    rewire_target: RewireTarget = "random",
+    rng_mode: RngMode = "sequential",
+    selection: SelectionOperator = "tournament",
+    tournament_k: int = 3,
+    fermi_temperature: float = 1.0,
+    node_order: NodeOrder = "original",
+    lattice_width: int | None = None,
+    lattice_neighborhood: LatticeNeighborhood = "von_neumann",
+    engine: Engine = "python",
+) -> Tuple[pd.DataFrame, nx.Graph | None, List[Agent], pd.DataFrame]:
+    """
+    1つのネットワーク上で、指定したモデルタイプ（標準GA or メタ環境GA）
+    による戦略進化をシミュレーションする。
+    （iter_simulation の全世代を DataFrame に集約するラッパー）
+
+    戻り値:
+        df: 世代ごとの協力率・多様性などの時系列 DataFrame
+        graph: 使用したネットワークグラフ（networkx.Graph, 再結線がある場合は最終状態, well_mixed・lattice では None）
+        agents: 最終世代のエージェントリスト
+        node_df: 世代ごと・ノードごとの戦略と利得の DataFrame
+    """
+    graph = build_graph(
+        topology=topology,
+        num_agents=num_agents,
+        seed=seed,
+        small_world_k=small_world_k,
+        small_world_p=small_world_p,
+        scale_free_m=scale_free_m,
+    )
+
+    snapshots = iter_simulation(
+        topology=topology,
+        num_agents=num_agents,
+        generations=generations,
+        T=T,
+        mutation_rate=mutation_rate,
+        seed=seed,
+        meta_influence=meta_influence,
+        graph=graph,
+        spatial_metrics=spatial_metrics,
+        update_mode=update_mode,
+        async_schedule=async_schedule,
+        report_interval=report_interval,
+        rewire_rate=rewire_rate,
+        rewire_target=rewire_target,
+        rng_mode=rng_mode,
+        selection=selection,
+        tournament_k=tournament_k,
+        fermi_temperature=fermi_temperature,
+        node_order=node_order,
+        engine=engine,
+        lattice_width=lattice_width,
+        lattice_neighborhood=lattice_neighborhood,
+    )
+    frames = DataFrameSink()
+    agents = run_sinks(snapshots, [frames])
 
-    return df, graph, agents, node_df
+    # 計算は network_ipd_ga.graph.Graph で行い、戻り値は従来どおり networkx のグラフにする
+    return frames.summary_df(), None if graph is None else as_networkx(graph), agents, frames.node_df()
@@ -0,0 +1,386 @@
+# sinks.py
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Generator, Iterable, List, Protocol, TypeVar
+import csv
+import queue
+import threading
+
+import numpy as np
+
+from network_ipd_ga.history import DEFAULT_KEYFRAME_INTERVAL, DeltaEncoder, HistoryWriter
+
+if TYPE_CHECKING:
+    from network_ipd_ga.config_loader import SimulationConfig
+    from network_ipd_ga.simulation import GenerationSnapshot
+    from network_ipd_ga.store import ResultsStore
+    import networkx as nx
+    import pandas as pd
+
+R = TypeVar("R")
+
+NODE_COLUMNS = ["generation", "node_id", "strategy_int", "strategy_bits", "payoff"]
+REWIRE_COLUMNS = ["generation", "node_id", "removed", "added"]
+
+# 戦略コード 0〜7 -> ビット列 "000"〜"111"
+_BITS = np.array([format(i, "03b") for i in range(8)], dtype=object)
+
+
+class Sink(Protocol):
+    """iter_simulation のスナップショットを受け取る出力先。"""
+
+    def write(self, snap: GenerationSnapshot) -> None: ...
+
+    def close(self) -> None: ...
+
+
+def run_sinks(
+    snapshots: Generator[GenerationSnapshot, None, R],
+    sinks: Iterable[Sink],
+) -> R:
+    """
+    スナップショットを全 sink に順に渡し、最後に close する。
+    戻り値: ジェネレータの戻り値（iter_simulation なら最終世代のエージェント）
+    """
+    sinks = list(sinks)
+    try:
+        while True:
+            try:
+                snap = next(snapshots)
+            except StopIteration as stop:
+                return stop.value
+            for sink in sinks:
+                sink.write(snap)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+
+def _node_columns(generations, node_ids, strategies, payoffs) -> dict:
+    return {
+        "generation": generations,
+        "node_id": node_ids,
+        "strategy_int": strategies.astype(np.int64),
+        "strategy_bits": _BITS[strategies],
+        "payoff": payoffs,
+    }
+
+
+def _rewire_columns(generation: int, events: np.ndarray) -> dict:
+    return {
+        "generation": np.full(len(events), generation, dtype=np.int64),
+        "node_id": events[:, 0],
+        "removed": events[:, 1],
+        "added": events[:, 2],
+    }
+
+
+def node_frame(snap: GenerationSnapshot) -> pd.DataFrame:
+    """1 世代分のスナップショットを node_df 形式の DataFrame にする。"""
+    import pandas as pd
+
+    return pd.DataFrame(_node_columns(snap.generation, snap.node_ids, snap.strategies, snap.payoffs))
+
+
+def rewire_frame(snap: GenerationSnapshot) -> pd.DataFrame:
+    """スナップショットの再結線イベントを DataFrame にする（イベントがなければ空）。"""
+    import pandas as pd
+
+    events = snap.topology_events
+    if events is None:
+        events = np.empty((0, 3), dtype=np.int64)
+    return pd.DataFrame(_rewire_columns(snap.generation, events))
+
+
+class DataFrameSink:
+    """
+    全世代をメモリに集め、run_simulation と同じ DataFrame を作る。
+    世代ごとには配列を保持するだけで、pandas は summary_df() などを呼んだときに読み込む。
+    """
+
+    def __init__(self, record_nodes: bool = True) -> None:
+        self.record_nodes = record_nodes
+        self.records: List[dict] = []
+        self.node_states: List[tuple] = []  # (generation, node_ids, strategies, payoffs)
+        self.rewire_events: List[tuple] = []  # (generation, events)
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        self.records.append(snap.metrics)
+        if self.record_nodes:
+            self.node_states.append(
+                (snap.generation, snap.node_ids, snap.strategies.copy(), snap.payoffs.copy())
+            )
+        if snap.topology_events is not None and len(snap.topology_events):
+            self.rewire_events.append((snap.generation, snap.topology_events.copy()))
+
+    def close(self) -> None:
+        pass
+
+    def summary_df(self) -> pd.DataFrame:
+        import pandas as pd
+
+        return pd.DataFrame(self.records)
+
+    def node_df(self) -> pd.DataFrame:
+        import pandas as pd
+
+        if not self.node_states:
+            return pd.DataFrame(columns=NODE_COLUMNS)
+        sizes = [len(ids) for _, ids, _, _ in self.node_states]
+        return pd.DataFrame(
+            _node_columns(
+                np.repeat(np.array([g for g, _, _, _ in self.node_states], dtype=np.int64), sizes),
+                np.concatenate([ids for _, ids, _, _ in self.node_states]),
+                np.concatenate([st for _, _, st, _ in self.node_states]),
+                np.concatenate([p for _, _, _, p in self.node_states]),
+            )
+        )
+
+    def rewire_df(self) -> pd.DataFrame:
+        """再結線イベント（generation 直前までに起きた node_id の removed -> added）。"""
+        import pandas as pd
+
+        if not self.rewire_events:
+            return pd.DataFrame(columns=REWIRE_COLUMNS)
+        return pd.concat(
+            [pd.DataFrame(_rewire_columns(g, events)) for g, events in self.rewire_events],
+            ignore_index=True,
+        )
+
+
+def _csv_lines(columns: Iterable[np.ndarray]) -> str:
+    """
+    列の配列を CSV の行にする（pandas の to_csv(header=False, index=False) と同じ書式:
+    整数・文字列はそのまま, 浮動小数点は repr, nan は空欄）。
+    """
+    cols = []
+    for col in columns:
+        if col.dtype.kind == "f":
+            cols.append(["" if x != x else repr(x) for x in col.tolist()])
+        else:
+            cols.append([str(x) for x in col.tolist()])
+    return "".join(",".join(row) + "\n" for row in zip(*cols))
+
+
+class SummaryCSVSink:
+    """世代サマリを 1 行ずつ CSV に追記する（run_single_experiment の summary CSV と同じ形式）。"""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = path.open("w", newline="")
+        self.writer: csv.DictWriter | None = None
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.f, fieldnames=list(snap.metrics), lineterminator="\n")
+            self.writer.writeheader()
+        self.writer.writerow(snap.metrics)
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class NodeCSVSink:
+    """ノード履歴を世代ごとに CSV に追記する（*_nodes.csv と同じ形式）。"""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = path.open("w", newline="")
+        self.f.write(",".join(NODE_COLUMNS) + "\n")
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        generation = np.full(len(snap.node_ids), snap.generation, dtype=np.int64)
+        cols = _node_columns(generation, snap.node_ids, snap.strategies, snap.payoffs)
+        self.f.write(_csv_lines(cols.values()))
+        # 書き込み途中でも make_video などから読めるよう世代ごとに flush
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class NodeHistorySink:
+    """ノード履歴を差分符号化した .nhist ファイルに書き込む（読み込みは history.NodeHistory）。"""
+
+    def __init__(self, path: Path, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> None:
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.writer: HistoryWriter | None = None
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        if self.writer is None:
+            self.writer = HistoryWriter(self.path, snap.node_ids, self.keyframe_interval)
+        self.writer.write(snap.generation, snap.strategies, snap.payoffs)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+class RewireCSVSink:
+    """再結線イベントを CSV に追記する（初期グラフ + イベントで任意世代のネットワークを復元できる）。"""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = path.open("w", newline="")
+        self.f.write(",".join(REWIRE_COLUMNS) + "\n")
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        if snap.topology_events is None or not len(snap.topology_events):
+            return
+        self.f.write(_csv_lines(_rewire_columns(snap.generation, snap.topology_events).values()))
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class StoreSink:
+    """結果ストア（ResultsStore）に世代ごとに書き込む。"""
+
+    def __init__(
+        self,
+        store: ResultsStore,
+        cfg: SimulationConfig,
+        seed: int,
+        graph: nx.Graph | None = None,
+        record_nodes: bool = True,
+        batch_size: int = 50,
+        close_store: bool = False,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ) -> None:
+        self.store = store
+        self.close_store = close_store
+        self.seed = seed
+        self.record_nodes = record_nodes
+        self.batch_size = batch_size
+        self.pending: List[dict] = []
+        # ノード履歴はキーフレーム + 差分で保存する
+        self.encoder = DeltaEncoder(keyframe_interval)
+        self.config_hash = store.begin_run(cfg, seed, graph)
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        self.pending.append(snap.metrics)
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+        if self.record_nodes:
+            self.store.append_node_record(
+                self.config_hash,
+                self.seed,
+                snap.generation,
+                self.encoder.encode(snap.strategies, snap.payoffs),
+            )
+        if snap.topology_events is not None and len(snap.topology_events):
+            self.store.append_topology_events(
+                self.config_hash, self.seed, snap.generation, snap.topology_events
+            )
+
+    def _flush(self) -> None:
+        self.store.append_summary(self.config_hash, self.seed, self.pending)
+        self.pending = []
+
+    def close(self) -> None:
+        self._flush()
+        if self.close_store:
+            self.store.close()
+
+
+class ThreadedSink:
+    """
+    別スレッドで内側の sink に書き込み、ファイル I/O と計算を重ねる。
+    キューが一杯のときは write がブロックする（スナップショットは捨てない）。
+
+    注意: sqlite3 の接続はスレッドをまたいで使えないため、
+    StoreSink を包む場合は factory でスレッド内に生成すること。
+    """
+
+    _STOP = object()
+
+    def __init__(self, sink: Sink | None = None, maxsize: int = 16, factory=None) -> None:
+        if (sink is None) == (factory is None):
+            raise ValueError("Specify exactly one of sink or factory.")
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.error: BaseException | None = None
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(sink, factory), daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        self._raise_if_failed()
+
+    def _run(self, sink: Sink | None, factory) -> None:
+        try:
+            if sink is None:
+                sink = factory()
+        except BaseException as e:  # 生成失敗は呼び出し側で再送出
+            self.error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        try:
+            while True:
+                snap = self.queue.get()
+                if snap is self._STOP:
+                    break
+                sink.write(snap)
+        except BaseException as e:
+            self.error = e
+            # 以降のスナップショットは読み捨てて、メインスレッドのブロックを防ぐ
+            while self.queue.get() is not self._STOP:
+                pass
+        finally:
+            sink.close()
+
+    def _raise_if_failed(self) -> None:
+        if self.error is not None:
+            raise RuntimeError("Background sink failed.") from self.error
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        self._raise_if_failed()
+        self.queue.put(snap)
+
+    def close(self) -> None:
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join()
+        self._raise_if_failed()
+
+
+class LivePlotSink:
+    """指定したメトリクスの推移を matplotlib でリアルタイムに描画する。"""
+
+    def __init__(
+        self,
+        metrics: Iterable[str] = ("realized_coop_rate", "strategy_coop_rate", "diversity"),
+        every: int = 1,
+    ) -> None:
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.metrics = list(metrics)
+        self.every = every
+        self.xs: List[int] = []
+        self.ys: dict[str, List[float]] = {m: [] for m in self.metrics}
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots(figsize=(8, 5))
+        self.lines = {m: self.ax.plot([], [], label=m)[0] for m in self.metrics}
+        self.ax.set_xlabel("generation")
+        self.ax.grid(True)
+        self.ax.legend()
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        self.xs.append(snap.generation)
+        for m in self.metrics:
+            self.ys[m].append(snap.metrics[m])
+        if snap.generation % self.every != 0:
+            return
+        for m, line in self.lines.items():
+            line.set_data(self.xs, self.ys[m])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.plt.pause(0.001)
+
+    def close(self) -> None:
+        self.plt.ioff()
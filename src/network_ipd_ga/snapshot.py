@@ -0,0 +1,63 @@
+# snapshot.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from network_ipd_ga.metrics import (
+    strategy_histogram,
+    histogram_metrics,
+    strategy_counts,
+    spatial_metrics,
+)
+
+
+@dataclass(frozen=True)
+class GenerationSnapshot:
+    """
+    1 世代分の軽量スナップショット（対戦後・再生産前の状態）。
+
+    generation: 世代番号（非同期更新では報告の通し番号）
+    node_ids  : ノード ID（全世代で同じ配列を共有する）
+    strategies: node_ids 順の戦略（0〜7 の整数, int8）
+    payoffs   : node_ids 順の利得
+    metrics   : サマリ DataFrame の 1 行分（generation を含む）
+    topology_events: 前回のスナップショット以降の再結線 (node, removed, added) の
+                     ノード ID 配列（shape (m, 3)）。ネットワークが固定のときは None
+    timings   : 処理段階ごとの所要時間 [秒]（テレメトリ用, サマリには含めない）。
+                同期更新: play / metrics（この世代）, reproduce（直前の世代交代）
+                非同期更新: updates（前回の報告以降の更新）/ metrics
+    """
+    generation: int
+    node_ids: np.ndarray
+    strategies: np.ndarray
+    payoffs: np.ndarray
+    metrics: dict
+    topology_events: np.ndarray | None = None
+    timings: dict | None = None
+
+
+def summary_metrics(
+    generation: int,
+    realized_coop_rate: float,
+    strategies: np.ndarray,
+    payoffs: np.ndarray,
+    edges: Tuple[np.ndarray, np.ndarray] | None = None,
+) -> dict:
+    """
+    サマリ DataFrame の 1 行分のメトリクスを計算する。
+    戦略ヒストグラム（8 ビン）から協調ポテンシャル・多様性・各戦略数を O(8) で求め、
+    edges=(u, v) を渡した場合は空間構造メトリクスも加える。
+    """
+    hist = strategy_histogram(strategies)
+    metrics = {
+        "generation": generation,
+        "realized_coop_rate": realized_coop_rate,
+        **histogram_metrics(hist),
+        "avg_payoff": float(payoffs.sum()) / len(payoffs),
+        **strategy_counts(hist),
+    }
+    if edges is not None:
+        metrics.update(spatial_metrics(strategies, *edges))
+    return metrics
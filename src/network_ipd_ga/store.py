@@ -0,0 +1,522 @@
+# store.py
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Mapping, Sequence
+import hashlib
+import json
+import sqlite3
+
+import numpy as np
+
+from network_ipd_ga.config_loader import SimulationConfig
+from network_ipd_ga.history import HistoryRecord
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import pandas as pd
+
+    from network_ipd_ga.graph import Graph
+
+# SQLite ベースの結果ストア。
+#
+# 1 つのデータベースファイルに、全 config・全 seed の結果を
+# (config_hash, seed, generation) をキーとして格納する。
+#
+# - runs         : 1 実行 (config_hash, seed) ごとのパラメータ・グラフ（エッジ配列）
+# - summary      : 世代ごとのメトリクス（run_simulation の df と同じ列）
+# - node_history : 世代ごとのノード戦略・利得（バイナリ配列）。keyframe=0 の行は
+#                  前世代からの差分（history.HistoryRecord の形式）, 1 または NULL は全ノード分
+# - topology_events : 再結線 (node, removed, added) のイベント（バイナリ配列）
+#
+# 複数プロセスからの同時書き込みは WAL モード + busy timeout で直列化する。
+# （WAL は共有メモリを使うため、NFS 上ではなくローカルディスクに置くこと）
+
+DEFAULT_STORE_NAME = "results.sqlite"
+
+# runs / summary の列は書き込み時に動的に追加する（config パラメータ・メトリクスの追加に追従）
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    config_hash TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    config_json TEXT NOT NULL,
+    num_nodes INTEGER,
+    node_ids BLOB,
+    edges BLOB,
+    PRIMARY KEY (config_hash, seed)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS summary (
+    config_hash TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    PRIMARY KEY (config_hash, seed, generation)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS node_history (
+    config_hash TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    strategies BLOB NOT NULL,
+    payoffs BLOB NOT NULL,
+    keyframe INTEGER,
+    PRIMARY KEY (config_hash, seed, generation)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS topology_events (
+    config_hash TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    events BLOB NOT NULL,
+    PRIMARY KEY (config_hash, seed, generation)
+) WITHOUT ROWID;
+"""
+
+
+def _q(name: str) -> str:
+    """SQL 識別子としてクォートする（"000" のような列名に対応）。"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(value) -> str:
+    if isinstance(value, (bool, int, np.integer)):
+        return "INTEGER"
+    if isinstance(value, (float, np.floating)):
+        return "REAL"
+    return "TEXT"
+
+
+def _to_sql_value(value):
+    """numpy スカラーを sqlite3 が扱える Python 型に変換する。"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ResultsStore:
+    """
+    (config_hash, seed, generation) で索引付けされた結果ストア。
+
+    書き込み:
+        store.write_run(cfg, seed, df, node_df, graph)
+    読み込み（列の絞り込みと条件はすべて SQL 側で処理される）:
+        store.read_summary(columns=[...], where={"topology": "cycle"})
+        store.final_metrics(["realized_coop_rate"])
+    """
+
+    def __init__(self, path: Path | str, timeout: float = 60.0) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+            # 差分符号化以前に作ったストア（keyframe 列なし = 全行キーフレーム）
+            self._ensure_columns("node_history", {"keyframe": "INTEGER"})
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> ResultsStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # スキーマ補助
+    # ------------------------------------------------------------------
+    def _columns(self, table: str) -> list[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({_q(table)})")]
+
+    def _ensure_columns(self, table: str, columns: Mapping[str, str]) -> None:
+        """存在しない列を ALTER TABLE で追加する（メトリクス・パラメータの追加に追従）。"""
+        existing = set(self._columns(table))
+        for name, sql_type in columns.items():
+            if name in existing:
+                continue
+            try:
+                self.conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(name)} {sql_type}")
+            except sqlite3.OperationalError as e:
+                # 別プロセスが同時に追加した場合
+                if "duplicate column" not in str(e):
+                    raise
+
+    def _check_columns(self, table_columns: Iterable[str], requested: Iterable[str]) -> None:
+        known = set(table_columns)
+        unknown = [c for c in requested if c not in known]
+        if unknown:
+            raise KeyError(f"Unknown columns: {unknown}")
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+    def begin_run(
+        self,
+        cfg: SimulationConfig,
+        seed: int,
+        graph: Graph | nx.Graph | None = None,
+    ) -> str:
+        """
+        実行 (config_hash, seed) を登録し、既存の同じキーの結果を削除する。
+        戻り値: config_hash
+        """
+        config_hash = cfg.config_hash()
+        params = cfg.model_params()
+        row = {
+            "config_hash": config_hash,
+            "seed": seed,
+            "config_json": json.dumps(cfg.as_dict(), sort_keys=True),
+            "output_base": cfg.output_base,
+            **params,
+        }
+        if graph is not None:
+            node_ids = np.fromiter(graph.nodes, dtype=np.int64, count=graph.number_of_nodes())
+            edges = np.array(list(graph.edges), dtype=np.int64).reshape(-1, 2)
+            row["num_nodes"] = len(node_ids)
+            row["node_ids"] = node_ids.tobytes()
+            row["edges"] = edges.tobytes()
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._ensure_columns(
+                "runs",
+                {k: _sql_type(v) for k, v in row.items() if k not in ("node_ids", "edges")},
+            )
+            for table in ("summary", "node_history", "topology_events"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE config_hash = ? AND seed = ?",
+                    (config_hash, seed),
+                )
+            cols = ", ".join(_q(k) for k in row)
+            marks = ", ".join("?" for _ in row)
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO runs ({cols}) VALUES ({marks})",
+                [_to_sql_value(v) for v in row.values()],
+            )
+        return config_hash
+
+    def append_summary(self, config_hash: str, seed: int, records: Sequence[Mapping]) -> None:
+        """世代ごとのメトリクス（run_simulation の df の行）を追加する。"""
+        if not records:
+            return
+        names = [k for k in records[0] if k != "generation"]
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._ensure_columns("summary", {k: _sql_type(records[0][k]) for k in names})
+            cols = ", ".join(_q(c) for c in ("config_hash", "seed", "generation", *names))
+            marks = ", ".join("?" for _ in range(len(names) + 3))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO summary ({cols}) VALUES ({marks})",
+                (
+                    [config_hash, seed, int(r["generation"])] + [_to_sql_value(r[k]) for k in names]
+                    for r in records
+                ),
+            )
+
+    def append_node_states(
+        self,
+        config_hash: str,
+        seed: int,
+        generation: int,
+        strategies: np.ndarray,
+        payoffs: np.ndarray,
+    ) -> None:
+        """1 世代分の全ノード戦略（0〜7 の整数）と利得を node_id 順の配列で追加する。"""
+        empty = np.empty(0, dtype=np.int32)
+        record = HistoryRecord(
+            True,
+            empty,
+            np.ascontiguousarray(strategies, dtype=np.int8),
+            empty,
+            np.ascontiguousarray(payoffs, dtype=np.float64),
+        )
+        self.append_node_record(config_hash, seed, generation, record)
+
+    def append_node_record(
+        self,
+        config_hash: str,
+        seed: int,
+        generation: int,
+        record: HistoryRecord,
+    ) -> None:
+        """差分符号化済みの 1 世代分のノード状態（history.DeltaEncoder の出力）を追加する。"""
+        s_blob, p_blob = record.to_blobs()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO node_history "
+                "(config_hash, seed, generation, strategies, payoffs, keyframe) VALUES (?, ?, ?, ?, ?, ?)",
+                (config_hash, seed, int(generation), s_blob, p_blob, int(record.keyframe)),
+            )
+
+    def append_topology_events(
+        self,
+        config_hash: str,
+        seed: int,
+        generation: int,
+        events: np.ndarray,
+    ) -> None:
+        """generation 直前までに起きた再結線 (node, removed, added) を追加する。"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO topology_events VALUES (?, ?, ?, ?)",
+                (
+                    config_hash,
+                    seed,
+                    int(generation),
+                    np.ascontiguousarray(events, dtype=np.int64).tobytes(),
+                ),
+            )
+
+    def write_run(
+        self,
+        cfg: SimulationConfig,
+        seed: int,
+        df: pd.DataFrame,
+        node_df: pd.DataFrame | None = None,
+        graph: Graph | nx.Graph | None = None,
+    ) -> str:
+        """run_simulation の戻り値をまとめて保存する。戻り値: config_hash"""
+        config_hash = self.begin_run(cfg, seed, graph)
+        self.append_summary(config_hash, seed, df.to_dict("records"))
+
+        if node_df is not None:
+            node_df = node_df.sort_values(["generation", "node_id"])
+            for gen, g in node_df.groupby("generation", sort=True):
+                self.append_node_states(
+                    config_hash,
+                    seed,
+                    int(gen),
+                    g["strategy_int"].to_numpy(),
+                    g["payoff"].to_numpy(),
+                )
+        return config_hash
+
+    # ------------------------------------------------------------------
+    # 読み込み
+    # ------------------------------------------------------------------
+    def _where_clause(self, where: Mapping | None, alias_of: Mapping[str, str]) -> tuple[str, list]:
+        """
+        {列名: 値 or 値のリスト} を SQL の WHERE 句に変換する。
+        alias_of: 列名 -> テーブル別名
+        """
+        if not where:
+            return "", []
+        self._check_columns(alias_of, where)
+        terms, params = [], []
+        for name, value in where.items():
+            col = f"{alias_of[name]}.{_q(name)}"
+            if isinstance(value, (list, tuple, set, np.ndarray)):
+                values = [_to_sql_value(v) for v in value]
+                terms.append(f"{col} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            else:
+                terms.append(f"{col} = ?")
+                params.append(_to_sql_value(value))
+        return " WHERE " + " AND ".join(terms), params
+
+    def _aliases(self) -> dict[str, str]:
+        """summary と runs を結合したときの 列名 -> 別名。キー列は summary 側を使う。"""
+        alias_of = {c: "r" for c in self._columns("runs") if c not in ("node_ids", "edges")}
+        alias_of.update({c: "s" for c in self._columns("summary")})
+        return alias_of
+
+    def runs(self, where: Mapping | None = None) -> pd.DataFrame:
+        """登録済みの実行 (config_hash, seed) とパラメータの一覧。"""
+        import pandas as pd
+
+        cols = [c for c in self._columns("runs") if c not in ("node_ids", "edges", "config_json")]
+        clause, params = self._where_clause(where, {c: "r" for c in cols})
+        sql = f"SELECT {', '.join('r.' + _q(c) for c in cols)} FROM runs r{clause}"
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def run_fingerprint(self, config_hash: str, seed: int) -> str | None:
+        """
+        実行 (config_hash, seed) の内容のハッシュ（図・動画の再生成の判定用, scripts/build_outputs.py）。
+        設定・グラフ・サマリの全行と、ノード履歴・再結線イベントの行数から計算する
+        （結果は seed で決まるので、同じ実行の上書きでは変わらない）。実行がなければ None。
+        """
+        key = (config_hash, seed)
+        run = self.conn.execute(
+            "SELECT config_json, node_ids, edges FROM runs WHERE config_hash = ? AND seed = ?", key
+        ).fetchone()
+        if run is None:
+            return None
+        h = hashlib.sha1()
+        for part in run:
+            h.update(repr(part).encode("utf-8"))
+        for row in self.conn.execute(
+            "SELECT * FROM summary WHERE config_hash = ? AND seed = ? ORDER BY generation", key
+        ):
+            h.update(repr(row).encode("utf-8"))
+        for table in ("node_history", "topology_events"):
+            (count,) = self.conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE config_hash = ? AND seed = ?", key
+            ).fetchone()
+            h.update(f"{table}:{count}".encode("utf-8"))
+        return h.hexdigest()
+
+    def read_summary(
+        self,
+        columns: Sequence[str] | None = None,
+        where: Mapping | None = None,
+    ) -> pd.DataFrame:
+        """
+        世代ごとのメトリクスを読み込む。
+
+        columns: 取得する列（None なら summary の全列）。runs のパラメータ列も指定可能。
+        where  : {列名: 値 or 値のリスト}。例: {"topology": "cycle", "seed": [0, 1]}
+        常に config_hash, seed, generation 列を含む。
+        """
+        import pandas as pd
+
+        alias_of = self._aliases()
+        if columns is None:
+            columns = [c for c in self._columns("summary") if c not in ("config_hash", "seed", "generation")]
+        self._check_columns(alias_of, columns)
+        select = ["s.config_hash", "s.seed", "s.generation"] + [
+            f"{alias_of[c]}.{_q(c)}" for c in columns if c not in ("config_hash", "seed", "generation")
+        ]
+        clause, params = self._where_clause(where, alias_of)
+        sql = (
+            f"SELECT {', '.join(select)} FROM summary s "
+            f"JOIN runs r ON r.config_hash = s.config_hash AND r.seed = s.seed"
+            f"{clause} ORDER BY s.config_hash, s.seed, s.generation"
+        )
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def final_metrics(
+        self,
+        metrics: Sequence[str] = ("realized_coop_rate",),
+        where: Mapping | None = None,
+    ) -> pd.DataFrame:
+        """
+        各実行の最終世代のメトリクスを、実行パラメータ付きで 1 クエリで取得する。
+        例: final_metrics(["realized_coop_rate"]).groupby(["topology", "meta_influence"]).mean()
+        """
+        import pandas as pd
+
+        alias_of = self._aliases()
+        self._check_columns(alias_of, metrics)
+        params_cols = [c for c in self._columns("runs") if c not in ("node_ids", "edges", "config_json")]
+        select = [f"r.{_q(c)}" for c in params_cols] + ["s.generation"] + [
+            f"s.{_q(m)}" for m in metrics
+        ]
+        clause, params = self._where_clause(where, alias_of)
+        last_gen = (
+            "s.generation = (SELECT MAX(s2.generation) FROM summary s2 "
+            "WHERE s2.config_hash = s.config_hash AND s2.seed = s.seed)"
+        )
+        clause = f"{clause} AND {last_gen}" if clause else f" WHERE {last_gen}"
+        sql = (
+            f"SELECT {', '.join(select)} FROM summary s "
+            f"JOIN runs r ON r.config_hash = s.config_hash AND r.seed = s.seed{clause}"
+        )
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def read_node_history(
+        self,
+        config_hash: str,
+        seed: int,
+        generations: Sequence[int] | None = None,
+    ) -> pd.DataFrame:
+        """
+        node_history を run_simulation の node_df と同じ形式で読み込む。
+        generations を指定した場合は、その最小世代の直前のキーフレームから復元する。
+        """
+        import pandas as pd
+
+        node_ids = self._node_ids(config_hash, seed)
+        sql = (
+            "SELECT generation, strategies, payoffs, keyframe FROM node_history "
+            "WHERE config_hash = ? AND seed = ?"
+        )
+        params: list = [config_hash, seed]
+        wanted = None
+        if generations is not None:
+            wanted = {int(g) for g in generations}
+            if not wanted:
+                return pd.DataFrame(columns=["generation", "node_id", "strategy_int", "strategy_bits", "payoff"])
+            sql += (
+                " AND generation <= ? AND generation >= COALESCE(("
+                "SELECT MAX(generation) FROM node_history WHERE config_hash = ? AND seed = ?"
+                " AND generation <= ? AND (keyframe IS NULL OR keyframe = 1)), 0)"
+            )
+            params.extend([max(wanted), config_hash, seed, min(wanted)])
+        sql += " ORDER BY generation"
+
+        frames = []
+        strategies = payoffs = None
+        for gen, s_blob, p_blob, keyframe in self.conn.execute(sql, params):
+            record = HistoryRecord.from_blobs(keyframe is None or bool(keyframe), s_blob, p_blob)
+            if record.keyframe:
+                strategies = record.strategy_values.copy()
+                payoffs = record.payoff_values.copy()
+            else:
+                record.apply(strategies, payoffs)
+            if wanted is not None and gen not in wanted:
+                continue
+            ids = node_ids if node_ids is not None else np.arange(len(strategies))
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "generation": gen,
+                        "node_id": ids,
+                        "strategy_int": strategies.astype(np.int64),
+                        "strategy_bits": [format(int(x), "03b") for x in strategies],
+                        "payoff": payoffs.copy(),
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=["generation", "node_id", "strategy_int", "strategy_bits", "payoff"])
+        return pd.concat(frames, ignore_index=True)
+
+    def read_topology_events(self, config_hash: str, seed: int) -> pd.DataFrame:
+        """再結線イベントを DataFrame（generation, node_id, removed, added）で読み込む。"""
+        import pandas as pd
+
+        frames = []
+        for gen, blob in self.conn.execute(
+            "SELECT generation, events FROM topology_events "
+            "WHERE config_hash = ? AND seed = ? ORDER BY generation",
+            (config_hash, seed),
+        ):
+            events = np.frombuffer(blob, dtype=np.int64).reshape(-1, 3)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "generation": gen,
+                        "node_id": events[:, 0],
+                        "removed": events[:, 1],
+                        "added": events[:, 2],
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=["generation", "node_id", "removed", "added"])
+        return pd.concat(frames, ignore_index=True)
+
+    def _node_ids(self, config_hash: str, seed: int) -> np.ndarray | None:
+        row = self.conn.execute(
+            "SELECT node_ids FROM runs WHERE config_hash = ? AND seed = ?", (config_hash, seed)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Run not found: config_hash={config_hash}, seed={seed}")
+        if row[0] is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.int64)
+
+    def read_graph(self, config_hash: str, seed: int) -> nx.Graph:
+        """保存したエッジ配列からネットワークを復元する。"""
+        import networkx as nx
+
+        row = self.conn.execute(
+            "SELECT node_ids, edges FROM runs WHERE config_hash = ? AND seed = ?", (config_hash, seed)
+        ).fetchone()
+        if row is None or row[1] is None:
+            raise KeyError(f"Graph not found: config_hash={config_hash}, seed={seed}")
+        G = nx.Graph()
+        G.add_nodes_from(np.frombuffer(row[0], dtype=np.int64).tolist())
+        G.add_edges_from(np.frombuffer(row[1], dtype=np.int64).reshape(-1, 2).tolist())
+        return G
@@ -0,0 +1,346 @@
+# telemetry.py
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Mapping
+import json
+import logging
+import math
+import queue
+import socket
+import threading
+import time
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from network_ipd_ga.snapshot import GenerationSnapshot
+
+logger = logging.getLogger(__name__)
+
+# 実行中のシミュレーション・スイープのライブテレメトリ。
+#
+# TelemetryServer はバックグラウンドスレッドで asyncio のサーバを動かし、
+#   GET /events : Server-Sent Events（1 イベント = 1 行の JSON）。`curl -N` で購読できる
+#   GET /status : 最新の状態（run ごとの最新世代, スイープの進捗, 捨てたイベント数）の JSON
+# を提供する。同じポート番号の UDP でもイベントを受け付けるので、別プロセス
+# （run_all_experiments から起動した各実行）は UDPPublisher で送るだけでよい。
+#
+# publish はどちらもブロックしない。上限つきのキューが一杯のとき（または送信できないとき）は
+# イベントを捨て、dropped として数える。
+#
+# asyncio の import は重い（数十 ms）ので、サーバを起動するときだけ読み込む
+# （UDPPublisher / TelemetrySink だけを使うスイープの各実行では読み込まない）。
+
+DEFAULT_TELEMETRY_PORT = 8765
+
+_KEEPALIVE_SECONDS = 15.0
+_POLL_SECONDS = 0.05
+
+
+def _jsonable(value):
+    """numpy のスカラーや nan を JSON で表せる値にする（nan / inf は null）。"""
+    if isinstance(value, Mapping):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if hasattr(value, "item"):  # numpy スカラー
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def encode_event(event: Mapping) -> bytes:
+    return json.dumps(_jsonable(event), separators=(",", ":")).encode("utf-8")
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """"host:port" または "port" を (host, port) にする。"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class TelemetryServer:
+    """ローカルの HTTP（SSE）+ UDP テレメトリサーバ。start() で別スレッドで起動する。"""
+
+    def __init__(
+        self,
+        port: int = DEFAULT_TELEMETRY_PORT,
+        host: str = "127.0.0.1",
+        maxsize: int = 1000,
+        client_maxsize: int = 1000,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.client_maxsize = client_maxsize
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.num_events = 0
+        self.latest_runs: Dict[str, dict] = {}
+        self.latest_sweep: dict | None = None
+        self.clients: List[asyncio.Queue] = []
+        self._stop = threading.Event()
+        self._started = threading.Event()
+        self._error: BaseException | None = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    # --- シミュレーション側（任意のスレッド）---------------------------------
+    def start(self) -> TelemetryServer:
+        self.thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise RuntimeError(f"Failed to start telemetry server on {self.host}:{self.port}") from self._error
+        logger.info(f"Telemetry: http://{self.host}:{self.port}/events (SSE), /status")
+        return self
+
+    def publish(self, event: Mapping) -> None:
+        """イベントをキューに入れる（ブロックしない。一杯なら捨てる）。"""
+        try:
+            self.queue.put_nowait(dict(event))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        self._stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def __enter__(self) -> TelemetryServer:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- asyncio 側（サーバスレッド）-----------------------------------------
+    def _run(self) -> None:
+        import asyncio
+
+        try:
+            asyncio.run(self._main())
+        except BaseException as e:
+            self._error = e
+            self._started.set()
+
+    async def _main(self) -> None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self._handle_http, self.host, self.port)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), local_addr=(self.host, self.port)
+        )
+        self._started.set()
+        try:
+            while True:
+                # キューに溜まったイベントをまとめて配信し、空なら少し待つ
+                while True:
+                    try:
+                        event = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._dispatch(event)
+                if self._stop.is_set():
+                    break
+                await asyncio.sleep(_POLL_SECONDS)
+        finally:
+            # 接続中の /events は asyncio.run の終了時にキャンセルされる
+            transport.close()
+            server.close()
+
+    def _dispatch(self, event: dict) -> None:
+        import asyncio
+
+        self.num_events += 1
+        if event.get("type") == "sweep":
+            self.latest_sweep = event
+        elif "run" in event:
+            self.latest_runs[str(event["run"])] = event
+        data = encode_event(event)
+        for client in self.clients:
+            try:
+                client.put_nowait(data)
+            except asyncio.QueueFull:
+                # 読み出しの遅いクライアントの分は捨てる
+                self.dropped += 1
+
+    def status(self) -> dict:
+        return {
+            "runs": self.latest_runs,
+            "sweep": self.latest_sweep,
+            "events": self.num_events,
+            "dropped": self.dropped,
+            "clients": len(self.clients),
+        }
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        import asyncio
+
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # ヘッダは読み捨てる
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line[1].split("?")[0] if len(request_line) >= 2 else ""
+
+            if path == "/events":
+                await self._serve_events(writer)
+            elif path in ("/", "/status"):
+                body = encode_event(self.status())
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                    + body
+                )
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_events(self, writer: asyncio.StreamWriter) -> None:
+        import asyncio
+
+        client: asyncio.Queue = asyncio.Queue(maxsize=self.client_maxsize)
+        self.clients.append(client)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+            )
+            await writer.drain()
+            while not self._stop.is_set():
+                try:
+                    data = await asyncio.wait_for(client.get(), timeout=_KEEPALIVE_SECONDS)
+                    writer.write(b"data: " + data + b"\n\n")
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                await writer.drain()
+        finally:
+            self.clients.remove(client)
+
+
+class _DatagramProtocol:
+    """
+    UDP で届いたイベント（JSON）をサーバのイベントとして配信する。
+    asyncio.DatagramProtocol と同じメソッドを持つ（import 時に asyncio を読み込まないため継承しない）。
+    """
+
+    def __init__(self, server: TelemetryServer) -> None:
+        self.server = server
+
+    def connection_made(self, transport) -> None:
+        pass
+
+    def connection_lost(self, exc) -> None:
+        pass
+
+    def error_received(self, exc) -> None:
+        pass
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        if isinstance(event, dict):
+            self.server._dispatch(event)
+
+
+class UDPPublisher:
+    """別プロセスの TelemetryServer に UDP でイベントを送る（ブロックせず, 失敗したら捨てる）。"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_TELEMETRY_PORT) -> None:
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.dropped = 0
+
+    def publish(self, event: Mapping) -> None:
+        try:
+            self.sock.sendto(encode_event(event), self.address)
+        except OSError:
+            self.dropped += 1
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class TelemetrySink:
+    """
+    iter_simulation のスナップショットをテレメトリイベントとして publish する sink。
+    イベント: {"type": "generation", "run", "generation", "metrics", "timings", "gen_per_sec"}
+    timings にはシミュレーション内の各段階の時間に加え、前回の write からの経過時間 wall
+    （sink の書き込みを含む 1 世代あたりの実時間）が入る。
+    """
+
+    def __init__(self, publisher, run: str, close_publisher: bool = False) -> None:
+        self.publisher = publisher
+        self.run = run
+        self.close_publisher = close_publisher
+        self.last_write: float | None = None
+        self.started = time.perf_counter()
+        self.count = 0
+
+    def write(self, snap: GenerationSnapshot) -> None:
+        now = time.perf_counter()
+        timings = dict(snap.timings or {})
+        if self.last_write is not None:
+            timings["wall"] = now - self.last_write
+        self.last_write = now
+        self.count += 1
+        self.publisher.publish(
+            {
+                "type": "generation",
+                "run": self.run,
+                "generation": snap.generation,
+                "metrics": snap.metrics,
+                "timings": timings,
+                "gen_per_sec": self.count / max(now - self.started, 1e-9),
+            }
+        )
+
+    def close(self) -> None:
+        self.publisher.publish({"type": "run_end", "run": self.run, "generations": self.count})
+        if self.close_publisher:
+            self.publisher.close()
+
+
+class SweepProgress:
+    """スイープのジョブ進捗（完了数・実行中・経過時間・ETA）を publish する。"""
+
+    def __init__(self, publisher, total: int) -> None:
+        self.publisher = publisher
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.running: List[str] = []
+        self.started = time.time()
+
+    def _publish(self) -> None:
+        elapsed = time.time() - self.started
+        eta = elapsed / self.done * (self.total - self.done) if self.done else None
+        self.publisher.publish(
+            {
+                "type": "sweep",
+                "total": self.total,
+                "done": self.done,
+                "failed": self.failed,
+                "running": list(self.running),
+                "elapsed": elapsed,
+                "eta": eta,
+            }
+        )
+
+    def job_started(self, job: str) -> None:
+        self.running.append(job)
+        self._publish()
+
+    def job_finished(self, job: str, ok: bool = True) -> None:
+        self.running.remove(job)
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        self._publish()
@@ -0,0 +1,461 @@
+# viewer.py
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+import base64
+import json
+import math
+import zlib
+
+import numpy as np
+
+from network_ipd_ga.history import NodeHistory
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ブラウザで再生する 1 実行分のビューア（scripts/make_viewer.py）。
+#
+# 動画（make_video.py）はエンコードに時間がかかり、解像度・速度も固定になる。ここでは
+#   - レイアウト（ノード位置 float32, [0, 1] に正規化）とエッジ（ノード位置の添字 int32 の組）
+#   - 戦略の履歴（世代 × ノードの int8 行列を、前の世代との XOR にしたもの）
+#   - 再結線イベント（世代, ノード, 外した相手, つないだ相手）とサマリのメトリクス
+# を zlib（deflate）で圧縮・base64 にして 1 つの HTML に埋め込み、描画はブラウザの canvas で行う。
+# 戦略はほとんどの世代で一部のノードしか変わらないので、XOR した行列はほぼ 0 で大きく縮む
+# （1000 ノード × 1000 世代で数百 KB 程度）。展開はブラウザ標準の DecompressionStream で行い、
+# 外部のライブラリ・ネットワークへのアクセスは使わない。
+#
+# ビューア: スライダーでの世代の移動・再生（速度可変）, ホイールで拡大・ドラッグで移動（ダブルクリックで戻す）,
+# ノードをクリック（または ID で検索）するとそのノードと隣接ノードを強調し、戦略・次数を表示,
+# 戦略を選ぶとその戦略のノードだけを強調。格子（lattice_shape）は 1 ノード = 1 ピクセルの画像として描く。
+
+
+def _pack(a: np.ndarray) -> str:
+    """配列のバイト列を zlib で圧縮して base64 にする（リトルエンディアン）。"""
+    return base64.b64encode(zlib.compress(np.ascontiguousarray(a).tobytes(), 9)).decode("ascii")
+
+
+def encode_strategies(strategies: np.ndarray) -> str:
+    """(世代, ノード) の戦略コードを、前の世代との XOR にしてから圧縮する（先頭の世代はそのまま）。"""
+    s = np.ascontiguousarray(strategies, dtype=np.uint8)
+    delta = s.copy()
+    delta[1:] ^= s[:-1]
+    return _pack(delta)
+
+
+def strategy_matrix(
+    history: NodeHistory | pd.DataFrame, node_ids: Sequence[int], every: int = 1
+) -> Tuple[List[int], np.ndarray]:
+    """
+    ノード履歴（NodeHistory または *_nodes.csv の DataFrame）から、every 世代ごとの
+    (世代のリスト, 戦略コードの行列 int8[世代, ノード]) を作る。列は node_ids の並び。
+    """
+    ids = np.asarray(node_ids, dtype=np.int64)
+    if isinstance(history, NodeHistory):
+        generations = [int(g) for g in history.generations][::every]
+        order = None
+        if not np.array_equal(history.node_ids, ids):
+            index = {int(n): i for i, n in enumerate(history.node_ids)}
+            order = np.array([index[int(n)] for n in ids], dtype=np.int64)
+        matrix = np.empty((len(generations), len(ids)), dtype=np.int8)
+        for row, (_, s, _) in enumerate(history.iter_states(generations)):
+            matrix[row] = s if order is None else s[order]
+        return generations, matrix
+
+    generations = sorted(int(g) for g in history["generation"].unique())[::every]
+    df = history[history["generation"].isin(generations)]
+    pivot = df.pivot(index="generation", columns="node_id", values="strategy_int")
+    matrix = pivot.reindex(index=generations, columns=ids).fillna(0).to_numpy(np.int8)
+    return generations, matrix
+
+
+def normalize_positions(positions: np.ndarray) -> np.ndarray:
+    """レイアウトを縦横比を保って [0, 1] × [0, 1] に収める（y は画面の下向き）。"""
+    pos = np.asarray(positions, dtype=np.float64)
+    lo, hi = pos.min(axis=0), pos.max(axis=0)
+    span = float(max(hi - lo)) or 1.0
+    out = (pos - lo) / span + (1 - (hi - lo) / span) / 2
+    out[:, 1] = 1 - out[:, 1]
+    return out.astype(np.float32)
+
+
+def viewer_html(
+    title: str,
+    node_ids: np.ndarray,
+    generations: Sequence[int],
+    strategies: np.ndarray,
+    colors: Sequence[str],
+    positions: np.ndarray | None = None,
+    edges: np.ndarray | None = None,
+    rewiring: np.ndarray | None = None,
+    lattice_shape: Tuple[int, int] | None = None,
+    lattice_offsets: Sequence[Tuple[int, int]] = ((-1, 0), (1, 0), (0, -1), (0, 1)),
+    summary: Dict[str, Sequence[float]] | None = None,
+) -> str:
+    """
+    ビューアの HTML。
+    positions: ノード位置 (N, 2)（normalize_positions 済み）, edges: ノード位置の添字の組 (E, 2),
+    rewiring: (世代, ノード, 外した相手, つないだ相手) の添字 (R, 4),
+    lattice_shape: 格子の (高さ, 幅)（このときノード ID が行優先のセルの位置で, positions / edges は不要）,
+    lattice_offsets: 格子の近傍（lattice.neighbor_offsets）。
+    """
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    if len(node_ids) and (node_ids.min() < -(2**31) or node_ids.max() >= 2**31):
+        raise ValueError("Node IDs must fit in int32.")
+    if strategies.shape != (len(generations), len(node_ids)):
+        raise ValueError(f"strategies must be (generations, nodes), got {strategies.shape}.")
+    if lattice_shape is None and positions is None:
+        raise ValueError("positions are required unless lattice_shape is given.")
+
+    data = {
+        "title": title,
+        "numNodes": len(node_ids),
+        "generations": [int(g) for g in generations],
+        "colors": list(colors),
+        "nodeIds": _pack(node_ids.astype("<i4")),
+        "strategies": encode_strategies(strategies),
+        "positions": None if positions is None else _pack(np.asarray(positions, dtype="<f4")),
+        "edges": None if edges is None else _pack(np.asarray(edges, dtype="<i4").reshape(-1, 2)),
+        "rewiring": None if rewiring is None or len(rewiring) == 0 else _pack(np.asarray(rewiring, dtype="<i4")),
+        "lattice": None if lattice_shape is None else [int(x) for x in lattice_shape],
+        "latticeOffsets": [[int(dy), int(dx)] for dy, dx in lattice_offsets],
+        "summary": {
+            name: [None if v is None or (isinstance(v, float) and math.isnan(v)) else float(v) for v in values]
+            for name, values in (summary or {}).items()
+        },
+    }
+    # </script> で埋め込みが途切れないように "<" をエスケープする
+    payload = json.dumps(data, separators=(",", ":")).replace("<", "\\u003c")
+    return _TEMPLATE.replace("__TITLE__", _escape(title)).replace("__DATA__", payload)
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+_TEMPLATE = r"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  html, body { margin: 0; height: 100%; font: 13px sans-serif; background: #fff; }
+  body { display: flex; flex-direction: column; }
+  #bar { display: flex; gap: 8px; align-items: center; padding: 6px 8px; border-bottom: 1px solid #ddd; flex-wrap: wrap; }
+  #scrub { flex: 1; min-width: 200px; }
+  #main { flex: 1; position: relative; min-height: 0; }
+  #view { position: absolute; inset: 0; width: 100%; height: 100%; cursor: grab; }
+  #info { position: absolute; left: 8px; top: 8px; background: rgba(255,255,255,0.85); padding: 4px 6px; white-space: pre; pointer-events: none; }
+  #legend { position: absolute; right: 8px; top: 8px; background: rgba(255,255,255,0.85); padding: 4px 6px; }
+  #legend div { cursor: pointer; white-space: pre; font-family: monospace; }
+  #legend span { display: inline-block; width: 10px; height: 10px; margin-right: 4px; vertical-align: middle; }
+  #find { width: 90px; }
+</style>
+</head>
+<body>
+<div id="bar">
+  <button id="play" title="Play / pause (space)">&#9654;</button>
+  <input id="scrub" type="range" min="0" value="0" step="1">
+  <span id="gen"></span>
+  <label>fps <select id="fps"><option>2</option><option>5</option><option selected>10</option><option>20</option><option>30</option><option>60</option></select></label>
+  <label><input id="edges" type="checkbox"> edges</label>
+  <input id="find" placeholder="node id" title="Highlight a node (Enter)">
+</div>
+<div id="main">
+  <canvas id="view"></canvas>
+  <div id="info">Loading...</div>
+  <div id="legend"></div>
+</div>
+<script id="data" type="application/json">__DATA__</script>
+<script>
+"use strict";
+const D = JSON.parse(document.getElementById("data").textContent);
+
+async function inflate(b64) {
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+  return new Response(stream).arrayBuffer();
+}
+
+const canvas = document.getElementById("view");
+const ctx = canvas.getContext("2d");
+const info = document.getElementById("info");
+const scrub = document.getElementById("scrub");
+const genLabel = document.getElementById("gen");
+const N = D.numNodes, G = D.generations.length;
+let nodeIds, strategies, positions = null, edges = null, rewiring = null;
+let frame = 0, playing = false, selected = -1, filter = -1;
+let view = { scale: 1, x: 0, y: 0 };
+let lattice = null, latticeCanvas = null;
+let edgeCache = { gen: -Infinity, set: null };
+
+function rgb(hex) { return [1, 3, 5].map(i => parseInt(hex.slice(i, i + 2), 16)); }
+const RGB = D.colors.map(rgb);
+
+// --- 再結線: 世代 g の時点のエッジの集合（初期のエッジに g までのイベントを順に適用） ---
+function edgeKey(a, b) { return a < b ? a * N + b : b * N + a; }
+function edgesAt(g) {
+  if (!rewiring) return null;
+  if (g < edgeCache.gen) edgeCache = { gen: -Infinity, set: null };
+  if (!edgeCache.set) {
+    edgeCache.set = new Set();
+    for (let e = 0; e < edges.length; e += 2) edgeCache.set.add(edgeKey(edges[e], edges[e + 1]));
+  }
+  for (let r = 0; r < rewiring.length; r += 4) {
+    const eg = rewiring[r];
+    if (eg <= edgeCache.gen || eg > g) continue;
+    edgeCache.set.delete(edgeKey(rewiring[r + 1], rewiring[r + 2]));
+    edgeCache.set.add(edgeKey(rewiring[r + 1], rewiring[r + 3]));
+  }
+  edgeCache.gen = g;
+  return edgeCache.set;
+}
+function forEachEdge(fn) {
+  const set = edgesAt(D.generations[frame]);
+  if (set) { for (const k of set) fn(Math.floor(k / N), k % N); return; }
+  for (let e = 0; e < edges.length; e += 2) fn(edges[e], edges[e + 1]);
+}
+function neighbors(i) {
+  const out = [];
+  if (!lattice) forEachEdge((a, b) => { if (a === i) out.push(b); else if (b === i) out.push(a); });
+  else {
+    const [H, W] = lattice, c = nodeIds[i], y = Math.floor(c / W), x = c % W;
+    for (const [dy, dx] of D.latticeOffsets) {
+      const cell = ((y + dy + H) % H) * W + (x + dx + W) % W;
+      const j = cellIndex.get(cell);
+      if (j !== undefined) out.push(j);
+    }
+  }
+  return out;
+}
+let cellIndex = null;
+
+// --- 描画 ---
+function resize() {
+  const dpr = window.devicePixelRatio || 1;
+  canvas.width = Math.round(canvas.clientWidth * dpr);
+  canvas.height = Math.round(canvas.clientHeight * dpr);
+  draw();
+}
+function base() {
+  // ワールド座標 [0, 1]^2 -> 画面（余白つきで中央に収める）× ズーム
+  const s = Math.min(canvas.width, canvas.height) * 0.94;
+  return { s: s * view.scale, ox: (canvas.width - s) / 2 * view.scale + view.x, oy: (canvas.height - s) / 2 * view.scale + view.y };
+}
+function row() { return strategies.subarray(frame * N, (frame + 1) * N); }
+
+function drawLattice(b, s) {
+  const [H, W] = lattice;
+  const img = latticeCanvas.getContext("2d").createImageData(W, H);
+  for (let i = 0; i < N; i++) {
+    const c = nodeIds[i], p = c * 4, code = s[i];
+    const [r, g, bl] = RGB[code];
+    const dim = filter >= 0 && code !== filter;
+    img.data[p] = dim ? 235 : r; img.data[p + 1] = dim ? 235 : g; img.data[p + 2] = dim ? 235 : bl; img.data[p + 3] = 255;
+  }
+  latticeCanvas.getContext("2d").putImageData(img, 0, 0);
+  const cell = b.s / Math.max(H, W);
+  ctx.imageSmoothingEnabled = false;
+  ctx.drawImage(latticeCanvas, b.ox, b.oy, W * cell, H * cell);
+  if (selected >= 0) {
+    ctx.lineWidth = Math.max(1, cell / 6);
+    for (const j of [selected, ...neighbors(selected)]) {
+      const c = nodeIds[j];
+      ctx.strokeStyle = j === selected ? "#000" : "#666";
+      ctx.strokeRect(b.ox + (c % W) * cell, b.oy + Math.floor(c / W) * cell, cell, cell);
+    }
+  }
+}
+
+function drawGraph(b, s) {
+  const r = Math.max(1, b.s * 0.35 / Math.sqrt(N));
+  const px = i => b.ox + positions[2 * i] * b.s, py = i => b.oy + positions[2 * i + 1] * b.s;
+  if (document.getElementById("edges").checked) {
+    ctx.strokeStyle = "rgba(120,120,120,0.35)";
+    ctx.lineWidth = 1;
+    ctx.beginPath();
+    forEachEdge((a, c) => { ctx.moveTo(px(a), py(a)); ctx.lineTo(px(c), py(c)); });
+    ctx.stroke();
+  }
+  const square = N > 20000;
+  for (let code = 0; code < 8; code++) {
+    const dim = filter >= 0 && code !== filter;
+    ctx.fillStyle = dim ? "rgba(200,200,200,0.5)" : D.colors[code];
+    ctx.beginPath();
+    for (let i = 0; i < N; i++) {
+      if (s[i] !== code) continue;
+      const x = px(i), y = py(i);
+      if (x < -r || y < -r || x > canvas.width + r || y > canvas.height + r) continue;
+      if (square) ctx.rect(x - r, y - r, 2 * r, 2 * r);
+      else { ctx.moveTo(x + r, y); ctx.arc(x, y, r, 0, 2 * Math.PI); }
+    }
+    ctx.fill();
+  }
+  if (selected >= 0) {
+    const nbrs = neighbors(selected);
+    ctx.strokeStyle = "#000";
+    ctx.lineWidth = Math.max(1.5, r / 3);
+    ctx.beginPath();
+    for (const j of nbrs) { ctx.moveTo(px(selected), py(selected)); ctx.lineTo(px(j), py(j)); }
+    ctx.stroke();
+    for (const j of [selected, ...nbrs]) {
+      ctx.beginPath();
+      ctx.arc(px(j), py(j), j === selected ? 2 * r + 2 : r + 2, 0, 2 * Math.PI);
+      ctx.stroke();
+    }
+  }
+}
+
+function bits(code) { return code.toString(2).padStart(3, "0"); }
+function draw() {
+  if (!strategies) return;
+  ctx.setTransform(1, 0, 0, 1, 0, 0);
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  const b = base(), s = row();
+  if (lattice) drawLattice(b, s); else drawGraph(b, s);
+
+  const gen = D.generations[frame];
+  scrub.value = frame;
+  genLabel.textContent = `generation ${gen} (${frame + 1}/${G})`;
+  const lines = [D.title, `Generation ${gen}`];
+  const metrics = Object.entries(D.summary).map(([k, v]) => v[frame] == null ? null : `${k} = ${v[frame].toFixed(3)}`).filter(x => x);
+  if (metrics.length) lines.push(metrics.join(", "));
+  if (selected >= 0) {
+    const history = [];
+    for (let f = Math.max(0, frame - 9); f <= frame; f++) history.push(bits(strategies[f * N + selected]));
+    lines.push(`node ${nodeIds[selected]}: strategy ${bits(s[selected])}, degree ${neighbors(selected).length}`,
+               `  last strategies: ${history.join(" ")}`);
+  }
+  info.textContent = lines.join("\n");
+
+  const counts = new Array(8).fill(0);
+  for (let i = 0; i < N; i++) counts[s[i]]++;
+  const legend = document.getElementById("legend");
+  legend.innerHTML = "";
+  for (let code = 0; code < 8; code++) {
+    const el = document.createElement("div");
+    el.innerHTML = `<span style="background:${D.colors[code]}"></span>${bits(code)} ${String(counts[code]).padStart(String(N).length)}`;
+    el.style.fontWeight = filter === code ? "bold" : "normal";
+    el.title = "Highlight this strategy (click again to clear)";
+    el.onclick = () => { filter = filter === code ? -1 : code; draw(); };
+    legend.appendChild(el);
+  }
+}
+
+// --- 操作 ---
+function setFrame(f) { frame = Math.max(0, Math.min(G - 1, f)); draw(); }
+let last = 0;
+function tick(t) {
+  if (!playing) return;
+  const fps = Number(document.getElementById("fps").value);
+  if (t - last >= 1000 / fps) {
+    last = t;
+    if (frame >= G - 1) { playing = false; updatePlay(); return; }
+    setFrame(frame + 1);
+  }
+  requestAnimationFrame(tick);
+}
+function updatePlay() { document.getElementById("play").innerHTML = playing ? "&#10074;&#10074;" : "&#9654;"; }
+function togglePlay() {
+  playing = !playing;
+  if (playing && frame >= G - 1) setFrame(0);
+  updatePlay();
+  if (playing) requestAnimationFrame(tick);
+}
+document.getElementById("play").onclick = togglePlay;
+scrub.oninput = () => setFrame(Number(scrub.value));
+document.getElementById("edges").onchange = draw;
+document.getElementById("find").onkeydown = e => {
+  if (e.key !== "Enter") return;
+  const id = Number(e.target.value);
+  selected = e.target.value === "" ? -1 : nodeIds.indexOf(id);
+  draw();
+};
+window.addEventListener("keydown", e => {
+  if (e.target.tagName === "INPUT" && e.target.type !== "range") return;
+  if (e.key === " ") { togglePlay(); e.preventDefault(); }
+  else if (e.key === "ArrowRight") setFrame(frame + 1);
+  else if (e.key === "ArrowLeft") setFrame(frame - 1);
+  else if (e.key === "Home") setFrame(0);
+  else if (e.key === "End") setFrame(G - 1);
+  else if (e.key === "Escape") { selected = -1; filter = -1; draw(); }
+});
+
+function canvasPoint(e) {
+  const rect = canvas.getBoundingClientRect(), dpr = canvas.width / rect.width;
+  return [(e.clientX - rect.left) * dpr, (e.clientY - rect.top) * dpr];
+}
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const [mx, my] = canvasPoint(e), k = Math.exp(-e.deltaY * 0.0015);
+  view.x = mx - (mx - view.x) * k; view.y = my - (my - view.y) * k; view.scale *= k;
+  draw();
+}, { passive: false });
+let drag = null;
+canvas.addEventListener("mousedown", e => { drag = { p: canvasPoint(e), moved: false }; canvas.style.cursor = "grabbing"; });
+window.addEventListener("mousemove", e => {
+  if (!drag) return;
+  const [mx, my] = canvasPoint(e);
+  if (Math.abs(mx - drag.p[0]) + Math.abs(my - drag.p[1]) > 3) drag.moved = true;
+  if (!drag.moved) return;
+  view.x += mx - drag.p[0]; view.y += my - drag.p[1]; drag.p = [mx, my];
+  draw();
+});
+window.addEventListener("mouseup", e => {
+  if (drag && !drag.moved && e.target === canvas) pick(...canvasPoint(e));
+  drag = null; canvas.style.cursor = "grab";
+});
+canvas.addEventListener("dblclick", () => { view = { scale: 1, x: 0, y: 0 }; draw(); });
+
+function pick(mx, my) {
+  // クリック位置に最も近いノード（一定距離以内）を選ぶ
+  const b = base();
+  let best = -1;
+  if (lattice) {
+    const [H, W] = lattice, cell = b.s / Math.max(H, W);
+    const x = Math.floor((mx - b.ox) / cell), y = Math.floor((my - b.oy) / cell);
+    if (x >= 0 && y >= 0 && x < W && y < H) best = cellIndex.get(y * W + x) ?? -1;
+  } else {
+    let bestD = Math.pow(Math.max(8, b.s * 0.7 / Math.sqrt(N)), 2);
+    for (let i = 0; i < N; i++) {
+      const dx = b.ox + positions[2 * i] * b.s - mx, dy = b.oy + positions[2 * i + 1] * b.s - my;
+      const d = dx * dx + dy * dy;
+      if (d < bestD) { bestD = d; best = i; }
+    }
+  }
+  selected = best === selected ? -1 : best;
+  document.getElementById("find").value = selected >= 0 ? nodeIds[selected] : "";
+  draw();
+}
+
+async function main() {
+  nodeIds = new Int32Array(await inflate(D.nodeIds));
+  strategies = new Uint8Array(await inflate(D.strategies));
+  // 前の世代との XOR を順に戻す
+  for (let f = 1; f < G; f++) {
+    const cur = f * N, prev = cur - N;
+    for (let i = 0; i < N; i++) strategies[cur + i] ^= strategies[prev + i];
+  }
+  if (D.lattice) {
+    lattice = D.lattice;
+    latticeCanvas = document.createElement("canvas");
+    latticeCanvas.width = lattice[1]; latticeCanvas.height = lattice[0];
+    cellIndex = new Map();
+    for (let i = 0; i < N; i++) cellIndex.set(nodeIds[i], i);
+    document.getElementById("edges").disabled = true;
+  } else {
+    positions = new Float32Array(await inflate(D.positions));
+    edges = D.edges ? new Int32Array(await inflate(D.edges)) : new Int32Array(0);
+    rewiring = D.rewiring ? new Int32Array(await inflate(D.rewiring)) : null;
+    document.getElementById("edges").checked = edges.length / 2 <= 20000;
+  }
+  scrub.max = G - 1;
+  window.addEventListener("resize", resize);
+  resize();
+}
+main().catch(err => { info.textContent = "Failed to load: " + err; });
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,126 @@
+# well_mixed.py
+from __future__ import annotations
+from typing import Generator, List, Tuple
+import time
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+
+from network_ipd_ga.agent import Agent
+from network_ipd_ga.game import pair_outcome_table
+from network_ipd_ga.ga import counter_children, counter_uniforms
+from network_ipd_ga.rng import CounterStreams, initial_strategy_codes
+from network_ipd_ga.selection import DEFAULT_SELECTION, Selection, select_parents_well_mixed
+from network_ipd_ga.snapshot import GenerationSnapshot, summary_metrics
+from network_ipd_ga.strategy import int_to_strategy
+
+# 完全混合（well_mixed, 完全グラフ）の集団。ネットワーク効果を比べるための平均場の基準。
+#
+# 全員が自分以外の全員と対戦するが、エッジのリストは作らない。
+# 戦略は決定的なので、戦略 a のエージェントの利得は 8×8 のペア対戦表と戦略ヒストグラム h から
+#   payoff[a] = Σ_b h[b] · P[a, b] - P[a, a]（自分との対戦を除く）
+# と O(8²) で決まり、協調した回数も h から求まる。1 世代は O(N)（世代交代も含む）。
+#
+# 世代交代はカウンタベース乱数（rng.CounterStreams, ノードごとの行）で全ノード一括に行い、
+# 親の候補は集団全体（selection.select_parents_well_mixed）。乱数は rng_mode によらず常にカウンタベース。
+# 空間構造メトリクス（エッジ上の量）は出力しない。
+
+
+def well_mixed_outcomes(
+    hist: np.ndarray, payoff_table: np.ndarray, coop_table: np.ndarray, T: int
+) -> Tuple[np.ndarray, int, int]:
+    """
+    戦略ヒストグラムから 1 世代分の対戦結果を求める。
+    戻り値: (戦略ごとの 1 人あたりの利得 (8,), 協調(C)の総数, 行動の総数)
+    """
+    h = hist.astype(np.int64)
+    n = int(h.sum())
+    payoff_by_strategy = payoff_table @ h.astype(np.float64) - np.diag(payoff_table)
+    # 異なる 2 人の組ごとに 1 回対戦（coop は両者合計で対称）
+    coop_actions = (int(h @ coop_table @ h) - int(h @ np.diag(coop_table))) // 2
+    total_actions = n * (n - 1) * T
+    return payoff_by_strategy, coop_actions, total_actions
+
+
+def reproduce_codes_well_mixed(
+    codes: np.ndarray,
+    payoffs: np.ndarray,
+    streams: CounterStreams,
+    generation: int,
+    mutation_rate: float = 0.01,
+    meta_influence: float = 0.3,
+    selection: Selection = DEFAULT_SELECTION,
+) -> np.ndarray:
+    """全ノードの子戦略コードを、集団全体を候補とする親選択でまとめて計算する。"""
+    n = len(codes)
+    meta_code = int(np.argmax(np.bincount(codes, minlength=8)))
+    u = counter_uniforms(streams, generation, n, selection)
+    d = selection.draws
+    parent1 = codes[select_parents_well_mixed(selection, payoffs, u["select"][:, :d])]
+    parent2 = codes[select_parents_well_mixed(selection, payoffs, u["select"][:, d:2 * d])]
+    return counter_children(parent1, parent2, u, meta_code, mutation_rate, meta_influence)
+
+
+def iter_well_mixed_simulation(
+    num_agents: int,
+    generations: int,
+    T: int,
+    mutation_rate: float,
+    meta_influence: float,
+    seed: int,
+    selection: Selection = DEFAULT_SELECTION,
+) -> Generator[GenerationSnapshot, None, List[Agent]]:
+    """
+    完全混合の集団で同期更新のシミュレーションを行い、世代ごとのスナップショットを yield する。
+    ジェネレータの戻り値は最終世代のエージェントリスト（iter_simulation と同じ）。
+    """
+    streams = CounterStreams(seed)
+    codes = initial_strategy_codes(streams, num_agents).astype(np.int8)
+    node_ids = np.arange(num_agents, dtype=np.int64)
+    payoff_table, coop_table = pair_outcome_table(T)
+
+    payoffs = np.zeros(num_agents, dtype=np.float64)
+    reproduce_time = 0.0
+    for gen in range(generations):
+        t_start = time.perf_counter()
+        hist = np.bincount(codes, minlength=8)
+        payoff_by_strategy, coop_actions, total_actions = well_mixed_outcomes(
+            hist, payoff_table, coop_table, T
+        )
+        payoffs = payoff_by_strategy[codes]
+        realized_coop_rate = coop_actions / total_actions if total_actions > 0 else 0.0
+        t_played = time.perf_counter()
+
+        metrics = summary_metrics(gen, realized_coop_rate, codes, payoffs)
+        yield GenerationSnapshot(
+            generation=gen,
+            node_ids=node_ids,
+            strategies=codes,
+            payoffs=payoffs,
+            metrics=metrics,
+            timings={
+                "play": t_played - t_start,
+                "metrics": time.perf_counter() - t_played,
+                "reproduce": reproduce_time,
+            },
+        )
+
+        t_reproduce = time.perf_counter()
+        codes = reproduce_codes_well_mixed(
+            codes, payoffs, streams, gen,
+            mutation_rate=mutation_rate,
+            meta_influence=meta_influence,
+            selection=selection,
+        )
+        reproduce_time = time.perf_counter() - t_reproduce
+        logger.info(
+            f"Gen {gen}: coop(real={realized_coop_rate:.3f}, "
+            f"strategy={metrics['strategy_coop_rate']:.3f}), "
+            f"div={metrics['diversity']:.3f}, avg_payoff={metrics['avg_payoff']:.3f}"
+        )
+
+    return [
+        Agent(id=i, strategy=int_to_strategy(c), payoff=p)
+        for i, c, p in zip(node_ids.tolist(), codes.tolist(), payoffs.tolist())
+    ]
@@ -0,0 +1,290 @@
+# work_queue.py
+from __future__ import annotations
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+import json
+import os
+import socket
+import threading
+import uuid
+import logging
+logger = logging.getLogger(__name__)
+
+# 共有ファイルシステム（NFS など）上のディレクトリだけで動く作業キュー。
+#
+# スケジューラや外部サービスなしに、任意のホストの任意の数のワーカー（scripts/queue_worker.py）が
+# (設定, seed) のジョブを取り合う。SQLite のロックは NFS 上で信頼できないため、排他は
+#   - ファイルの排他作成（os.open(O_CREAT | O_EXCL), NFSv3 以降でアトミック）
+#   - rename（同じディレクトリ内でアトミック）
+# だけで行う。
+#
+#   <root>/jobs/<job_id>.json    ジョブ（run_single_experiment.py に渡す設定・seed・オプション）
+#   <root>/claims/<job_id>.claim 実行中の印（排他作成で取得, 取得ごとのトークン入り,
+#                                ワーカーが定期的に mtime を更新 = ハートビート）
+#   <root>/done/<job_id>.json    完了の印（ホスト・所要時間）
+#   <root>/failed/<job_id>.json  失敗の印（終了コード）
+#   <root>/clock/<worker>        共有ファイルシステムの時刻を読むためのファイル（ワーカーの終了時に消す）
+#
+# ハートビートが stale_after 秒以上止まった claim（ワーカーがクラッシュした・ホストが落ちた）は
+# 他のワーカーが rename で奪って取り直す。時刻はホストの時計ではなくファイルシステムの mtime で比べるので、
+# ホスト間の時計のずれに影響されない。再実行されたジョブは出力を上書きする（結果は seed で決まる）。
+# 止まっていただけのワーカー（NFS の長い停止など）が claim を奪われたまま走り続けないように、
+# ハートビートのたびに claim のトークンが自分のものか確かめ、違えば実行中のジョブを止める（Heartbeat の on_lost）。
+
+DEFAULT_HEARTBEAT = 30.0
+DEFAULT_STALE_AFTER = 150.0
+
+_DIRS = ("jobs", "claims", "done", "failed", "clock")
+
+
+@dataclass
+class Job:
+    """1 ジョブ = run_single_experiment.py の 1 回の実行（--paired なら設定のグループ × 1 seed）。"""
+
+    job_id: str
+    configs: List[str]
+    seed: int
+    options: List[str] = field(default_factory=list)
+    cwd: str = "."
+
+    def command(self, python: str) -> List[str]:
+        """ワーカーが実行するコマンド。"""
+        return [
+            python,
+            "scripts/run_single_experiment.py",
+            "--config",
+            *self.configs,
+            "--seed",
+            str(self.seed),
+            "--log-level",
+            "ERROR",
+            *self.options,
+        ]
+
+
+def job_id_for(configs: Sequence[Path], seed: int) -> str:
+    """ジョブ ID（run_all_experiments.py のジョブ名と同じ）。"""
+    return f"{'+'.join(Path(c).stem for c in configs)}_seed{seed:04d}"
+
+
+def _write_atomic(path: Path, data: dict) -> None:
+    """一時ファイルに書いてから rename する（読む側が書きかけの内容を見ない）。"""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+class WorkQueue:
+    """共有ディレクトリ上の作業キュー。"""
+
+    def __init__(self, root: Path | str, stale_after: float = DEFAULT_STALE_AFTER) -> None:
+        self.root = Path(root)
+        self.stale_after = stale_after
+        for name in _DIRS:
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # 取得中のジョブ ID -> claim のトークン
+        self._tokens: Dict[str, str] = {}
+
+    def _path(self, kind: str, job_id: str) -> Path:
+        suffix = ".claim" if kind == "claims" else ".json"
+        return self.root / kind / f"{job_id}{suffix}"
+
+    # --- 投入 -----------------------------------------------------------------
+    def enqueue(self, jobs: Sequence[Job]) -> int:
+        """ジョブを投入する（同じ ID のジョブがあれば投入しない）。戻り値: 新しく投入した数。"""
+        added = 0
+        for job in jobs:
+            path = self._path("jobs", job.job_id)
+            if path.exists():
+                continue
+            _write_atomic(path, asdict(job))
+            added += 1
+        return added
+
+    def requeue_failed(self) -> int:
+        """失敗したジョブの印を消して、再び取得できるようにする。"""
+        paths = list((self.root / "failed").glob("*.json"))
+        for p in paths:
+            p.unlink(missing_ok=True)
+        return len(paths)
+
+    # --- 状態 -----------------------------------------------------------------
+    def _ids(self, kind: str) -> set:
+        suffix = ".claim" if kind == "claims" else ".json"
+        return {p.name[: -len(suffix)] for p in (self.root / kind).glob(f"*{suffix}")}
+
+    def fs_now(self) -> float:
+        """共有ファイルシステムの現在時刻（自分の clock ファイルを更新して mtime を読む）。"""
+        path = self.root / "clock" / self.worker_id
+        path.touch()
+        return path.stat().st_mtime
+
+    def close(self) -> None:
+        """自分の clock ファイルを消す。"""
+        (self.root / "clock" / self.worker_id).unlink(missing_ok=True)
+
+    def __enter__(self) -> WorkQueue:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def status(self) -> Dict[str, int]:
+        """ジョブの状態ごとの件数（pending / running / stale / done / failed）。"""
+        jobs, done, failed = self._ids("jobs"), self._ids("done"), self._ids("failed")
+        now = self.fs_now()
+        running = stale = 0
+        for job_id in self._ids("claims") - done - failed:
+            try:
+                age = now - self._path("claims", job_id).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age > self.stale_after:
+                stale += 1
+            else:
+                running += 1
+        return {
+            "total": len(jobs),
+            "pending": len(jobs - done - failed) - running - stale,
+            "running": running,
+            "stale": stale,
+            "done": len(done & jobs),
+            "failed": len(failed & jobs),
+        }
+
+    # --- 取得 -----------------------------------------------------------------
+    def _try_claim(self, job_id: str) -> bool:
+        """claim ファイルを排他作成する（既にあれば False）。"""
+        try:
+            fd = os.open(self._path("claims", job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, "w") as f:
+            json.dump(
+                {"worker": self.worker_id, "host": socket.gethostname(), "pid": os.getpid(), "token": token}, f
+            )
+        self._tokens[job_id] = token
+        return True
+
+    def owns(self, job: Job) -> bool:
+        """job の claim がまだ自分のもの（取得したときのトークン）か。"""
+        token = self._tokens.get(job.job_id)
+        try:
+            data = json.loads(self._path("claims", job.job_id).read_text())
+        except (FileNotFoundError, ValueError):
+            # ValueError: 排他作成の直後で、別のワーカーがまだトークンを書いていない
+            return False
+        return token is not None and data.get("token") == token
+
+    def _reclaim_stale(self, job_id: str, now: float) -> bool:
+        """
+        ハートビートの止まった claim を奪う。rename は 1 つのワーカーしか成功しないので、
+        同じ claim を複数のワーカーが同時に奪っても取り直せるのは 1 つだけ。
+        """
+        claim = self._path("claims", job_id)
+        try:
+            if now - claim.stat().st_mtime <= self.stale_after:
+                return False
+        except FileNotFoundError:
+            return self._try_claim(job_id)
+        moved = claim.with_name(f".{claim.name}.{self.worker_id}.stale")
+        try:
+            os.rename(claim, moved)
+        except FileNotFoundError:
+            return False
+        # 確認から rename までの間に別のワーカーが取り直していたら（新しい claim だったら）rename で元に戻す。
+        # その間に空いた claim を第三のワーカーが取っていても上書きされ、そのワーカーはハートビートで
+        # トークンの不一致に気づいてジョブを止める（同じジョブが 2 つ走り続けることはない）
+        if now - moved.stat().st_mtime <= self.stale_after:
+            os.replace(moved, claim)
+            return False
+        moved.unlink(missing_ok=True)
+        logger.warning(f"Reclaimed stale job {job_id}")
+        return self._try_claim(job_id)
+
+    def claim(self) -> Job | None:
+        """
+        未完了のジョブを 1 つ取得する（ID 順で最初に取れたもの）。
+        空いているジョブがなければ、ハートビートの止まったジョブを奪う。どちらもなければ None。
+        """
+        finished = self._ids("done") | self._ids("failed")
+        pending = sorted(self._ids("jobs") - finished)
+        claimed = self._ids("claims")
+        for job_id in pending:
+            if job_id not in claimed and self._try_claim(job_id):
+                return self._load(job_id)
+        now = self.fs_now()
+        for job_id in pending:
+            if job_id in claimed and self._reclaim_stale(job_id, now):
+                return self._load(job_id)
+        return None
+
+    def _load(self, job_id: str) -> Job:
+        return Job(**json.loads(self._path("jobs", job_id).read_text()))
+
+    def heartbeat(self, job: Job) -> bool:
+        """claim が自分のものなら mtime を更新して True, 奪われていれば False。"""
+        if not self.owns(job):
+            logger.warning(f"Lost the claim of {job.job_id} (reclaimed as stale by another worker)")
+            self._tokens.pop(job.job_id, None)
+            return False
+        try:
+            os.utime(self._path("claims", job.job_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, job: Job, ok: bool, info: dict) -> bool:
+        """
+        完了（または失敗）の印を書いて claim を外す。claim が既に他のワーカーのものなら何もせず False
+        （そのワーカーが実行し直して印を書く）。
+        """
+        if not self.owns(job):
+            self._tokens.pop(job.job_id, None)
+            logger.warning(f"Not marking {job.job_id}: its claim belongs to another worker")
+            return False
+        _write_atomic(self._path("done" if ok else "failed", job.job_id), {"worker": self.worker_id, **info})
+        self._path("claims", job.job_id).unlink(missing_ok=True)
+        self._tokens.pop(job.job_id, None)
+        return True
+
+
+class Heartbeat:
+    """
+    ジョブの実行中、別スレッドで interval 秒ごとに claim のハートビートを送る（with 文で使う）。
+    claim が他のワーカーに奪われていたら lost を立てて on_lost を呼び（実行中のプロセスを止めるなど）、送るのをやめる。
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        job: Job,
+        interval: float = DEFAULT_HEARTBEAT,
+        on_lost: Callable[[], None] | None = None,
+    ) -> None:
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self.on_lost = on_lost
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self.queue.heartbeat(self.job):
+                self.lost = True
+                if self.on_lost is not None:
+                    self.on_lost()
+                return
+
+    def __enter__(self) -> Heartbeat:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()